@@ -1,14 +1,15 @@
+import atexit
+import fcntl
 import os
 import paho.mqtt.client as mqtt
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flasgger import Swagger
-from urllib.parse import parse_qs
 
 db = SQLAlchemy()
 
-def create_app():
+def create_app(config: dict = None):
     app = Flask(__name__)
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///afcs.db"
     app.config['SQLALCHEMY_ECHO'] = False
@@ -17,33 +18,138 @@ def create_app():
         'title': 'AFCS API',
         'uiversion': 3
     }
+    app.config['MQTT_BROKER'] = 'localhost'
+    app.config['MQTT_PORT'] = 1883
+    # отложенная запись телеметрии: размер пакета, интервал записи (с), размер буфера
+    app.config['TELEMETRY_INGEST_BATCH_SIZE'] = 1000
+    app.config['TELEMETRY_INGEST_INTERVAL_SEC'] = 0.5
+    app.config['TELEMETRY_INGEST_MAX_BACKLOG'] = 200000
+    # PRAGMA, выполняемые при каждом соединении с SQLite; {} - настройки SQLite по умолчанию
+    app.config['SQLITE_PRAGMAS'] = SQLITE_PERFORMANCE_PRAGMAS
+    # хранение телеметрии: сроки хранения уровней (с, см. DEFAULT_TELEMETRY_RETENTION_SEC),
+    # интервал обслуживания (с); None - телеметрия не сжимается и не удаляется, 0 - не обслуживать
+    app.config['TELEMETRY_RETENTION_SEC'] = None
+    app.config['TELEMETRY_RETENTION_INTERVAL_SEC'] = 60
+    # кэш состояния БПЛА: файл поколений, общий для процессов сервера
+    # (None - в каталоге instance приложения), наибольший возраст снимка (с); 0 - без кэша
+    app.config['UAV_STATE_CACHE_PATH'] = None
+    app.config['UAV_STATE_CACHE_TTL_SEC'] = 60
+    # кэш проверки токенов администратора: файл поколения (None - в каталоге instance),
+    # наибольший возраст результата проверки (с); 0 - без кэша
+    app.config['TOKEN_CACHE_PATH'] = None
+    app.config['TOKEN_CACHE_TTL_SEC'] = 30
+    # фоновые службы (MQTT, запись и обслуживание телеметрии) запускаются в одном процессе сервера,
+    # захватившем файл блокировки (None - в каталоге instance); False - не запускать
+    app.config['BACKGROUND_SERVICES'] = True
+    app.config['BACKGROUND_SERVICES_LOCK_PATH'] = None
+    if config:
+        # переопределение настроек, например для тестов и замеров
+        app.config.update(config)
     db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
     Migrate(app, db)
     Swagger(app)
     
+    if app.config['UAV_STATE_CACHE_TTL_SEC']:
+        app.extensions['uav_state_cache'] = UavStateCache(
+            app.config['UAV_STATE_CACHE_PATH'] or os.path.join(app.instance_path, 'uav_state_cache.gen'),
+            max_age_sec=app.config['UAV_STATE_CACHE_TTL_SEC'])
+    if app.config['TOKEN_CACHE_TTL_SEC']:
+        app.extensions['token_cache'] = TokenCache(
+            app.config['TOKEN_CACHE_PATH'] or os.path.join(app.instance_path, 'token_cache.gen'),
+            max_age_sec=app.config['TOKEN_CACHE_TTL_SEC'])
+
     from routes import bp as main_bp
     app.register_blueprint(main_bp)
     
-    MQTT_BROKER = 'localhost'
-    MQTT_PORT = 1883
+    app.extensions['telemetry_ingest'] = TelemetryIngestBuffer(
+        app, store=telemetry_batch_handler,
+        batch_size=app.config['TELEMETRY_INGEST_BATCH_SIZE'],
+        flush_interval_sec=app.config['TELEMETRY_INGEST_INTERVAL_SEC'],
+        max_backlog=app.config['TELEMETRY_INGEST_MAX_BACKLOG'])
+    app.extensions['telemetry_retention'] = TelemetryRetention(
+        app, retention_sec=app.config['TELEMETRY_RETENTION_SEC'],
+        interval_sec=app.config['TELEMETRY_RETENTION_INTERVAL_SEC'])
+    if app.config['BACKGROUND_SERVICES']:
+        start_background_services(app)
+
+    return app
+
+
+# файл блокировки фоновых служб, захваченный этим процессом
+_background_services_lock = None
+
+
+def start_background_services(app) -> bool:
+    """
+    Запускает фоновые службы сервера: клиент MQTT (приём телеметрии и миссий),
+    поток записи телеметрии и обслуживание хранения телеметрии.
+
+    Под mod_wsgi приложение создаётся в каждом процессе, а службы с общей базой
+    должны работать в одном: их запускает процесс, первым захвативший файл
+    BACKGROUND_SERVICES_LOCK_PATH, остальные процессы только обслуживают запросы.
+    Блокировка освобождается при завершении процесса.
+
+    Args:
+        app: Приложение Flask.
+
+    Returns:
+        bool: True, если службы запущены в этом процессе.
+    """
+    global _background_services_lock
+    if _background_services_lock is None:
+        path = app.config['BACKGROUND_SERVICES_LOCK_PATH'] or \
+            os.path.join(app.instance_path, 'background_services.lock')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        _background_services_lock = fd
+
+    telemetry_ingest = app.extensions['telemetry_ingest']
+    telemetry_ingest.start()
+    # принятые, но не записанные измерения записываются при завершении процесса
+    atexit.register(telemetry_ingest.stop)
+
+    # обслуживание удаляет исходные измерения, поэтому включается только явно заданными сроками
+    if app.config['TELEMETRY_RETENTION_SEC'] is not None and app.config['TELEMETRY_RETENTION_INTERVAL_SEC']:
+        app.extensions['telemetry_retention'].start()
+
+    MQTT_BROKER = app.config['MQTT_BROKER']
+    MQTT_PORT = app.config['MQTT_PORT']
     MQTT_TELEMETRY_TOPIC = 'api/telemetry'
     MQTT_MISSION_TOPIC = 'api/mission'
+    # ответ БПЛА о результате обработки миссии: по нему БПЛА узнаёт версию,
+    # относительно которой можно отправлять изменения
+    MQTT_MISSION_STATUS_TOPIC = 'api/mission/status'
     mqtt_client = mqtt.Client()
     def on_connect(client, userdata, flags, rc):
         client.subscribe(MQTT_TELEMETRY_TOPIC)
         client.subscribe(MQTT_MISSION_TOPIC)
         
     def on_telemetry_message(client, userdata, msg):
-        query_string = msg.payload.decode()
-        query_params = parse_qs(query_string)
-        single_value_params = {k: v[0] for k, v in query_params.items()}
-        with app.app_context():
-            regular_request(handler_func=telemetry_handler, **single_value_params)
+        try:
+            samples = decode_telemetry(msg.payload)
+        except ValueError as e:
+            print(f'Ошибка декодирования телеметрии: {e}')
+            return
+        # запись в базу выполняет поток telemetry_ingest, цикл paho не ждёт её
+        telemetry_ingest.submit(samples)
             
     def on_mission_message(client, userdata, msg):
         payload = json.loads(msg.payload.decode())
         with app.app_context():
-            regular_request(handler_func=fmission_ms_handler, **payload)
+            if 'base_version' in payload:
+                # изменение относительно сохранённой версии миссии
+                status, _ = regular_request(handler_func=fmission_ms_delta_handler, **payload)
+            else:
+                status, _ = regular_request(handler_func=fmission_ms_handler, **payload)
+        client.publish(f"{MQTT_MISSION_STATUS_TOPIC}/{payload['id']}",
+                       json.dumps({'version': payload.get('version'), 'status': status}), qos=1)
 
 
     mqtt_client.on_connect = on_connect
@@ -53,14 +159,25 @@ def create_app():
     with app.app_context():
         mqtt_client.loop_start()
     
-    return app
+    return True
+
 
 from utils.api_handlers import *
+from utils.telemetry_codec import decode_telemetry
+from utils.telemetry_ingest import TelemetryIngestBuffer
+from utils.schema_upgrade import upgrade_sqlite_schema
+from utils.sqlite_profile import SQLITE_PERFORMANCE_PRAGMAS, apply_sqlite_pragmas
+from utils.telemetry_retention import TelemetryRetention
+from utils.token_cache import TokenCache
+from utils.uav_state_cache import UavStateCache
 
 def clean_app_db(app):
     with app.app_context():
         db.create_all()
-        clean_db([UavTelemetry, MissionStep, Mission, MissionSenderPublicKeys, UavPublicKeys, Uav, User])
+        # база прежней версии сервера: create_all не меняет существующие таблицы
+        for change in upgrade_sqlite_schema(db.engine, db.metadata):
+            print(f'Обновление схемы базы: {change}')
+        clean_db([UavTelemetry1m, UavTelemetry10s, UavTelemetry1s, UavLatest, UavTelemetry, MissionStep, Mission, MissionSenderPublicKeys, UavPublicKeys, Uav, User])
         generate_user(User)
 
 
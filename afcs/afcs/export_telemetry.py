@@ -0,0 +1,33 @@
+""" выгрузка телеметрии БПЛА в файл NumPy .npz из командной строки
+
+запуск из каталога сервера (база по умолчанию - база сервера):
+    python export_telemetry.py --id 1 [--from 1700000000] [--to 1700003600] telemetry_1.npz
+"""
+import argparse
+from flask import Flask
+from afcs_server import db
+from utils.telemetry_export import export_telemetry_npz
+
+
+def main(argv=None):
+    """ точка входа командной строки """
+    parser = argparse.ArgumentParser(description='Выгрузка телеметрии БПЛА в файл NumPy .npz')
+    parser.add_argument('--database-uri', default='sqlite:///afcs.db',
+                        help='база данных (SQLALCHEMY_DATABASE_URI), по умолчанию - база сервера')
+    parser.add_argument('--id', required=True, help='идентификатор БПЛА')
+    parser.add_argument('--from', dest='start', type=float, help='начало периода, секунды Unix')
+    parser.add_argument('--to', dest='end', type=float, help='конец периода (не включается), секунды Unix')
+    parser.add_argument('output', help='путь к файлу .npz')
+    args = parser.parse_args(argv)
+
+    # имя приложения как у сервера: относительный путь к SQLite отсчитывается от того же instance
+    app = Flask('afcs_server')
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database_uri
+    db.init_app(app)
+    with app.app_context(), open(args.output, 'wb') as file:
+        count = export_telemetry_npz(file, args.id, args.start, args.end)
+    print(f'{count} измерений БПЛА {args.id} записано в {args.output}')
+
+
+if __name__ == '__main__':
+    main()
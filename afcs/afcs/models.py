@@ -13,7 +13,7 @@ class User(db.Model):
     __tablename__ = 'user'
     username = db.Column(db.String(64), index=True, primary_key=True)
     password_hash = db.Column(db.String(128))
-    access_token = db.Column(db.String(128))
+    access_token = db.Column(db.String(128), index=True)
 
     def __repr__(self):
         return '<User {}>'.format(self.username)
@@ -86,10 +86,14 @@ class Mission(db.Model):
     Attributes:
         uav_id: идентификатор БПЛА (первичный ключ, внешний ключ)
         is_accepted: статус принятия миссии
+        version: версия миссии (начало хеша SHA-256 её текста)
+        mission_str: текст миссии в формате QGC WPL, основа для изменений миссии
     """
     __tablename__ = 'mission'
     uav_id = db.Column(db.String(64), db.ForeignKey('uav.id'), primary_key=True)
     is_accepted = db.Column(db.Boolean, default=False)
+    version = db.Column(db.String(16))
+    mission_str = db.Column(db.Text)
     
     def __repr__(self):
         return '<Mission {}>'.format(self.id)
@@ -109,10 +113,13 @@ class MissionStep(db.Model):
     step = db.Column(db.Integer)
     operation = db.Column(db.String(64))
     
+    # шаги читаются и удаляются только по mission_id с сортировкой по step, поэтому
+    # таблица хранится упорядоченной по первичному ключу (WITHOUT ROWID) без отдельного индекса
     __table_args__ = (
         db.PrimaryKeyConstraint(
             mission_id, step,
         ),
+        {'sqlite_with_rowid': False},
     )
     
     def __repr__(self):
@@ -144,11 +151,96 @@ class UavTelemetry(db.Model):
     sats = db.Column(db.Integer)
     speed = db.Column(db.Float(precision=8))
     
+    # все запросы - по uav_id с диапазоном или сортировкой по record_time, что покрывает
+    # первичный ключ; WITHOUT ROWID хранит строки упорядоченными по нему, без второго B-дерева
+    # для индекса первичного ключа. Дополнительные индексы замедлили бы запись телеметрии.
     __table_args__ = (
         db.PrimaryKeyConstraint(
             uav_id, record_time
         ),
+        {'sqlite_with_rowid': False},
     )
     
     def __repr__(self):
-        return f'UAV id={self.uav_id}, lat={self.lat}, lon={self.lon}, alt={self.alt}, azimuth={self.azimuth}'
\ No newline at end of file
+        return f'UAV id={self.uav_id}, lat={self.lat}, lon={self.lon}, alt={self.alt}, azimuth={self.azimuth}'
+
+
+class UavLatest(db.Model):
+    """
+    Модель последней телеметрии БПЛА: по одной строке на БПЛА, обновляется
+    при записи телеметрии. Запросы последней телеметрии читают одну строку
+    по первичному ключу и не зависят от объёма истории в uav_telemetry.
+    Таблица общая для всех процессов сервера.
+
+    Attributes:
+        uav_id: идентификатор БПЛА (первичный ключ, внешний ключ)
+        record_time: время измерения
+        lat, lon, alt, azimuth, dop, sats, speed: значения как в UavTelemetry
+    """
+    __tablename__ = 'uav_latest'
+    uav_id = db.Column(db.String(64), db.ForeignKey('uav.id'), primary_key=True)
+    record_time = db.Column(db.DateTime)
+    lat = db.Column(db.Float(precision=8))
+    lon = db.Column(db.Float(precision=8))
+    alt = db.Column(db.Float(precision=8))
+    azimuth = db.Column(db.Float(precision=8))
+    dop = db.Column(db.Float(precision=8))
+    sats = db.Column(db.Integer)
+    speed = db.Column(db.Float(precision=8))
+
+    def __repr__(self):
+        return f'UAV id={self.uav_id}, latest at {self.record_time}'
+
+
+class UavTelemetryRollup:
+    """
+    Общие поля таблиц сводной телеметрии: измерения БПЛА за интервал длиной
+    bucket_width секунд, начинающийся в bucket_start. Для широты, долготы,
+    высоты и скорости хранятся минимум, максимум и среднее, для снижения
+    точности - среднее, для количества спутников - минимум. Азимут не сводится.
+
+    Attributes:
+        uav_id: идентификатор БПЛА (первичный ключ)
+        bucket_start: начало интервала (первичный ключ)
+        samples: количество измерений за интервал
+    """
+    bucket_width = None
+    uav_id = db.Column(db.String(64), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    samples = db.Column(db.Integer)
+    lat_min = db.Column(db.Float(precision=8))
+    lat_max = db.Column(db.Float(precision=8))
+    lat_mean = db.Column(db.Float(precision=8))
+    lon_min = db.Column(db.Float(precision=8))
+    lon_max = db.Column(db.Float(precision=8))
+    lon_mean = db.Column(db.Float(precision=8))
+    alt_min = db.Column(db.Float(precision=8))
+    alt_max = db.Column(db.Float(precision=8))
+    alt_mean = db.Column(db.Float(precision=8))
+    speed_min = db.Column(db.Float(precision=8))
+    speed_max = db.Column(db.Float(precision=8))
+    speed_mean = db.Column(db.Float(precision=8))
+    dop_mean = db.Column(db.Float(precision=8))
+    sats_min = db.Column(db.Integer)
+    __table_args__ = ({'sqlite_with_rowid': False},)
+
+    def __repr__(self):
+        return f'UAV id={self.uav_id}, {self.bucket_width} s from {self.bucket_start}, samples={self.samples}'
+
+
+class UavTelemetry1s(UavTelemetryRollup, db.Model):
+    """ Сводная телеметрия БПЛА по 1 с. """
+    __tablename__ = 'uav_telemetry_1s'
+    bucket_width = 1
+
+
+class UavTelemetry10s(UavTelemetryRollup, db.Model):
+    """ Сводная телеметрия БПЛА по 10 с. """
+    __tablename__ = 'uav_telemetry_10s'
+    bucket_width = 10
+
+
+class UavTelemetry1m(UavTelemetryRollup, db.Model):
+    """ Сводная телеметрия БПЛА по 1 мин. """
+    __tablename__ = 'uav_telemetry_1m'
+    bucket_width = 60
@@ -506,7 +506,7 @@ def get_telemetry():
 @bp.route('/logs/get_telemetry_csv')
 def get_telemetry_csv():
     """
-    Получает всю телеметрию для указанного БПЛА в формате CSV.
+    Получает телеметрию для указанного БПЛА в формате CSV (потоком).
     ---
     tags:
       - logs
@@ -516,6 +516,22 @@ def get_telemetry_csv():
         type: string
         required: true
         description: Идентификатор БПЛА.
+      - name: from
+        in: query
+        type: number
+        required: false
+        description: Начало периода, секунды Unix. Если не задано - с начала истории.
+      - name: to
+        in: query
+        type: number
+        required: false
+        description: Конец периода (не включается), секунды Unix. Если не задано - до конца истории.
+      - name: gzip
+        in: query
+        type: integer
+        required: false
+        enum: [0, 1]
+        description: 1 - вернуть CSV, сжатый в gzip, файлом telemetry_<id>.csv.gz.
     responses:
       200:
         description: Телеметрия БПЛА в формате CSV.
@@ -524,17 +540,279 @@ def get_telemetry_csv():
             schema:
               type: string
               example: "record_time,lat,lon,alt,azimuth,dop,sats,speed\n2024-09-15 16:46:38.302348,100.1,50.2,10,1,1.5,12,2.5\n"
+          application/gzip:
+            schema:
+              type: string
+              format: binary
       400:
         description: Какие-то параметры неверные
         schema:
           type: string
-          example: "Wrong id"
+          example: "Wrong id/from/to/gzip"
     """
     id = cast_wrapper(request.args.get('id'), str)
-    if id:
-        return regular_request(handler_func=get_telemetry_csv_handler, id=id)
+    start = cast_wrapper(request.args.get('from'), float)
+    end = cast_wrapper(request.args.get('to'), float)
+    compress = cast_wrapper(request.args.get('gzip', 0), int)
+    if id and (request.args.get('from') is None or start is not None) and \
+            (request.args.get('to') is None or end is not None) and compress in (0, 1):
+        return regular_request(handler_func=get_telemetry_csv_handler, id=id,
+                               start=start, end=end, compress=bool(compress))
     else:
-        return bad_request('Wrong id')
+        return bad_request('Wrong id/from/to/gzip')
+
+
+@bp.route('/logs/get_telemetry_npz')
+def get_telemetry_npz():
+    """
+    Получает телеметрию для указанного БПЛА в столбцовом формате NumPy .npz.
+    Файл загружается np.load, столбцы record_time (datetime64[us], UTC), lat, lon,
+    alt, azimuth, dop, speed (float64, пропуски - NaN) и sats (int64, пропуски - -1).
+    ---
+    tags:
+      - logs
+    parameters:
+      - name: id
+        in: query
+        type: string
+        required: true
+        description: Идентификатор БПЛА.
+      - name: from
+        in: query
+        type: number
+        required: false
+        description: Начало периода, секунды Unix. Если не задано - с начала истории.
+      - name: to
+        in: query
+        type: number
+        required: false
+        description: Конец периода (не включается), секунды Unix. Если не задано - до конца истории.
+    responses:
+      200:
+        description: Файл telemetry_<id>.npz.
+        content:
+          application/octet-stream:
+            schema:
+              type: string
+              format: binary
+      400:
+        description: Какие-то параметры неверные
+        schema:
+          type: string
+          example: "Wrong id/from/to"
+    """
+    id = cast_wrapper(request.args.get('id'), str)
+    start = cast_wrapper(request.args.get('from'), float)
+    end = cast_wrapper(request.args.get('to'), float)
+    if id and (request.args.get('from') is None or start is not None) and \
+            (request.args.get('to') is None or end is not None):
+        return regular_request(handler_func=get_telemetry_npz_handler, id=id, start=start, end=end)
+    else:
+        return bad_request('Wrong id/from/to')
+
+
+@bp.route('/logs/get_telemetry_history')
+def get_telemetry_history():
+    """
+    Получает историю телеметрии БПЛА за период. Старая телеметрия хранится
+    сводной по интервалам 1 с, 10 с и 1 мин; разрешение выбирается автоматически.
+    ---
+    tags:
+      - logs
+    parameters:
+      - name: id
+        in: query
+        type: string
+        required: true
+        description: Идентификатор БПЛА.
+      - name: from
+        in: query
+        type: number
+        required: true
+        description: Начало периода, секунды Unix.
+      - name: to
+        in: query
+        type: number
+        required: true
+        description: Конец периода (не включается), секунды Unix.
+      - name: max_points
+        in: query
+        type: integer
+        required: false
+        description: Максимальное количество точек. Если не задано, возвращаются все хранящиеся точки.
+    responses:
+      200:
+        description: История телеметрии.
+        schema:
+          type: object
+          properties:
+            resolution:
+              type: integer
+              description: Ширина интервала, с; 0 - исходные измерения. Интервалы более грубых уровней хранения возвращаются с их шириной.
+            telemetry:
+              type: array
+              items:
+                type: object
+                properties:
+                  time:
+                    type: number
+                    description: Время измерения или начало интервала, секунды Unix.
+                  samples:
+                    type: integer
+                    description: Количество измерений в интервале.
+                  lat:
+                    type: number
+                  lon:
+                    type: number
+                  alt:
+                    type: number
+                  alt_min:
+                    type: number
+                  alt_max:
+                    type: number
+                  speed:
+                    type: number
+                  speed_min:
+                    type: number
+                  speed_max:
+                    type: number
+                  dop:
+                    type: number
+                  sats:
+                    type: integer
+                    description: Минимальное количество спутников в интервале.
+      400:
+        description: Какие-то параметры неверные
+        schema:
+          type: string
+          example: "Wrong id/from/to/max_points"
+    """
+    id = cast_wrapper(request.args.get('id'), str)
+    start = cast_wrapper(request.args.get('from'), float)
+    end = cast_wrapper(request.args.get('to'), float)
+    max_points = cast_wrapper(request.args.get('max_points'), int)
+    if id and start is not None and end is not None and start < end and \
+            (max_points is None or max_points > 0):
+        return regular_request(handler_func=get_telemetry_history_handler, id=id,
+                               start=start, end=end, max_points=max_points)
+    else:
+        return bad_request('Wrong id/from/to/max_points')
+
+
+@bp.route('/logs/get_telemetry_chart')
+def get_telemetry_chart():
+    """
+    Получает историю телеметрии БПЛА для построения графика: разрешение выбирается
+    так, чтобы за период было не более points точек; для высоты и скорости
+    возвращаются среднее, минимум и максимум по интервалу. Если точек больше,
+    чем limit, ответ содержит курсор следующей страницы: запрос с теми же
+    параметрами и cursor возвращает следующие точки с тем же разрешением.
+    ---
+    tags:
+      - logs
+    parameters:
+      - name: id
+        in: query
+        type: string
+        required: true
+        description: Идентификатор БПЛА.
+      - name: from
+        in: query
+        type: number
+        required: true
+        description: Начало периода, секунды Unix.
+      - name: to
+        in: query
+        type: number
+        required: true
+        description: Конец периода (не включается), секунды Unix.
+      - name: points
+        in: query
+        type: integer
+        required: false
+        description: Целевое количество точек за период (по умолчанию 300, не более 5000).
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Количество точек на странице (по умолчанию points, не более 5000).
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Курсор next_cursor из предыдущего ответа.
+    responses:
+      200:
+        description: Столбцы графика телеметрии.
+        schema:
+          type: object
+          properties:
+            resolution:
+              type: integer
+              description: Ширина интервала, с; 0 - исходные измерения.
+            time:
+              type: array
+              items:
+                type: number
+              description: Время измерения или начало интервала, секунды Unix.
+            lat:
+              type: array
+              items:
+                type: number
+            lon:
+              type: array
+              items:
+                type: number
+            alt:
+              type: array
+              items:
+                type: number
+            alt_min:
+              type: array
+              items:
+                type: number
+            alt_max:
+              type: array
+              items:
+                type: number
+            speed:
+              type: array
+              items:
+                type: number
+            speed_min:
+              type: array
+              items:
+                type: number
+            speed_max:
+              type: array
+              items:
+                type: number
+            next_cursor:
+              type: string
+              description: Курсор следующей страницы, null на последней странице.
+      400:
+        description: Какие-то параметры неверные
+        schema:
+          type: string
+          example: "Wrong id/from/to/points/limit/cursor"
+    """
+    id = cast_wrapper(request.args.get('id'), str)
+    start = cast_wrapper(request.args.get('from'), float)
+    end = cast_wrapper(request.args.get('to'), float)
+    points = cast_wrapper(request.args.get('points', TELEMETRY_CHART_POINTS), int)
+    limit = cast_wrapper(request.args.get('limit', points), int)
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        cursor = decode_telemetry_cursor(cursor)
+    if id and start is not None and end is not None and start < end and \
+            points is not None and 0 < points <= TELEMETRY_CHART_MAX_POINTS and \
+            limit is not None and 0 < limit <= TELEMETRY_CHART_MAX_POINTS and \
+            (request.args.get('cursor') is None or
+             cursor is not None and check_telemetry_cursor(id, start, end, points, cursor)):
+        return regular_request(handler_func=get_telemetry_chart_handler, id=id, start=start,
+                               end=end, points=points, limit=limit, cursor=cursor)
+    else:
+        return bad_request('Wrong id/from/to/points/limit/cursor')
 
 
 @bp.route('/admin/get_waiter_number')
@@ -585,6 +863,62 @@ def get_id_list():
     return authorized_request(handler_func=get_id_list_handler, token=token)
 
 
+@bp.route('/admin/get_telemetry_ingest_stats')
+def get_telemetry_ingest_stats():
+    """
+    Получает статистику отложенной записи телеметрии.
+    ---
+    tags:
+      - admin
+    parameters:
+      - name: token
+        in: query
+        type: string
+        required: true
+        description: Токен аутентификации.
+    responses:
+      200:
+        description: Статистика записи телеметрии.
+        schema:
+          type: object
+          properties:
+            accepted:
+              type: integer
+              description: Принято измерений.
+            stored:
+              type: integer
+              description: Записано измерений.
+            dropped:
+              type: integer
+              description: Отброшено измерений из-за переполнения буфера.
+            failed:
+              type: integer
+              description: Измерений в пакетах, которые не удалось записать.
+            backlog:
+              type: integer
+              description: Измерений, ожидающих записи.
+            flushes:
+              type: integer
+              description: Количество записей в базу.
+            last_batch_size:
+              type: integer
+            max_batch_size:
+              type: integer
+            last_flush_sec:
+              type: number
+              description: Длительность последней записи, с.
+            max_flush_sec:
+              type: number
+            last_delay_sec:
+              type: number
+              description: Задержка от приёма до записи самого старого измерения последнего пакета, с.
+            max_delay_sec:
+              type: number
+    """
+    token = request.args.get('token')
+    return authorized_request(handler_func=get_telemetry_ingest_stats_handler, token=token)
+
+
 @bp.route('/admin/change_fly_accept')
 def change_fly_accept():
     """
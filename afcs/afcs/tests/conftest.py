@@ -0,0 +1,43 @@
+import importlib.util
+import socket
+from pathlib import Path
+import pytest
+from flask import Flask
+from afcs_server import db
+
+# локальный брокер MQTT из тестов бортовой части репозитория
+MQTT_BROKER_STANDIN = Path(__file__).resolve().parents[3] / 'tests' / 'mqtt_broker.py'
+
+
+@pytest.fixture(scope="function")
+def app():
+    """Фикстура приложения с базой данных в памяти, без подключения к MQTT."""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture(scope="session")
+def mqtt_broker():
+    """
+    Фикстура брокера MQTT на localhost:1883. Если брокер (mosquitto) не запущен,
+    на этом порту запускается локальный брокер из тестов бортовой части.
+    """
+    try:
+        socket.create_connection(('localhost', 1883), timeout=1).close()
+        yield None
+        return
+    except OSError:
+        if not MQTT_BROKER_STANDIN.exists():
+            pytest.skip('Брокер MQTT недоступен')
+    spec = importlib.util.spec_from_file_location('mqtt_broker', MQTT_BROKER_STANDIN)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    with module.MqttBroker(host='localhost', port=1883) as broker:
+        yield broker
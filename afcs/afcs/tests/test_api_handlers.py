@@ -1,4 +1,11 @@
-from utils.api_handlers import bad_request, regular_request
+import gzip
+from models import Mission, MissionStep, Uav, UavLatest, UavTelemetry
+from routes import bp
+from utils.api_handlers import bad_request, regular_request, telemetry_batch_handler, \
+    telemetry_handler, get_telemetry_handler, get_telemetry_csv_handler, fmission_ms_handler, \
+    fmission_ms_delta_handler
+from utils.utils import MissionVerificationStatus, get_mission_version
+from utils.db_utils import add_and_commit
 
 
 def test_bad_request():
@@ -32,4 +39,77 @@ def test_regular_request_exception():
     response, status_code = regular_request(handler_func_exception)
 
     assert response == "Conflict."
-    assert status_code == 409
\ No newline at end of file
+    assert status_code == 409
+
+
+def test_telemetry_batch_handler(app):
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    samples = [dict(id='1', lat='-353632621', lon='1491652374', alt='58409', azimuth='0',
+                    dop='1.2', sats='12', speed='0', ts=str(1700000000 + i)) for i in range(3)]
+    samples.append(dict(samples[0], id='unknown'))
+
+    assert telemetry_batch_handler(samples) == '$Stored: 3'
+    assert UavTelemetry.query.count() == 3
+    assert UavTelemetry.query.first().lat == -35.3632621
+
+    # повторный пакет записывается поверх существующих измерений
+    assert telemetry_batch_handler(samples[:3]) == '$Stored: 3'
+    assert UavTelemetry.query.count() == 3
+
+def test_latest_telemetry(app):
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    samples = [dict(id='1', lat=str(600000000 + i), lon='750000000', alt='100', azimuth='0',
+                    dop='1.2', sats='12', speed=str(i), ts=str(1700000000 + i)) for i in range(5)]
+    telemetry_batch_handler([samples[1], samples[3], samples[2]])
+    assert UavLatest.query.count() == 1
+    assert get_telemetry_handler('1').get_json()['speed'] == 3.0
+
+    # измерения из дискового буфера борта приходят позже более новых и не заменяют их
+    telemetry_batch_handler(samples[:1])
+    telemetry_handler(**samples[2])
+    assert get_telemetry_handler('1').get_json()['speed'] == 3.0
+    telemetry_handler(**samples[4])
+    assert get_telemetry_handler('1').get_json()['speed'] == 4.0
+    assert get_telemetry_handler('2').get_json() == {'error': 'NOT_FOUND'}
+
+def test_telemetry_csv_stream(app):
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    telemetry_batch_handler([
+        dict(id='1', lat='600000000', lon='750000000', alt='100', azimuth='0', dop='1.2',
+             sats='12', speed=str(i), ts=str(1700000000 + i)) for i in range(2500)])
+    with app.test_request_context():
+        response = get_telemetry_csv_handler('1')
+        chunks = list(response.iter_encoded())
+    lines = b''.join(chunks).decode().splitlines()
+    assert len(chunks) == 3 and response.mimetype == 'text/csv'
+    assert lines[0] == 'record_time,lat,lon,alt,azimuth,dop,sats,speed'
+    assert lines[1] == '2023-11-14 22:13:20,60.0,75.0,1.0,0.0,1.2,12,0.0'
+    assert len(lines) == 2501
+
+    # через маршрут: ответ читается после завершения обработчика
+    app.register_blueprint(bp)
+    response = app.test_client().get('/logs/get_telemetry_csv?id=1&from=1700000010&to=1700000020&gzip=1')
+    lines = gzip.decompress(response.data).decode().splitlines()
+    assert [line.split(',')[-1] for line in lines[1:]] == [f'{i}.0' for i in range(10, 20)]
+    assert app.test_client().get('/logs/get_telemetry_csv?id=2').data == \
+        b'record_time,lat,lon,alt,azimuth,dop,sats,speed\r\n'
+
+def test_fmission_ms_delta_handler(app):
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    mission_str = 'QGC WPL 110\n0\t1\t0\t16\t0\t5\t0\t0\t60.0\t75.0\t0\t1\n' \
+                  '1\t0\t3\t16\t0\t5\t0\t0\t60.1\t75.0\t0\t1\n'
+    version = get_mission_version(mission_str)
+    assert fmission_ms_handler('1', mission_str, version) == MissionVerificationStatus.OK
+
+    new_mission_str = 'QGC WPL 110\n0\t1\t0\t16\t0\t5\t0\t0\t60.0\t75.0\t0\t1\n' \
+                      '1\t0\t3\t16\t0\t5\t0\t0\t60.05\t75.0\t0\t1\n' \
+                      '2\t0\t3\t16\t0\t5\t0\t0\t60.1\t75.0\t0\t1\n'
+    new_version = get_mission_version(new_mission_str)
+    delta = dict(start=1, end=1, lines=['0\t3\t16\t0\t5\t0\t0\t60.05\t75.0\t0\t1'])
+
+    assert fmission_ms_delta_handler('1', 'unknown', new_version, **delta) == \
+        MissionVerificationStatus.UNKNOWN_BASE_VERSION
+    assert fmission_ms_delta_handler('1', version, new_version, **delta) == \
+        MissionVerificationStatus.OK
+    assert Mission.query.get('1').mission_str == new_mission_str
+    assert MissionStep.query.filter_by(mission_id='1').count() == 3
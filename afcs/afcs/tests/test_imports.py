@@ -0,0 +1,16 @@
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+
+
+@pytest.mark.parametrize('module', ['models', 'routes', 'utils.utils', 'utils.telemetry_retention',
+                                    'utils.telemetry_export', 'export_telemetry',
+                                    'utils.uav_state_cache', 'utils.token_cache'])
+def test_import_in_clean_interpreter(module):
+    # модули импортируются друг из друга через afcs_server: первым может оказаться любой
+    result = subprocess.run([sys.executable, '-c', f'import {module}'], cwd=SERVER_DIR,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
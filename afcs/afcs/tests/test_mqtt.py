@@ -12,7 +12,7 @@ TIMEOUT = 5
 
 class TestMQTTPublish:
     @pytest.fixture(scope="function")
-    def mqtt_client(self):
+    def mqtt_client(self, mqtt_broker):
         """Фикстура для создания и настройки MQTT клиента."""
         client = mqtt.Client()
         client.connect(MQTT_BROKER, MQTT_PORT, 60)
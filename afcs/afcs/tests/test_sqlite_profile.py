@@ -0,0 +1,74 @@
+from sqlalchemy import create_engine, inspect
+from afcs_server import db
+from models import MissionStep, UavTelemetry
+from utils.schema_upgrade import upgrade_sqlite_schema
+from utils.sqlite_profile import SQLITE_PERFORMANCE_PRAGMAS, apply_sqlite_pragmas, \
+    get_sqlite_pragmas
+
+
+def test_pragmas_on_every_connection(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'afcs.db'}")
+    apply_sqlite_pragmas(engine, SQLITE_PERFORMANCE_PRAGMAS)
+    for _ in range(2):
+        with engine.connect() as connection:
+            assert get_sqlite_pragmas(connection, ['journal_mode', 'synchronous', 'busy_timeout',
+                                                   'cache_size', 'temp_store']) == \
+                {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000,
+                 'cache_size': -65536, 'temp_store': 2}
+        engine.dispose()
+
+
+def _query_plan(query) -> str:
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {statement}')).all()
+    return ' '.join(row[-1] for row in rows)
+
+
+def test_access_patterns_use_primary_key(app):
+    latest = UavTelemetry.query.filter(UavTelemetry.uav_id == '1') \
+        .order_by(UavTelemetry.record_time.desc()).limit(1)
+    history = UavTelemetry.query.filter(UavTelemetry.uav_id == '1') \
+        .order_by(UavTelemetry.record_time.asc())
+    steps = MissionStep.query.filter(MissionStep.mission_id == '1').order_by(MissionStep.step)
+    for query in (latest, history, steps):
+        plan = _query_plan(query)
+        assert 'USING PRIMARY KEY' in plan, plan
+        assert 'TEMP B-TREE' not in plan, plan
+
+
+# схема таблиц, созданных прежней версией сервера
+OLD_SCHEMA = (
+    'CREATE TABLE user (username VARCHAR(64) NOT NULL, password_hash VARCHAR(128), '
+    'access_token VARCHAR(128), PRIMARY KEY (username))',
+    'CREATE INDEX ix_user_username ON user (username)',
+    'CREATE TABLE uav (id VARCHAR(64) NOT NULL, is_armed BOOLEAN, state VARCHAR(64), '
+    'kill_switch_state BOOLEAN, delay INTEGER, created_date DATETIME, PRIMARY KEY (id))',
+    'CREATE TABLE mission (uav_id VARCHAR(64) NOT NULL, is_accepted BOOLEAN, PRIMARY KEY (uav_id), '
+    'FOREIGN KEY(uav_id) REFERENCES uav (id))',
+    'CREATE TABLE mission_step (mission_id VARCHAR(64) NOT NULL, step INTEGER NOT NULL, '
+    'operation VARCHAR(64), PRIMARY KEY (mission_id, step), FOREIGN KEY(mission_id) REFERENCES mission (uav_id))',
+    "INSERT INTO uav (id) VALUES ('1')",
+    "INSERT INTO mission (uav_id, is_accepted) VALUES ('1', 0)",
+    "INSERT INTO mission_step VALUES ('1', 0, 'H60.0_75.0_0.0')",
+)
+
+
+def test_upgrade_old_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'afcs.db'}")
+    with engine.begin() as connection:
+        for statement in OLD_SCHEMA:
+            connection.exec_driver_sql(statement)
+    db.metadata.create_all(engine)
+    changes = upgrade_sqlite_schema(engine, db.metadata)
+    assert 'в таблицу mission добавлен столбец mission_str' in changes
+    assert 'таблица mission_step пересоздана' in changes
+    assert 'создан индекс ix_user_access_token' in changes
+    assert upgrade_sqlite_schema(engine, db.metadata) == []
+
+    inspector = inspect(engine)
+    assert {'version', 'mission_str'} <= {column['name'] for column in inspector.get_columns('mission')}
+    with engine.connect() as connection:
+        assert 'WITHOUT ROWID' in connection.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE name = 'mission_step'").scalar()
+        assert connection.exec_driver_sql('SELECT * FROM mission_step').all() == [('1', 0, 'H60.0_75.0_0.0')]
+        connection.exec_driver_sql("UPDATE mission SET version = 'v', mission_str = 's'")
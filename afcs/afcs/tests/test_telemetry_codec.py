@@ -0,0 +1,32 @@
+import pytest
+from utils.telemetry_codec import *
+
+
+def make_binary_payload(id, samples, version=TELEMETRY_VERSION):
+    id_bytes = id.encode()
+    return TELEMETRY_HEADER.pack(TELEMETRY_MAGIC, version, len(samples), 1700000000.0) + \
+        TELEMETRY_ID_LENGTH.pack(len(id_bytes)) + id_bytes + \
+        b''.join(TELEMETRY_SAMPLE.pack(*sample) for sample in samples)
+
+
+def test_decode_telemetry_text():
+    payload = b'id=1&lat=-353632621&lon=1491652374&alt=58409\nid=2&lat=1&lon=2&alt=3\n'
+    samples = decode_telemetry(payload)
+    assert [sample['id'] for sample in samples] == ['1', '2']
+    assert samples[0]['lat'] == '-353632621'
+
+def test_decode_telemetry_binary():
+    payload = make_binary_payload('1', [(0, -353632621, 1491652374, 58409, 9000, 120, 12, 3000),
+                                        (500, 1, 2, 3, 0, 0, 0, 0)])
+    samples = decode_telemetry(payload)
+    assert samples[0] == {'id': '1', 'lat': -353632621, 'lon': 1491652374, 'alt': 58409,
+                          'azimuth': 900000000.0, 'dop': 1.2, 'sats': 12, 'speed': 30.0,
+                          'ts': 1700000000.0}
+    assert samples[1]['ts'] == 1700000000.5
+
+def test_decode_telemetry_binary_errors():
+    payload = make_binary_payload('1', [(0, 1, 2, 3, 0, 0, 0, 0)])
+    with pytest.raises(ValueError):
+        decode_telemetry(payload[:-1])
+    with pytest.raises(ValueError):
+        decode_telemetry(make_binary_payload('1', [], version=TELEMETRY_VERSION + 1))
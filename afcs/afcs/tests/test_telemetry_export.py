@@ -0,0 +1,54 @@
+import datetime
+import io
+import pytest
+from afcs_server import db
+from models import Uav
+from utils.api_handlers import get_telemetry_npz_handler, telemetry_batch_handler
+from utils.db_utils import add_and_commit
+from export_telemetry import main
+from utils.telemetry_export import write_telemetry_npz
+
+np = pytest.importorskip('numpy')
+
+
+def _store(count):
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    telemetry_batch_handler([
+        dict(id='1', lat=str(600000000 + i), lon='750000000', alt='100', azimuth='0', dop='1.2',
+             sats='12', speed=str(i), ts=str(1700000000 + i / 4)) for i in range(count)])
+
+
+def test_npz_columns(app):
+    _store(25)
+    with app.test_request_context():
+        response = get_telemetry_npz_handler('1', start=1700000001, end=1700000005)
+        response.direct_passthrough = False
+        data = np.load(io.BytesIO(response.get_data()))
+    assert sorted(data.files) == sorted(['record_time', 'lat', 'lon', 'alt', 'azimuth', 'dop',
+                                         'sats', 'speed'])
+    assert data['record_time'].dtype == np.dtype('datetime64[us]')
+    assert data['record_time'][0] == np.datetime64('2023-11-14T22:13:21', 'us')
+    assert data['sats'].dtype == np.int64 and data['lat'].dtype == np.float64
+    np.testing.assert_array_equal(data['speed'], np.arange(4, 20))
+    np.testing.assert_allclose(data['lat'], 60 + np.arange(4, 20) / 1e7)
+
+
+def test_npz_chunks_and_missing_values():
+    output = io.BytesIO()
+    chunks = [[(datetime.datetime(2024, 1, 1), 60.0, None, 1.0, 0.0,
+                None, None, 2.0)]] * 3
+    assert write_telemetry_npz(output, chunks) == 3
+    data = np.load(io.BytesIO(output.getvalue()))
+    assert np.isnan(data['lon']).all() and (data['sats'] == -1).all()
+    assert write_telemetry_npz(io.BytesIO(), []) == 0
+
+
+def test_cli(app, tmp_path):
+    _store(10)
+    # файловая база, в которую переносятся строки тестовой базы в памяти
+    database = tmp_path / 'afcs.db'
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql(f"VACUUM INTO '{database}'")
+    output = tmp_path / 'telemetry.npz'
+    main(['--database-uri', f'sqlite:///{database}', '--id', '1', str(output)])
+    assert len(np.load(output)['speed']) == 10
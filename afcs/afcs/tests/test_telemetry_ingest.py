@@ -0,0 +1,79 @@
+import fcntl
+import os
+import time
+import afcs_server
+from models import Uav, UavTelemetry
+from utils.api_handlers import telemetry_batch_handler
+from utils.db_utils import add_and_commit
+from utils.telemetry_ingest import TelemetryIngestBuffer
+
+
+def _samples(count, id='1'):
+    return [dict(id=id, lat='600000000', lon='750000000', alt='100', azimuth='0',
+                 dop='1.2', sats='12', speed='0', ts=str(1700000000 + i)) for i in range(count)]
+
+
+def test_flush_in_batches(app):
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    buffer = TelemetryIngestBuffer(app, telemetry_batch_handler, batch_size=2, max_backlog=4)
+    assert buffer.submit(_samples(5)) == 1
+    assert buffer.stats()['backlog'] == 4
+    assert [buffer.flush(), buffer.flush(), buffer.flush()] == [2, 2, 0]
+    stats = buffer.stats()
+    assert (stats['accepted'], stats['stored'], stats['dropped'], stats['backlog']) == (5, 4, 1, 0)
+    assert stats['flushes'] == 2 and stats['max_batch_size'] == 2
+    assert UavTelemetry.query.count() == 4
+
+
+def test_background_flush(app):
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    buffer = TelemetryIngestBuffer(app, telemetry_batch_handler, batch_size=100,
+                                   flush_interval_sec=0.05)
+    buffer.start()
+    sample = _samples(1)[0]
+    del sample['ts']
+    buffer.submit([sample])
+    # время приёма присваивается сразу, а не при записи
+    assert sample['ts'] <= time.time()
+    deadline = time.time() + 5
+    while buffer.stats()['stored'] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    buffer.submit(_samples(3))
+    buffer.stop()
+    stats = buffer.stats()
+    assert (stats['stored'], stats['backlog'], stats['failed']) == (4, 0, 0)
+    assert stats['max_delay_sec'] >= stats['last_flush_sec'] >= 0
+
+
+def test_failed_flush_is_retried(app):
+    stored = []
+    def store(samples):
+        if not stored:
+            stored.append(None)
+            raise RuntimeError('database is locked')
+        stored.extend(sample['ts'] for sample in samples)
+    buffer = TelemetryIngestBuffer(app, store, batch_size=2, max_backlog=3)
+    buffer.submit(_samples(3))
+    assert buffer.flush() == 0
+    assert (buffer.stats()['failed'], buffer.stats()['stored'], buffer.stats()['backlog']) == (2, 0, 3)
+    # пакет вернулся в начало буфера, порядок измерений сохранён
+    assert [buffer.flush(), buffer.flush()] == [2, 1]
+    assert stored[1:] == [str(1700000000 + i) for i in range(3)]
+    assert buffer.stats()['dropped'] == 0
+
+
+def test_background_services_in_one_process(tmp_path, monkeypatch):
+    # файл блокировки уже захвачен другим процессом сервера
+    lock_path = str(tmp_path / 'background_services.lock')
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    monkeypatch.setattr(afcs_server, '_background_services_lock', None)
+    try:
+        app = afcs_server.create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'BACKGROUND_SERVICES_LOCK_PATH': lock_path,
+            'UAV_STATE_CACHE_PATH': str(tmp_path / 'uav_state_cache.gen'),
+            'TOKEN_CACHE_PATH': str(tmp_path / 'token_cache.gen')})
+        assert not afcs_server.start_background_services(app)
+        assert app.extensions['telemetry_ingest']._thread is None
+    finally:
+        os.close(fd)
@@ -0,0 +1,157 @@
+import datetime
+import pytest
+from routes import bp
+from models import Uav, UavTelemetry, UavTelemetry1s, UavTelemetry10s, UavTelemetry1m
+from utils.api_handlers import get_telemetry_chart_handler, get_telemetry_csv_handler, \
+    get_telemetry_history_handler, telemetry_batch_handler
+from utils.db_utils import add_and_commit
+from utils.telemetry_retention import TelemetryRetention, iter_telemetry_rows, \
+    query_telemetry_history, query_telemetry_page
+from utils.utils import decode_telemetry_cursor
+
+START = 1699999980  # кратно 60
+
+
+def _store(count, step=0.5, start=START, id='1'):
+    # скорость равна номеру измерения, высота чередуется 100/200
+    telemetry_batch_handler([
+        dict(id=id, lat='600000000', lon='750000000', alt=str(100 + 100 * (i % 2)), azimuth='0',
+             dop='1.0', sats=str(10 + i % 3), speed=str(i), ts=str(start + i * step))
+        for i in range(count)])
+
+
+def _time(offset):
+    return datetime.datetime.utcfromtimestamp(START + offset)
+
+
+def test_compaction_chain(app):
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    _store(240)  # 2 минуты, по 2 измерения в секунду
+    retention = TelemetryRetention(app, {'raw': 60, '1s': 120, '10s': 180, '1m': 600})
+
+    # исходные измерения старше 60 с сводятся по 1 с
+    # (граница сжатия выравнивается на минуту: 150 - 60 -> 60)
+    retention.run_once(now=_time(150))
+    assert (UavTelemetry.query.count(), UavTelemetry1s.query.count()) == (120, 60)
+    row = UavTelemetry1s.query.order_by(UavTelemetry1s.bucket_start).first()
+    assert (row.samples, row.alt_min, row.alt_max, row.alt_mean) == (2, 1, 2, 1.5)
+    assert (row.speed_min, row.speed_max, row.speed_mean, row.sats_min) == (0, 1, 0.5, 10)
+
+    # первая минута интервалов по 1 с сводится по 10 с за тот же запуск
+    retention.run_once(now=_time(180))
+    assert (UavTelemetry.query.count(), UavTelemetry1s.query.count(),
+            UavTelemetry10s.query.count()) == (0, 60, 6)
+
+    retention.run_once(now=_time(240))
+    assert (UavTelemetry1s.query.count(), UavTelemetry10s.query.count(),
+            UavTelemetry1m.query.count()) == (0, 6, 1)
+    retention.run_once(now=_time(300))
+    assert (UavTelemetry10s.query.count(), UavTelemetry1m.query.count()) == (0, 2)
+    row = UavTelemetry1m.query.order_by(UavTelemetry1m.bucket_start).first()
+    assert (row.samples, row.speed_min, row.speed_max, row.speed_mean) == (120, 0, 119, 59.5)
+    assert retention.stats()['compacted'] == {'raw': 240, '1s': 120, '10s': 12}
+
+    # сводные данные старше срока хранения последнего уровня удаляются
+    retention.run_once(now=_time(720))
+    assert UavTelemetry1m.query.count() == 0
+    assert retention.stats()['deleted'] == 2
+
+
+def test_late_samples_merge_into_rollup(app):
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    retention = TelemetryRetention(app, {'raw': 60})
+    _store(2, step=0.25)
+    retention.run_once(now=_time(120))
+    # измерения за ту же секунду, пришедшие после сжатия
+    _store(2, step=0.25, start=START + 0.5)
+    retention.run_once(now=_time(120))
+    row = UavTelemetry1s.query.one()
+    assert (row.samples, row.speed_min, row.speed_max, row.speed_mean) == (4, 0, 1, 0.5)
+
+
+def test_history_resolution(app):
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    _store(240)
+    TelemetryRetention(app, {'raw': 60}).run_once(now=_time(120))
+
+    # без ограничения: сводные интервалы по 1 с и исходные измерения последней минуты
+    resolution, rows = query_telemetry_history('1', _time(0), _time(120))
+    assert resolution == 0 and len(rows) == 60 + 120
+    assert sum(row['samples'] for row in rows) == 240
+    assert [row['time'] for row in rows] == sorted(row['time'] for row in rows)
+
+    resolution, rows = query_telemetry_history('1', _time(0), _time(120), max_points=20)
+    assert resolution == 10 and len(rows) == 12
+    assert rows[0]['speed'] == 9.5 and rows[-1]['speed_max'] == 239
+    assert sum(row['samples'] for row in rows) == 240
+
+    # интервалы выровнены на начало эпохи: по 2 мин период попадает в два интервала
+    resolution, rows = query_telemetry_history('1', _time(0), _time(120), max_points=1)
+    assert resolution == 180 and len(rows) == 1 and rows[0]['samples'] == 240
+    assert query_telemetry_history('2', _time(0), _time(120)) == (0, [])
+
+    history = get_telemetry_history_handler('1', START, START + 120, max_points=20).get_json()
+    assert history['resolution'] == 10 and history['telemetry'][0]['time'] == START
+
+
+def test_history_pages(app):
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    _store(240)
+    TelemetryRetention(app, {'raw': 60}).run_once(now=_time(120))
+    for width in (0, 10):
+        _, expected = query_telemetry_history('1', _time(0), _time(120), 10 ** 6 if width == 0 else 12)
+        pages, start = [], _time(0)
+        while start is not None:
+            rows, start = query_telemetry_page('1', start, _time(120), width, limit=7)
+            pages += rows
+        assert pages == expected
+
+    times, speeds, cursor = [], [], None
+    while True:
+        chart = get_telemetry_chart_handler('1', START, START + 120, points=20, limit=5,
+                                            cursor=cursor).get_json()
+        assert chart['resolution'] == 10 and len(chart['time']) <= 5
+        times += chart['time']
+        speeds += chart['speed_max']
+        if chart['next_cursor'] is None:
+            break
+        cursor = decode_telemetry_cursor(chart['next_cursor'])
+    assert times == [START + 10 * i for i in range(12)]
+    assert speeds == [19 + 20 * i for i in range(12)]
+    assert decode_telemetry_cursor('10:abc') is None
+
+    # через маршрут: курсор с чужой шириной интервала или вне периода отклоняется
+    app.register_blueprint(bp)
+    url = f'/logs/get_telemetry_chart?id=1&from={START}&to={START + 120}&points=20&limit=5&cursor='
+    assert app.test_client().get(url + f'10:{(START + 50) * 10 ** 6}').get_json()['time'][0] == START + 50
+    for cursor in ('1:', '-10:', '0:', f'10:{(START + 200) * 10 ** 6}'):
+        if cursor.endswith(':'):
+            cursor += str((START + 50) * 10 ** 6)
+        assert app.test_client().get(url + cursor).status_code == 400
+
+
+def test_export_after_compaction(app):
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    _store(240)
+    # первая минута старше срока хранения исходных измерений и сведена по 1 с
+    TelemetryRetention(app, {'raw': 60}).run_once(now=_time(120))
+    assert UavTelemetry.query.count() == 120
+
+    with app.test_request_context():
+        lines = get_telemetry_csv_handler('1', start=START, end=START + 30).get_data(as_text=True).splitlines()
+    assert lines[0] == 'record_time,lat,lon,alt,azimuth,dop,sats,speed'
+    assert len(lines) == 1 + 30
+    assert lines[1] == '2023-11-14 22:13:00,60.0,75.0,1.5,,1.0,10,0.5'
+
+    # период на границе уровней: сводные интервалы, затем исходные измерения, по времени
+    names = ('record_time', 'speed')
+    rows = [row for chunk in iter_telemetry_rows(names, '1', START + 58, START + 62, chunk_rows=3)
+            for row in chunk]
+    assert [tuple(row) for row in rows] == [
+        (_time(58), 116.5), (_time(59), 118.5), (_time(60), 120), (_time(60.5), 121),
+        (_time(61), 122), (_time(61.5), 123)]
+
+
+def test_retention_must_not_decrease(app):
+    with pytest.raises(ValueError):
+        TelemetryRetention(app, {'raw': 3600, '1s': 60})
@@ -0,0 +1,60 @@
+import pytest
+from afcs_server import db
+from models import User
+from utils.api_handlers import authorized_request, check_user_token
+from utils.db_utils import add_and_commit, clean_db
+from utils.token_cache import TokenCache
+
+
+@pytest.fixture
+def cache(app, tmp_path):
+    cache = TokenCache(str(tmp_path / 'token_cache.gen'))
+    app.extensions['token_cache'] = cache
+    add_and_commit(User(username='admin', password_hash='', access_token='token1'))
+    yield cache
+    del app.extensions['token_cache']
+    cache.close()
+
+
+def test_check_without_cache(app):
+    add_and_commit(User(username='admin', password_hash='', access_token='token1'))
+    assert check_user_token('token1')
+    assert not check_user_token('token2')
+
+
+def test_cached_check(cache):
+    for _ in range(3):
+        assert authorized_request(lambda: 'ok', 'token1') == ('ok', 200)
+        assert authorized_request(lambda: 'ok', 'token2') == ('$Unauthorized', 401)
+    assert cache.stats() == dict(hits=4, misses=2, entries=2)
+
+
+def test_token_change_invalidates(cache):
+    assert check_user_token('token1')
+    assert not check_user_token('token2')
+    db.session.get(User, 'admin').access_token = 'token2'
+    db.session.commit()
+    assert not check_user_token('token1')
+    assert check_user_token('token2')
+
+    clean_db([User])
+    assert not check_user_token('token2')
+
+
+def test_invalidation_between_processes(cache):
+    # второй экземпляр на том же файле поколения - кэш другого процесса сервера
+    other = TokenCache(cache.path)
+    try:
+        assert other.check('token1')
+        db.session.delete(db.session.get(User, 'admin'))
+        db.session.commit()
+        assert not other.check('token1')
+    finally:
+        other.close()
+
+
+def test_result_expires(cache):
+    cache.max_age_sec = 0
+    check_user_token('token1')
+    check_user_token('token1')
+    assert cache.stats()['hits'] == 0
@@ -0,0 +1,73 @@
+import pytest
+from afcs_server import db
+from models import Uav, UavPublicKeys
+from utils.api_handlers import admin_kill_switch_handler, force_disarm_all_handler, \
+    get_state_handler, kill_switch_handler
+from utils.db_utils import add_and_commit, clean_db
+from utils.uav_state_cache import UavStateCache
+from utils.utils import KILL_SWITCH_ON, NOT_FOUND, get_key
+
+
+@pytest.fixture
+def cache(app, tmp_path):
+    cache = UavStateCache(str(tmp_path / 'uav_state_cache.gen'), slots=16)
+    app.extensions['uav_state_cache'] = cache
+    add_and_commit(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+    yield cache
+    del app.extensions['uav_state_cache']
+    cache.close()
+
+
+def test_read_through(cache):
+    assert get_state_handler('1') == 'В сети'
+    assert get_state_handler('1') == 'В сети'
+    assert get_state_handler('2') == NOT_FOUND
+    assert get_state_handler('2') == NOT_FOUND
+    assert cache.stats() == dict(hits=2, misses=2, entries=2)
+
+
+def test_admin_mutation_invalidates(cache):
+    kill_switch_handler('1')
+    assert admin_kill_switch_handler('1') == '$OK'
+    assert kill_switch_handler('1') == f'$KillSwitch {KILL_SWITCH_ON}'
+    assert get_state_handler('1') == 'Kill switch ON'
+
+    force_disarm_all_handler()
+    assert get_state_handler('1') == 'В сети'
+
+
+def test_rollback_keeps_snapshot(cache):
+    get_state_handler('1')
+    db.session.get(Uav, '1').state = 'Ожидает'
+    db.session.flush()
+    db.session.rollback()
+    assert get_state_handler('1') == 'В сети'
+    assert cache.stats()['hits'] == 1
+
+
+def test_bulk_delete_invalidates(cache):
+    add_and_commit(UavPublicKeys(uav_id='1', n='3233', e='17'))
+    assert get_key('kos1', private=False) == (3233, 17)
+    clean_db([UavPublicKeys])
+    assert get_key('kos1', private=False) == -1
+
+
+def test_invalidation_between_processes(cache):
+    # второй экземпляр на том же файле поколений - кэш другого процесса сервера
+    other = UavStateCache(cache.path, slots=16)
+    try:
+        assert other.get(Uav, '1').state == 'В сети'
+        assert other.get(Uav, '1').state == 'В сети'
+        db.session.get(Uav, '1').state = 'Ожидает'
+        db.session.commit()
+        assert other.get(Uav, '1').state == 'Ожидает'
+        assert other.stats() == dict(hits=1, misses=2, entries=1)
+    finally:
+        other.close()
+
+
+def test_snapshot_expires(cache):
+    cache.max_age_sec = 0
+    get_state_handler('1')
+    get_state_handler('1')
+    assert cache.stats()['hits'] == 0
@@ -33,6 +33,19 @@ def test_read_mission():
     expected = [['H', '55.7558', '37.6173', '200.0']]
     assert read_mission(file_str)[0] == expected
 
+def test_read_mission_verification():
+    header = "QGC WPL 110\r\n0\t1\t0\t16\t0\t0\t0\t0\t55.7558\t37.6173\t200\t1\r\n"
+    land = "1\t0\t3\t21\t0\t0\t0\t0\t0\t0\t0\t1\r\n"
+    assert read_mission(header + land)[0][1] == ['L', '55.7558', '37.6173', '200.0']
+    assert read_mission(header + "1\t0\t3\t17\t0\t0\t0\t0\t0\t0\t0\t1\r\n")[1] == \
+        MissionVerificationStatus.UNKNOWN_COMMAND
+    assert read_mission(header + "1\t0\t3\t16\t3\t0\t0\t0\t1\t1\t0\t1\r\n")[1] == \
+        MissionVerificationStatus.NON_ZERO_DELAY_WAYPOINT
+    assert read_mission(header + "1\t0\t3\t93\t3\t1\t0\t0\t0\t0\t0\t1\r\n")[1] == \
+        MissionVerificationStatus.WRONG_DELAY
+    with pytest.raises(Exception):
+        read_mission("QGC WPL 100\n")
+
 def test_home_handler():
     lat, lon, alt = 55.7558, 37.6173, 200.0
     expected = ['H', '55.7558', '37.6173', '200.0']
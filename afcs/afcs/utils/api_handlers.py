@@ -1,9 +1,24 @@
+import datetime
 import socket
+import tempfile
 import time
 from threading import Thread
-from flask import jsonify
+from flask import Response, current_app, jsonify, send_file, stream_with_context
+from werkzeug.utils import secure_filename
 from utils.db_utils import *
 from utils.utils import *
+from utils.telemetry_export import export_telemetry_npz
+from utils.token_cache import check_token_cached
+from utils.uav_state_cache import get_cached_entity
+from utils.telemetry_retention import iter_telemetry_rows, query_telemetry_history, \
+    query_telemetry_page, select_telemetry_resolution
+
+# поля графика телеметрии и количество знаков после запятой
+TELEMETRY_CHART_FIELDS = {'lat': 7, 'lon': 7, 'alt': 2, 'alt_min': 2, 'alt_max': 2,
+                          'speed': 2, 'speed_min': 2, 'speed_max': 2}
+# количество точек графика по умолчанию и наибольшее
+TELEMETRY_CHART_POINTS = 300
+TELEMETRY_CHART_MAX_POINTS = 5000
 
 ENABLE_MAVLINK = False
 MAVLINK_CONNECTIONS_NUMBER = 10
@@ -114,11 +129,7 @@ def check_user_token(token):
     Returns:
         bool: True, если токен валиден, иначе False.
     """
-    users = get_entities_by_field(User, User.access_token, token)
-    if users and users.count() != 0:
-        return True
-    else:
-        return False
+    return check_token_cached(token)
 
 
 def regular_request(handler_func, **kwargs):
@@ -223,14 +234,16 @@ def arm_handler(id: str):
     Returns:
         str: Статус арма БПЛА.
     """
-    uav_entity = get_entity_by_key(Uav, id)
-    if not uav_entity:
+    uav_state = get_cached_entity(Uav, id)
+    if not uav_state:
         return NOT_FOUND
-    elif uav_entity.is_armed:
-        return f'$Arm {ARMED}$Delay {uav_entity.delay}' 
+    elif uav_state.is_armed:
+        return f'$Arm {ARMED}$Delay {uav_state.delay}' 
     else:
         mission = get_entity_by_key(Mission, id)
         if mission and mission.is_accepted == True:
+            # состояние изменяется через объект ORM, снимок из кэша неизменяем
+            uav_entity = get_entity_by_key(Uav, id)
             arm_queue.add(id)
             uav_entity.state = 'Ожидает'
             commit_changes()
@@ -242,7 +255,7 @@ def arm_handler(id: str):
             commit_changes()
             return f'$Arm {decision}$Delay {uav_entity.delay}'
         else:
-            return f'$Arm {DISARMED}$Delay {uav_entity.delay}'
+            return f'$Arm {DISARMED}$Delay {uav_state.delay}'
 
 
 def _arm_wait_decision(id: str):
@@ -274,7 +287,7 @@ def fly_accept_handler(id: str):
     Returns:
         str: Статус арма БПЛА.
     """
-    uav_entity = get_entity_by_key(Uav, id)
+    uav_entity = get_cached_entity(Uav, id)
     if not uav_entity:
         return NOT_FOUND
     elif uav_entity.is_armed:
@@ -293,7 +306,7 @@ def kill_switch_handler(id: str):
     Returns:
         str: Состояние аварийного выключателя.
     """
-    uav_entity = get_entity_by_key(Uav, id)
+    uav_entity = get_cached_entity(Uav, id)
     if not uav_entity:
         return NOT_FOUND
     elif uav_entity.kill_switch_state:
@@ -312,7 +325,7 @@ def flight_info_handler(id: str) -> str:
     Returns:
         str: Состояние полета БПЛА.
     """
-    uav_entity = get_entity_by_key(Uav, id)
+    uav_entity = get_cached_entity(Uav, id)
     if not uav_entity:
         return NOT_FOUND
     else:
@@ -327,8 +340,52 @@ def flight_info_handler(id: str) -> str:
         return ''.join([status, forbidden_zones_hash, delay])
 
 
+def _telemetry_values(lat, lon, alt, azimuth, dop, sats, speed) -> dict:
+    """
+    Приводит значения телеметрии из сообщения БПЛА к единицам хранения.
+
+    Returns:
+        dict: Значения полей UavTelemetry.
+    """
+    lat = cast_wrapper(lat, float)
+    if lat: lat /= 1e7
+    lon = cast_wrapper(lon, float)
+    if lon: lon /= 1e7
+    alt = cast_wrapper(alt, float)
+    if alt: alt /= 1e2
+    azimuth = cast_wrapper(azimuth, float)
+    if azimuth: azimuth /= 1e7
+    return dict(lat=lat, lon=lon, alt=alt, azimuth=azimuth, dop=cast_wrapper(dop, float),
+                sats=cast_wrapper(sats, int), speed=cast_wrapper(speed, float))
+
+
+def _telemetry_record_time(ts=None) -> datetime.datetime:
+    """
+    Возвращает время записи телеметрии: время измерения на борту, если оно передано,
+    иначе время получения.
+
+    Args:
+        ts: Время измерения (секунды Unix).
+    """
+    ts = cast_wrapper(ts, float)
+    if ts is None:
+        return datetime.datetime.utcnow()
+    return datetime.datetime.utcfromtimestamp(ts)
+
+
+def _get_telemetry_uav(id: str):
+    """
+    Возвращает БПЛА для записи телеметрии, в режиме display_only создаёт его.
+    """
+    uav_entity = get_entity_by_key(Uav, id)
+    if not uav_entity and modes['display_only']:
+        uav_entity = Uav(id=id, is_armed=False, state='В сети', kill_switch_state=False)
+        add_and_commit(uav_entity)
+    return uav_entity
+
+
 def telemetry_handler(id: str, lat: float, lon: float, alt: float,
-                      azimuth: float, dop: float, sats: float, speed: float):
+                      azimuth: float, dop: float, sats: float, speed: float, ts: float = None):
     """
     Обрабатывает телеметрию БПЛА.
 
@@ -341,49 +398,75 @@ def telemetry_handler(id: str, lat: float, lon: float, alt: float,
         dop (float): Снижение точности.
         sats (float): Количество спутников.
         speed (float): Скорость.
+        ts (float, optional): Время измерения на борту (секунды Unix).
 
     Returns:
         str: Статус арма БПЛА.
     """
-    uav_entity = get_entity_by_key(Uav, id)
-    if not uav_entity and modes['display_only']:
-        uav_entity = Uav(id=id, is_armed=False, state='В сети', kill_switch_state=False)
-        add_and_commit(uav_entity)
-        
+    uav_entity = _get_telemetry_uav(id)
     if not uav_entity:
         return NOT_FOUND
     else:
-        lat = cast_wrapper(lat, float)
-        if lat: lat /= 1e7
-        lon = cast_wrapper(lon, float)
-        if lon: lon /= 1e7
-        alt = cast_wrapper(alt, float)
-        if alt: alt /= 1e2
-        azimuth = cast_wrapper(azimuth, float)
-        if azimuth: azimuth /= 1e7
-        dop = cast_wrapper(dop, float)
-        sats = cast_wrapper(sats, int)
-        speed = cast_wrapper(speed, float)
-        record_time = datetime.datetime.utcnow()
+        values = _telemetry_values(lat, lon, alt, azimuth, dop, sats, speed)
+        record_time = _telemetry_record_time(ts)
         uav_telemetry_entity = get_entity_by_key(UavTelemetry, (uav_entity.id, record_time))
         if not uav_telemetry_entity:
-            uav_telemetry_entity = UavTelemetry(uav_id=uav_entity.id, lat=lat, lon=lon, alt=alt,
-                                                azimuth=azimuth, dop=dop, sats=sats, speed=speed, record_time=record_time)
-            add_and_commit(uav_telemetry_entity)
+            uav_telemetry_entity = UavTelemetry(uav_id=uav_entity.id, record_time=record_time, **values)
+            add_changes(uav_telemetry_entity)
         else:
-            uav_telemetry_entity.lat = lat
-            uav_telemetry_entity.lon = lon
-            uav_telemetry_entity.alt = alt
-            uav_telemetry_entity.azimuth = azimuth
-            uav_telemetry_entity.dop = dop
-            uav_telemetry_entity.sats = sats
-            uav_telemetry_entity.speed = speed
-            commit_changes()
+            for field, value in values.items():
+                setattr(uav_telemetry_entity, field, value)
+        upsert_newer(UavLatest, [dict(uav_id=uav_entity.id, record_time=record_time, **values)],
+                     UavLatest.record_time)
+        commit_changes()
         if not uav_entity.is_armed:
             return f'$Arm: {DISARMED}'
         else:
             return f'$Arm: {ARMED}'
-    
+
+
+def telemetry_batch_handler(samples: list):
+    """
+    Обрабатывает пакет телеметрии: одна выборка известных БПЛА и одна
+    вставка всех измерений (executemany) в одной транзакции.
+    Измерение с уже записанными БПЛА и временем заменяет прежнее.
+
+    Args:
+        samples (list): Список словарей с параметрами telemetry_handler.
+
+    Returns:
+        str: Количество записанных измерений.
+    """
+    ids = {sample.get('id') for sample in samples}
+    known_ids = {id for (id,) in db.session.query(Uav.id).filter(Uav.id.in_(ids))}
+    if modes['display_only'] and known_ids != ids:
+        add_all_and_commit([Uav(id=id, is_armed=False, state='В сети', kill_switch_state=False)
+                            for id in ids - known_ids if id is not None])
+        known_ids = ids
+    rows = {}
+    # последнее по времени измерение каждого БПЛА - для uav_latest
+    latest = {}
+    for sample in samples:
+        id = sample.get('id')
+        if id not in known_ids:
+            continue
+        values = _telemetry_values(*(sample.get(field) for field in
+                                     ('lat', 'lon', 'alt', 'azimuth', 'dop', 'sats', 'speed')))
+        record_time = _telemetry_record_time(sample.get('ts'))
+        # повтор измерения в пакете заменяет предыдущее
+        row = rows[(id, record_time)] = dict(uav_id=id, record_time=record_time, **values)
+        if id not in latest or record_time >= latest[id]['record_time']:
+            latest[id] = row
+    if rows:
+        try:
+            upsert_all(UavTelemetry, list(rows.values()))
+            upsert_newer(UavLatest, list(latest.values()), UavLatest.record_time)
+            commit_changes()
+        except:
+            db.session.rollback()
+            raise
+    return f'$Stored: {len(rows)}'
+
 
 def fmission_kos_handler(id: str):
     """
@@ -473,17 +556,21 @@ def get_forbidden_zones_hash_handler(id: str):
         return NOT_FOUND
 
 
-def fmission_ms_handler(id: str, mission_str: str):
+def fmission_ms_handler(id: str, mission_str: str, version: str = None):
     """
     Обрабатывает запрос на сохранение полетного задания от Mission Sender.
 
     Args:
         id (str): Идентификатор БПЛА.
         mission_str (str): Строка с полетным заданием.
+        version (str, optional): Версия полетного задания.
 
     Returns:
         str: Статус верификации миссии.
     """
+    mission_version = get_mission_version(mission_str)
+    if version is not None and version != mission_version:
+        return MissionVerificationStatus.VERSION_MISMATCH
     mission_list, mission_verification_status = read_mission(mission_str)
     
     if mission_verification_status == MissionVerificationStatus.OK:
@@ -498,7 +585,8 @@ def fmission_ms_handler(id: str, mission_str: str):
             delete_entity(mission_entity)
             commit_changes()
         
-        mission_entity = Mission(uav_id=id, is_accepted=False)
+        mission_entity = Mission(uav_id=id, is_accepted=False,
+                                 version=mission_version, mission_str=mission_str)
         add_changes(mission_entity)
         encoded_mission = encode_mission(mission_list)
         for idx, cmd in enumerate(encoded_mission):
@@ -509,6 +597,33 @@ def fmission_ms_handler(id: str, mission_str: str):
     return mission_verification_status
 
 
+def fmission_ms_delta_handler(id: str, base_version: str, version: str,
+                              start: int, end: int, lines: list):
+    """
+    Обрабатывает изменение полетного задания от Mission Sender
+    относительно сохранённой версии.
+
+    Args:
+        id (str): Идентификатор БПЛА.
+        base_version (str): Версия полетного задания, к которой относится изменение.
+        version (str): Версия полетного задания после изменения.
+        start (int): Номер первой заменяемой строки.
+        end (int): Номер строки после последней заменяемой.
+        lines (list): Новые строки.
+
+    Returns:
+        str: Статус верификации миссии.
+    """
+    mission_entity = get_entity_by_key(Mission, id)
+    if not mission_entity or not mission_entity.mission_str or mission_entity.version != base_version:
+        return MissionVerificationStatus.UNKNOWN_BASE_VERSION
+    try:
+        mission_str = apply_mission_delta(mission_entity.mission_str, start, end, lines)
+    except ValueError:
+        return MissionVerificationStatus.VERSION_MISMATCH
+    return fmission_ms_handler(id, mission_str, version)
+
+
 def revise_mission_handler(id: str, mission: str):
     mission_list = mission.split('*')
     
@@ -697,7 +812,7 @@ def get_state_handler(id: str):
     Returns:
         str: Состояние БПЛА или NOT_FOUND.
     """
-    uav_entity = get_entity_by_key(Uav, id)
+    uav_entity = get_cached_entity(Uav, id)
     if not uav_entity:
         return NOT_FOUND
     else:
@@ -735,7 +850,10 @@ def get_telemetry_handler(id: str):
     Returns:
         json: JSON-объект с телеметрическими данными или NOT_FOUND.
     """
-    uav_telemetry_entity = get_entities_by_field_with_order(UavTelemetry, UavTelemetry.uav_id, id, UavTelemetry.record_time.desc()).first()
+    uav_telemetry_entity = get_entity_by_key(UavLatest, id)
+    if not uav_telemetry_entity:
+        # база, созданная до появления uav_latest: последняя телеметрия по истории
+        uav_telemetry_entity = get_entities_by_field_with_order(UavTelemetry, UavTelemetry.uav_id, id, UavTelemetry.record_time.desc()).first()
     if not uav_telemetry_entity:
         return jsonify({'error': 'NOT_FOUND'})
     else:
@@ -751,22 +869,80 @@ def get_telemetry_handler(id: str):
         return jsonify(telemetry)
 
 
-def get_telemetry_csv_handler(id: str):
+def get_telemetry_csv_handler(id: str, start: float = None, end: float = None, compress: bool = False):
     """
-    Обрабатывает запрос на получение всей телеметрии БПЛА в формате CSV.
+    Обрабатывает запрос на получение телеметрии БПЛА в формате CSV.
+    CSV передаётся потоком: строки читаются из базы порциями, поэтому
+    память не зависит от длины истории. Период, уже сжатый TelemetryRetention,
+    выгружается строками сводных уровней (средние за интервал, без азимута).
 
     Args:
         id (str): Идентификатор БПЛА.
+        start (float, optional): Начало периода, секунды Unix.
+        end (float, optional): Конец периода (не включается), секунды Unix.
+        compress (bool): Сжать CSV в gzip.
 
     Returns:
-        str: CSV-строка с телеметрическими данными или NOT_FOUND.
+        Response: Потоковый ответ с CSV (только заголовок, если телеметрии нет)
+            или с файлом telemetry_<id>.csv.gz.
     """
-    uav_telemetry_entities = get_entities_by_field_with_order(UavTelemetry, UavTelemetry.uav_id, id, UavTelemetry.record_time.asc())
-    if not uav_telemetry_entities:
-        return NOT_FOUND
+    # поток читается после выхода из обработчика: stream_with_context сохраняет
+    # контекст запроса (и сессию базы) до окончания передачи
+    chunks = stream_with_context(iter_csv_chunks(TELEMETRY_CSV_COLUMNS, iter_telemetry_rows(
+        TELEMETRY_CSV_COLUMNS, id, start, end)))
+    if compress:
+        return Response(iter_gzip(chunks), mimetype='application/gzip',
+                        headers={'Content-Disposition':
+                                 f'attachment; filename={secure_filename(f"telemetry_{id}.csv.gz")}'})
+    return Response(chunks, mimetype='text/csv')
+
+
+def get_telemetry_npz_handler(id: str, start: float = None, end: float = None):
+    """
+    Обрабатывает запрос на получение телеметрии БПЛА в столбцовом формате NumPy .npz.
+    Файл собирается во временном файле и передаётся с диска.
+
+    Args:
+        id (str): Идентификатор БПЛА.
+        start (float, optional): Начало периода, секунды Unix.
+        end (float, optional): Конец периода (не включается), секунды Unix.
 
-    csv_data = create_csv_from_telemetry(uav_telemetry_entities)
-    return csv_data
+    Returns:
+        Response: Файл telemetry_<id>.npz (столбцы TELEMETRY_NPZ_COLUMNS, пустые, если телеметрии нет).
+    """
+    output = tempfile.TemporaryFile()
+    try:
+        export_telemetry_npz(output, id, start, end)
+    except:
+        output.close()
+        raise
+    output.seek(0)
+    return send_file(output, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=secure_filename(f'telemetry_{id}.npz'))
+
+
+def get_telemetry_history_handler(id: str, start: float, end: float, max_points: int = None):
+    """
+    Обрабатывает запрос на получение истории телеметрии БПЛА за период.
+    Разрешение (исходные измерения или сводные интервалы) выбирается так,
+    чтобы количество точек не превышало max_points.
+
+    Args:
+        id (str): Идентификатор БПЛА.
+        start (float): Начало периода, секунды Unix.
+        end (float): Конец периода, секунды Unix (не включается).
+        max_points (int, optional): Максимальное количество точек.
+
+    Returns:
+        Response: JSON с шириной интервала resolution (с, 0 - исходные измерения)
+            и списком точек telemetry.
+    """
+    resolution, rows = query_telemetry_history(
+        id, datetime.datetime.utcfromtimestamp(start), datetime.datetime.utcfromtimestamp(end),
+        max_points)
+    for row in rows:
+        row['time'] = row['time'].replace(tzinfo=datetime.timezone.utc).timestamp()
+    return jsonify({'resolution': resolution, 'telemetry': rows})
 
 
 def get_waiter_number_handler():
@@ -835,6 +1011,74 @@ def get_id_list_handler():
     return str(uav_ids)
 
 
+def check_telemetry_cursor(id: str, start: float, end: float, points: int, cursor: tuple) -> bool:
+    """
+    Проверяет, что курсор выдан для тех же параметров запроса истории телеметрии:
+    ширина интервала совпадает с выбранной по points и периоду,
+    а начало страницы лежит внутри периода.
+
+    Args:
+        id (str): Идентификатор БПЛА.
+        start (float): Начало периода, секунды Unix.
+        end (float): Конец периода (не включается), секунды Unix.
+        points (int): Целевое количество точек за весь период.
+        cursor (tuple): Разобранный курсор (decode_telemetry_cursor).
+
+    Returns:
+        bool: True, если курсор можно использовать, иначе False.
+    """
+    width, page_start = cursor
+    start = datetime.datetime.utcfromtimestamp(start)
+    end = datetime.datetime.utcfromtimestamp(end)
+    return start <= page_start < end and width == select_telemetry_resolution(id, start, end, points)
+
+
+def get_telemetry_chart_handler(id: str, start: float, end: float, points: int,
+                                limit: int = None, cursor: tuple = None):
+    """
+    Обрабатывает запрос на получение истории телеметрии БПЛА для графика:
+    не более points точек за период (минимум, максимум и среднее по интервалам,
+    вычисленные в SQL) в виде столбцов, постранично.
+
+    Args:
+        id (str): Идентификатор БПЛА.
+        start (float): Начало периода, секунды Unix.
+        end (float): Конец периода (не включается), секунды Unix.
+        points (int): Целевое количество точек за весь период, по нему выбирается разрешение.
+        limit (int, optional): Количество точек на странице, по умолчанию points.
+        cursor (tuple, optional): Разобранный курсор следующей страницы (decode_telemetry_cursor),
+            проверенный check_telemetry_cursor, задаёт разрешение и начало страницы вместо points и start.
+
+    Returns:
+        Response: JSON с шириной интервала resolution, столбцами time (секунды Unix)
+            и TELEMETRY_CHART_FIELDS и курсором следующей страницы next_cursor (null на последней).
+    """
+    start = datetime.datetime.utcfromtimestamp(start)
+    end = datetime.datetime.utcfromtimestamp(end)
+    if cursor is None:
+        width = select_telemetry_resolution(id, start, end, points)
+    else:
+        width, start = cursor
+    rows, next_time = query_telemetry_page(id, start, end, width, limit or points)
+    chart = {'resolution': width,
+             'time': [round(row['time'].replace(tzinfo=datetime.timezone.utc).timestamp(), 3)
+                      for row in rows]}
+    for field, digits in TELEMETRY_CHART_FIELDS.items():
+        chart[field] = [None if row[field] is None else round(row[field], digits) for row in rows]
+    chart['next_cursor'] = None if next_time is None else encode_telemetry_cursor(width, next_time)
+    return jsonify(chart)
+
+
+def get_telemetry_ingest_stats_handler():
+    """
+    Обрабатывает запрос на получение статистики отложенной записи телеметрии.
+
+    Returns:
+        Response: JSON со статистикой TelemetryIngestBuffer.stats().
+    """
+    return jsonify(current_app.extensions['telemetry_ingest'].stats())
+
+
 def get_mission_state_handler(id: str):
     """
     Обрабатывает запрос на получение состояния миссии БПЛА.
@@ -1022,7 +1266,7 @@ def get_delay_handler(id: str):
     Returns:
         str: Время до следующего сеанса связи или NOT_FOUND.
     """
-    uav_entity = get_entity_by_key(Uav, id)
+    uav_entity = get_cached_entity(Uav, id)
     if not uav_entity:
         return NOT_FOUND
     else:
@@ -1,6 +1,7 @@
 import secrets, os
 from afcs_server import db
 from hashlib import sha256
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 
 def add_and_commit(entity: db.Model):
@@ -43,6 +44,85 @@ def commit_changes():
     db.session.commit()
     
     
+def add_all_and_commit(entities: list):
+    """
+    Добавляет сущности в сессию и фиксирует их одной транзакцией.
+    При ошибке фиксации изменения откатываются.
+
+    Args:
+        entities (list): Сущности для добавления и фиксации.
+
+    Return:
+        None
+    """
+    try:
+        db.session.add_all(entities)
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+
+
+def upsert_all(entity: db.Model, rows: list):
+    """
+    Вставляет строки одним запросом executemany без фиксации изменений,
+    заменяя строки с совпадающим первичным ключом.
+
+    Args:
+        entity (db.Model): Модель таблицы.
+        rows (list): Словари значений столбцов.
+
+    Return:
+        None
+    """
+    db.session.execute(entity.__table__.insert().prefix_with('OR REPLACE', dialect='sqlite'), rows)
+
+
+def upsert_newer(entity: db.Model, rows: list, order_field):
+    """
+    Вставляет строки одним запросом executemany без фиксации изменений.
+    Строка с совпадающим первичным ключом заменяется, только если значение
+    order_field новой строки не меньше сохранённого.
+
+    Args:
+        entity (db.Model): Модель таблицы.
+        rows (list): Словари значений столбцов.
+        order_field: Поле модели, по которому определяется более новая строка.
+
+    Return:
+        None
+    """
+    table = entity.__table__
+    statement = sqlite_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={column.name: statement.excluded[column.name]
+              for column in table.columns if not column.primary_key},
+        where=statement.excluded[order_field.key] >= order_field)
+    db.session.execute(statement, rows)
+
+
+def upsert_all_and_commit(entity: db.Model, rows: list):
+    """
+    Вставляет строки одним запросом executemany, заменяя строки с совпадающим
+    первичным ключом, и фиксирует их одной транзакцией.
+    При ошибке фиксации изменения откатываются.
+
+    Args:
+        entity (db.Model): Модель таблицы.
+        rows (list): Словари значений столбцов.
+
+    Return:
+        None
+    """
+    try:
+        upsert_all(entity, rows)
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+
+
 def delete_entity(entity: db.Model):
     """
     Удаляет сущность из сессии.
@@ -124,6 +204,41 @@ def get_entities_by_field_with_order(entity: db.Model, field, field_value, order
     return entity.query.filter(field==field_value).order_by(order_by_field)
 
 
+def entity_exists(entity: db.Model, field, field_value) -> bool:
+    """
+    Проверяет, есть ли сущность с указанным значением поля, запросом EXISTS
+    (база прекращает поиск на первой найденной строке, по индексу поля - без просмотра таблицы).
+
+    Args:
+        entity (db.Model): Модель сущности.
+        field: Поле для фильтрации.
+        field_value: Значение поля для фильтрации.
+
+    Return:
+        bool: True, если сущность найдена.
+    """
+    return db.session.query(entity.query.filter(field == field_value).exists()).scalar()
+
+
+def iter_rows_in_chunks(columns: list, condition, order_by_field, chunk_rows: int = 1000):
+    """
+    Читает значения столбцов серверным курсором (yield_per) порциями, без создания
+    объектов ORM, поэтому память не зависит от количества строк.
+
+    Args:
+        columns (list): Столбцы моделей.
+        condition: Условие отбора строк.
+        order_by_field: Поле для сортировки.
+        chunk_rows (int): Количество строк в порции.
+
+    Return:
+        Iterator[list]: Порции строк - кортежей значений столбцов.
+    """
+    query = db.select(*columns).where(condition).order_by(order_by_field) \
+        .execution_options(yield_per=chunk_rows)
+    yield from db.session.execute(query).partitions()
+
+
 def clean_db(models_to_clean):
     """
     Очищает базу данных, удаляя все записи указанных моделей.
@@ -0,0 +1,82 @@
+""" приведение существующей базы SQLite к схеме моделей
+
+db.create_all() создаёт только отсутствующие таблицы и не меняет существующие,
+поэтому база, созданная прежней версией сервера, осталась бы без новых столбцов
+(например, Mission.version и Mission.mission_str), индексов (User.access_token)
+и без хранения WITHOUT ROWID. Запросы к ней завершались бы ошибкой "no such column".
+upgrade_sqlite_schema вызывается при запуске после create_all и дополняет таблицы:
+недостающие столбцы добавляются ALTER TABLE, индексы создаются, а таблицы,
+которые нельзя изменить на месте, пересоздаются с копированием строк.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+
+
+def _is_without_rowid(connection, table_name: str) -> bool:
+    sql = connection.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                             {'name': table_name}).scalar()
+    return 'WITHOUT ROWID' in (sql or '').upper()
+
+
+def _can_add_column(column) -> bool:
+    """ ALTER TABLE ADD COLUMN добавляет только необязательные столбцы вне первичного ключа """
+    return not column.primary_key and column.nullable
+
+
+def _rebuild_table(connection, table, existing_columns):
+    """
+    Пересоздаёт таблицу по модели с копированием общих столбцов
+    (порядок действий из документации SQLite: новая таблица, копирование, удаление, переименование).
+    """
+    temp_name = f'{table.name}__upgrade'
+    for index in inspect(connection).get_indexes(table.name):
+        connection.execute(text(f'DROP INDEX IF EXISTS "{index["name"]}"'))
+    # DDL таблицы модели (без индексов) под временным именем
+    create = str(CreateTable(table).compile(dialect=connection.dialect))
+    name = connection.dialect.identifier_preparer.format_table(table)
+    connection.execute(text(create.replace(f'CREATE TABLE {name} ', f'CREATE TABLE "{temp_name}" ', 1)))
+    columns = ', '.join(f'"{column.name}"' for column in table.columns if column.name in existing_columns)
+    connection.execute(text(f'INSERT INTO "{temp_name}" ({columns}) SELECT {columns} FROM "{table.name}"'))
+    connection.execute(text(f'DROP TABLE "{table.name}"'))
+    connection.execute(text(f'ALTER TABLE "{temp_name}" RENAME TO "{table.name}"'))
+
+
+def upgrade_sqlite_schema(engine, metadata) -> list:
+    """
+    Дополняет существующие таблицы базы SQLite до схемы моделей.
+    Для других СУБД ничего не делает.
+
+    Args:
+        engine: Движок SQLAlchemy.
+        metadata: Метаданные моделей (db.metadata).
+
+    Returns:
+        list: Описания выполненных изменений.
+    """
+    if engine.dialect.name != 'sqlite':
+        return []
+    changes = []
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        existing_tables = set(inspector.get_table_names())
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            missing = [column for column in table.columns if column.name not in existing_columns]
+            without_rowid = table.dialect_options['sqlite']['with_rowid'] is False
+            if (without_rowid and not _is_without_rowid(connection, table.name)) or \
+                    not all(_can_add_column(column) for column in missing):
+                _rebuild_table(connection, table, existing_columns)
+                changes.append(f'таблица {table.name} пересоздана')
+            else:
+                for column in missing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                    changes.append(f'в таблицу {table.name} добавлен столбец {column.name}')
+            existing_indexes = {index['name'] for index in inspect(connection).get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(connection)
+                    changes.append(f'создан индекс {index.name}')
+    return changes
@@ -0,0 +1,52 @@
+from sqlalchemy import event
+
+# Профиль хранения SQLite для сервера под mod_wsgi (несколько потоков и процессов):
+# WAL позволяет читать параллельно с записью, synchronous=NORMAL в режиме WAL
+# не синхронизирует диск на каждой фиксации (после сбоя питания могут потеряться
+# последние транзакции, но база остаётся целой), busy_timeout заставляет ждать
+# блокировку вместо немедленной ошибки "database is locked".
+SQLITE_PERFORMANCE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,          # мс
+    'cache_size': -65536,          # отрицательное значение - в КиБ, т.е. 64 МиБ на соединение
+    'mmap_size': 268435456,        # 256 МиБ файла базы читаются через mmap
+    'temp_store': 'MEMORY',
+}
+
+
+def apply_sqlite_pragmas(engine, pragmas: dict):
+    """
+    Настраивает выполнение PRAGMA при каждом новом соединении с базой SQLite.
+    Для других СУБД ничего не делает.
+
+    Args:
+        engine: Движок SQLAlchemy.
+        pragmas (dict): Значения PRAGMA по именам, пустой словарь - настройки SQLite по умолчанию.
+
+    Return:
+        None
+    """
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def get_sqlite_pragmas(connection, names) -> dict:
+    """
+    Возвращает текущие значения PRAGMA соединения.
+
+    Args:
+        connection: Соединение SQLAlchemy.
+        names: Имена PRAGMA.
+
+    Returns:
+        dict: Значения PRAGMA по именам.
+    """
+    return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in names}
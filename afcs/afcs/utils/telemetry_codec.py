@@ -0,0 +1,80 @@
+import struct
+from urllib.parse import parse_qs
+
+# Формат двоичных сообщений телеметрии совпадает с src/telemetry_codec.py бортовой части:
+# заголовок '<BBHd' (признак, версия, количество измерений, время первого измерения),
+# длина идентификатора БПЛА u8 и идентификатор, затем измерения '<IiiiHHBH'.
+TELEMETRY_MAGIC = 0xFE
+TELEMETRY_VERSION = 1
+
+TELEMETRY_HEADER = struct.Struct('<BBHd')
+TELEMETRY_ID_LENGTH = struct.Struct('<B')
+TELEMETRY_SAMPLE = struct.Struct('<IiiiHHBH')
+
+
+def decode_telemetry_text(payload: bytes) -> list:
+    """
+    Декодирует текстовое сообщение телеметрии: строки запроса, по одной на измерение.
+
+    Args:
+        payload (bytes): Сообщение.
+
+    Returns:
+        list: Список словарей с параметрами telemetry_handler.
+    """
+    return [{k: v[0] for k, v in parse_qs(query_string).items()}
+            for query_string in payload.decode().splitlines() if query_string]
+
+
+def decode_telemetry_binary(payload: bytes) -> list:
+    """
+    Декодирует двоичное сообщение телеметрии.
+    Значения возвращаются в единицах текстового формата.
+
+    Args:
+        payload (bytes): Сообщение.
+
+    Returns:
+        list: Список словарей с параметрами telemetry_handler.
+
+    Raises:
+        ValueError: Если сообщение повреждено или версия формата не поддерживается.
+    """
+    try:
+        _, version, count, base_time = TELEMETRY_HEADER.unpack_from(payload)
+        if version != TELEMETRY_VERSION:
+            raise ValueError(f'Неподдерживаемая версия формата телеметрии: {version}')
+        offset = TELEMETRY_HEADER.size
+        (id_length,) = TELEMETRY_ID_LENGTH.unpack_from(payload, offset)
+        offset += TELEMETRY_ID_LENGTH.size
+        id = payload[offset:offset + id_length].decode()
+        body = payload[offset + id_length:]
+        if len(body) != count * TELEMETRY_SAMPLE.size:
+            raise ValueError('Длина сообщения телеметрии не соответствует количеству измерений')
+        return [{'id': id, 'lat': lat, 'lon': lon, 'alt': alt, 'azimuth': azimuth * 1e5,
+                 'dop': dop / 100, 'sats': sats, 'speed': speed / 100,
+                 'ts': base_time + time_offset / 1000}
+                for time_offset, lat, lon, alt, azimuth, dop, sats, speed
+                in TELEMETRY_SAMPLE.iter_unpack(body)]
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f'Повреждённое сообщение телеметрии: {e}') from e
+
+
+def decode_telemetry(payload: bytes) -> list:
+    """
+    Декодирует сообщение телеметрии в текстовом или двоичном формате.
+    Двоичное сообщение начинается с байта TELEMETRY_MAGIC, который не встречается
+    в начале текстового.
+
+    Args:
+        payload (bytes): Сообщение.
+
+    Returns:
+        list: Список словарей с параметрами telemetry_handler.
+
+    Raises:
+        ValueError: Если сообщение повреждено.
+    """
+    if payload[:1] == bytes((TELEMETRY_MAGIC,)):
+        return decode_telemetry_binary(payload)
+    return decode_telemetry_text(payload)
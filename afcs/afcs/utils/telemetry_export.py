@@ -0,0 +1,106 @@
+""" выгрузка телеметрии БПЛА в столбцовый файл NumPy .npz
+
+Файл .npz - zip-архив с файлом .npy на каждый столбец, np.load(path)[name]
+возвращает типизированный массив без разбора текста. Формат .npy записывается
+здесь же средствами стандартной библиотеки: NumPy нет среди зависимостей сервера.
+
+Строки читаются из базы порциями (iter_telemetry_rows, включая уже сжатые
+уровни хранения), значения каждого
+столбца дописываются во временный файл, поэтому в памяти находится только
+одна порция. Архив собирается из временных файлов после чтения всех строк,
+когда известна длина столбцов.
+
+Выгрузка из командной строки - export_telemetry.py в каталоге сервера.
+"""
+import datetime
+import shutil
+import struct
+import sys
+import tempfile
+import zipfile
+from array import array
+from contextlib import ExitStack
+from utils.telemetry_retention import iter_telemetry_rows
+
+# столбцы: имя, код типа array, тип .npy. Время - микросекунды Unix (datetime64[us]);
+# пропущенные значения - NaN, у количества спутников - -1
+TELEMETRY_NPZ_COLUMNS = (
+    ('record_time', 'q', '<M8[us]'),
+    ('lat', 'd', '<f8'),
+    ('lon', 'd', '<f8'),
+    ('alt', 'd', '<f8'),
+    ('azimuth', 'd', '<f8'),
+    ('dop', 'd', '<f8'),
+    ('sats', 'q', '<i8'),
+    ('speed', 'd', '<f8'),
+)
+EXPORT_CHUNK_ROWS = 10000
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+_MISSING = {'d': float('nan'), 'q': -1}
+
+
+def _npy_header(descr: str, count: int) -> bytes:
+    """ заголовок .npy версии 1.0 для одномерного массива из count элементов """
+    header = repr({'descr': descr, 'fortran_order': False, 'shape': (count,)})
+    # длина преамбулы (10 байт) и заголовка кратна 64, заголовок заканчивается переводом строки
+    header += ' ' * (-(10 + len(header) + 1) % 64) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+def _column_values(name: str, typecode: str, values: tuple) -> array:
+    if name == 'record_time':
+        values = [(value - _EPOCH) // _MICROSECOND for value in values]
+    elif None in values:
+        values = [_MISSING[typecode] if value is None else value for value in values]
+    column = array(typecode, values)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column
+
+
+def write_telemetry_npz(file, row_chunks) -> int:
+    """
+    Записывает телеметрию в файл .npz.
+
+    Args:
+        file: Файл, открытый на запись в двоичном режиме.
+        row_chunks: Порции строк - кортежей значений столбцов TELEMETRY_NPZ_COLUMNS.
+
+    Returns:
+        int: Количество записанных строк.
+    """
+    count = 0
+    with ExitStack() as stack:
+        spools = [stack.enter_context(tempfile.TemporaryFile()) for _ in TELEMETRY_NPZ_COLUMNS]
+        for rows in row_chunks:
+            for (name, typecode, _), spool, values in zip(TELEMETRY_NPZ_COLUMNS, spools, zip(*rows)):
+                _column_values(name, typecode, values).tofile(spool)
+            count += len(rows)
+        with zipfile.ZipFile(file, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for (name, _, descr), spool in zip(TELEMETRY_NPZ_COLUMNS, spools):
+                with archive.open(f'{name}.npy', 'w', force_zip64=True) as member:
+                    member.write(_npy_header(descr, count))
+                    spool.seek(0)
+                    shutil.copyfileobj(spool, member)
+    return count
+
+
+def export_telemetry_npz(file, id: str, start: float = None, end: float = None,
+                         chunk_rows: int = EXPORT_CHUNK_ROWS) -> int:
+    """
+    Выгружает телеметрию БПЛА за период в файл .npz в порядке времени.
+
+    Args:
+        file: Файл, открытый на запись в двоичном режиме.
+        id (str): Идентификатор БПЛА.
+        start (float, optional): Начало периода, секунды Unix.
+        end (float, optional): Конец периода (не включается), секунды Unix.
+        chunk_rows (int): Количество строк, читаемых из базы за раз.
+
+    Returns:
+        int: Количество выгруженных строк.
+    """
+    names = [name for name, _, _ in TELEMETRY_NPZ_COLUMNS]
+    return write_telemetry_npz(file, iter_telemetry_rows(names, id, start, end, chunk_rows))
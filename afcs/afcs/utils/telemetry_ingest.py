@@ -0,0 +1,168 @@
+import time
+from collections import deque
+from threading import Condition, Thread
+
+
+class TelemetryIngestBuffer:
+    """
+    Буфер отложенной записи телеметрии (write-behind).
+
+    Измерения принимаются сразу (submit не обращается к базе), а фоновый поток
+    записывает их пакетами: когда накопилось batch_size измерений или прошло
+    flush_interval_sec с предыдущей записи. Если запись не успевает за приёмом
+    и в буфере больше max_backlog измерений, самые старые отбрасываются.
+    Пакет, который не удалось записать (например, "database is locked"),
+    возвращается в начало буфера и записывается повторно не раньше
+    чем через flush_interval_sec.
+
+    Attributes:
+        batch_size (int): Максимальное количество измерений в одной записи.
+        flush_interval_sec (float): Максимальный интервал между записями.
+        max_backlog (int): Максимальное количество измерений, ожидающих записи.
+    """
+
+    def __init__(self, app, store, batch_size: int = 1000, flush_interval_sec: float = 0.5,
+                 max_backlog: int = 200000):
+        """
+        Args:
+            app: Приложение Flask, в контексте которого выполняется запись.
+            store (callable): Запись пакета измерений, принимает список словарей
+                с параметрами telemetry_handler.
+            batch_size (int): Максимальное количество измерений в одной записи.
+            flush_interval_sec (float): Максимальный интервал между записями.
+            max_backlog (int): Максимальное количество измерений, ожидающих записи.
+        """
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval_sec = flush_interval_sec
+        self.max_backlog = max_backlog
+        self._store = store
+        # элементы - (время приёма по time.monotonic, измерение)
+        self._backlog = deque()
+        self._condition = Condition()
+        self._thread = None
+        self._stopped = False
+        # последняя запись завершилась ошибкой: повтор - по интервалу, а не по размеру буфера
+        self._failing = False
+        self._stats = dict(accepted=0, stored=0, dropped=0, failed=0, flushes=0,
+                           last_batch_size=0, max_batch_size=0,
+                           last_flush_sec=0.0, max_flush_sec=0.0,
+                           last_delay_sec=0.0, max_delay_sec=0.0)
+
+    def start(self):
+        """
+        Запускает поток записи.
+        """
+        self._stopped = False
+        self._thread = Thread(target=self._run, name='telemetry-ingest', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Останавливает поток записи, предварительно записав все принятые измерения.
+        Если база недоступна, незаписанные измерения остаются в буфере.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        while self.flush():
+            pass
+
+    def submit(self, samples: list) -> int:
+        """
+        Принимает измерения для записи.
+
+        Измерению без времени на борту (ts) присваивается время приёма,
+        чтобы задержка записи не влияла на record_time.
+
+        Args:
+            samples (list): Список словарей с параметрами telemetry_handler.
+
+        Returns:
+            int: Количество измерений, отброшенных из-за переполнения буфера.
+        """
+        now = time.monotonic()
+        received = time.time()
+        with self._condition:
+            for sample in samples:
+                if sample.get('ts') is None:
+                    sample['ts'] = received
+                self._backlog.append((now, sample))
+            dropped = max(0, len(self._backlog) - self.max_backlog)
+            for _ in range(dropped):
+                self._backlog.popleft()
+            self._stats['accepted'] += len(samples)
+            self._stats['dropped'] += dropped
+            if len(self._backlog) >= self.batch_size:
+                self._condition.notify()
+        return dropped
+
+    def flush(self) -> int:
+        """
+        Записывает в базу до batch_size самых старых измерений.
+        При ошибке записи пакет возвращается в начало буфера.
+
+        Returns:
+            int: Количество записанных измерений.
+        """
+        with self._condition:
+            batch = [self._backlog.popleft()
+                     for _ in range(min(self.batch_size, len(self._backlog)))]
+        if not batch:
+            return 0
+        start = time.monotonic()
+        try:
+            with self.app.app_context():
+                self._store([sample for _, sample in batch])
+            failed = False
+        except Exception as e:
+            print(f'Ошибка записи телеметрии ({len(batch)} измерений), повтор: {e}')
+            failed = True
+        finish = time.monotonic()
+        with self._condition:
+            self._failing = failed
+            stats = self._stats
+            if failed:
+                # пакет - самые старые измерения, поэтому при переполнении отбрасываются его первые
+                self._backlog.extendleft(reversed(batch))
+                dropped = max(0, len(self._backlog) - self.max_backlog)
+                for _ in range(dropped):
+                    self._backlog.popleft()
+                stats['dropped'] += dropped
+            stats['failed' if failed else 'stored'] += len(batch)
+            stats['flushes'] += 1
+            stats['last_batch_size'] = len(batch)
+            stats['max_batch_size'] = max(stats['max_batch_size'], len(batch))
+            stats['last_flush_sec'] = finish - start
+            stats['max_flush_sec'] = max(stats['max_flush_sec'], finish - start)
+            # задержка самого старого измерения пакета от приёма до записи
+            stats['last_delay_sec'] = finish - batch[0][0]
+            stats['max_delay_sec'] = max(stats['max_delay_sec'], finish - batch[0][0])
+        return 0 if failed else len(batch)
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику записи.
+
+        Returns:
+            dict: Счётчики измерений (accepted, stored, dropped, failed), количество записей
+                (flushes), размер пакета, длительность записи и задержка от приёма
+                до записи в секундах (последние и максимальные), а также backlog -
+                количество измерений, ожидающих записи.
+        """
+        with self._condition:
+            return dict(self._stats, backlog=len(self._backlog))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._stopped or
+                    not self._failing and len(self._backlog) >= self.batch_size,
+                    timeout=self.flush_interval_sec)
+                if self._stopped:
+                    return
+            self.flush()
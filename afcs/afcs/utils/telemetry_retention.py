@@ -0,0 +1,459 @@
+import datetime
+import heapq
+import math
+import sys
+import time
+from itertools import chain, islice
+from operator import itemgetter
+from threading import Event, Thread
+from sqlalchemy import null, text
+from afcs_server import db
+import models
+from utils.db_utils import iter_rows_in_chunks
+
+# Уровни хранения телеметрии: (имя модели, ширина интервала в секундах, ключ настройки хранения).
+# Ширина 0 - исходные измерения uav_telemetry. Каждое измерение в любой момент
+# находится ровно в одной таблице: сжатие переносит его в следующий уровень
+# и удаляет из предыдущего одной транзакцией.
+TELEMETRY_LEVELS = (
+    ('UavTelemetry', 0, 'raw'),
+    ('UavTelemetry1s', 1, '1s'),
+    ('UavTelemetry10s', 10, '10s'),
+    ('UavTelemetry1m', 60, '1m'),
+)
+
+# Сколько хранится каждый уровень, секунд; None - без ограничения.
+# Данные старше срока хранения уровня сводятся в следующий уровень,
+# данные старше срока хранения последнего уровня удаляются.
+DEFAULT_TELEMETRY_RETENTION_SEC = {
+    'raw': 3600,
+    '1s': 6 * 3600,
+    '10s': 7 * 86400,
+    '1m': 90 * 86400,
+}
+
+# Границы сжатия кратны самому широкому интервалу, чтобы интервалы всех уровней были полными
+_ALIGN_SEC = 60
+_TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+_STATS_FIELDS = ('lat', 'lon', 'alt', 'speed')
+# столбцы сводных уровней, выгружаемые вместо полей исходных измерений; азимут не сводится
+_ROLLUP_EXPORT_FIELDS = {'record_time': 'bucket_start', 'lat': 'lat_mean', 'lon': 'lon_mean',
+                         'alt': 'alt_mean', 'azimuth': None, 'dop': 'dop_mean', 'sats': 'sats_min',
+                         'speed': 'speed_mean'}
+
+
+def _levels() -> tuple:
+    """
+    TELEMETRY_LEVELS с классами моделей. Классы берутся из models при вызове:
+    models импортирует этот модуль через afcs_server, пока ещё не загружен
+    """
+    return tuple((getattr(models, name), width, key) for name, width, key in TELEMETRY_LEVELS)
+
+
+def _time_column(width: int) -> str:
+    return 'record_time' if width == 0 else 'bucket_start'
+
+
+def _bucket_key(column: str, width: int) -> str:
+    """
+    номер интервала шириной width секунд. julianday разбирает время быстрее strftime('%s'),
+    но в double, поэтому время округляется до миллисекунды, чтобы граница интервала не ушла в предыдущий
+    """
+    return f'CAST(ROUND((julianday({column}) - 2440587.5) * 86400000.0) AS INTEGER) / {width * 1000}'
+
+
+def _bucket(column: str, width: int) -> str:
+    """
+    начало интервала в формате хранения DateTime SQLAlchemy; при группировке по _bucket_key
+    вычисляется один раз на группу
+    """
+    return f"strftime('%Y-%m-%d %H:%M:%S.000000', ({_bucket_key(column, width)}) * {width}, 'unixepoch')"
+
+
+def _weighted_mean(column: str) -> str:
+    return f'SUM({column} * samples) / SUM(CASE WHEN {column} IS NOT NULL THEN samples END)'
+
+
+def _aggregates(source_width: int) -> list:
+    """ выражения сводных полей (в порядке столбцов UavTelemetryRollup) по таблице уровня source_width """
+    if source_width == 0:
+        columns = ['COUNT(*)']
+        for field in _STATS_FIELDS:
+            columns += [f'MIN({field})', f'MAX({field})', f'AVG({field})']
+        return columns + ['AVG(dop)', 'MIN(sats)']
+    columns = ['SUM(samples)']
+    for field in _STATS_FIELDS:
+        columns += [f'MIN({field}_min)', f'MAX({field}_max)', _weighted_mean(f'{field}_mean')]
+    return columns + [_weighted_mean('dop_mean'), 'MIN(sats_min)']
+
+
+def _rollup_columns() -> list:
+    columns = ['uav_id', 'bucket_start', 'samples']
+    for field in _STATS_FIELDS:
+        columns += [f'{field}_min', f'{field}_max', f'{field}_mean']
+    return columns + ['dop_mean', 'sats_min']
+
+
+def _merge_assignments() -> str:
+    """ объединение со строкой интервала, уже сведённого ранее (измерения, пришедшие с опозданием) """
+    def extreme(func, column):
+        return f'{column} = {func}(COALESCE({column}, excluded.{column}), ' \
+               f'COALESCE(excluded.{column}, {column}))'
+
+    def mean(column):
+        weight = f'(CASE WHEN {column} IS NOT NULL THEN samples ELSE 0 END + ' \
+                 f'CASE WHEN excluded.{column} IS NOT NULL THEN excluded.samples ELSE 0 END)'
+        return f'{column} = (COALESCE({column} * samples, 0) + ' \
+               f'COALESCE(excluded.{column} * excluded.samples, 0)) / NULLIF({weight}, 0)'
+
+    assignments = ['samples = samples + excluded.samples']
+    for field in _STATS_FIELDS:
+        assignments += [extreme('MIN', f'{field}_min'), extreme('MAX', f'{field}_max'),
+                        mean(f'{field}_mean')]
+    assignments += [mean('dop_mean'), extreme('MIN', 'sats_min')]
+    return ', '.join(assignments)
+
+
+def _format_time(value: datetime.datetime) -> str:
+    return value.strftime(_TIME_FORMAT)
+
+
+def _align(value: datetime.datetime, step_sec: int) -> datetime.datetime:
+    seconds = math.floor((value - datetime.datetime(1970, 1, 1)).total_seconds() / step_sec) * step_sec
+    return datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=seconds)
+
+
+class TelemetryRetention:
+    """
+    Фоновое обслуживание телеметрии: исходные измерения старше срока хранения
+    сводятся в интервалы по 1 с, затем по 10 с и по 1 мин (минимум, максимум,
+    среднее), а данные старше срока хранения последнего уровня удаляются.
+    Сжатие выполняется частями по chunk_sec, каждая часть - отдельной транзакцией,
+    чтобы не блокировать запись телеметрии надолго.
+
+    Attributes:
+        retention_sec (dict): Срок хранения каждого уровня (ключи как в DEFAULT_TELEMETRY_RETENTION_SEC).
+        interval_sec (float): Интервал между запусками обслуживания.
+        chunk_sec (int): Длительность телеметрии, сжимаемой одной транзакцией.
+    """
+
+    def __init__(self, app, retention_sec: dict = None, interval_sec: float = 60,
+                 chunk_sec: int = 600):
+        """
+        Args:
+            app: Приложение Flask, в контексте которого выполняется обслуживание.
+            retention_sec (dict, optional): Сроки хранения уровней, по умолчанию
+                DEFAULT_TELEMETRY_RETENTION_SEC.
+            interval_sec (float): Интервал между запусками обслуживания.
+            chunk_sec (int): Длительность телеметрии, сжимаемой одной транзакцией.
+
+        Raises:
+            ValueError: Если срок хранения уровня больше срока хранения следующего, более грубого уровня.
+        """
+        self.app = app
+        self.retention_sec = dict(DEFAULT_TELEMETRY_RETENTION_SEC, **(retention_sec or {}))
+        retention = [self.retention_sec[key] for _, _, key in TELEMETRY_LEVELS]
+        if any(finer is None or (coarser is not None and finer > coarser)
+               for finer, coarser in zip(retention, retention[1:])):
+            raise ValueError(f'Сроки хранения уровней телеметрии должны не убывать: {self.retention_sec}')
+        self.interval_sec = interval_sec
+        self.chunk_sec = max(_ALIGN_SEC, chunk_sec // _ALIGN_SEC * _ALIGN_SEC)
+        self._stop_event = Event()
+        self._thread = None
+        self._stats = dict(runs=0, failed_runs=0, compacted={}, deleted=0, last_run_sec=0.0)
+
+    def start(self):
+        """
+        Запускает поток обслуживания.
+        """
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, name='telemetry-retention', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Останавливает поток обслуживания.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику обслуживания.
+
+        Returns:
+            dict: Количество запусков (runs, failed_runs), количество сжатых строк
+                по уровням-источникам (compacted), количество удалённых строк
+                последнего уровня (deleted), длительность последнего запуска.
+        """
+        return dict(self._stats, compacted=dict(self._stats['compacted']))
+
+    def run_once(self, now: datetime.datetime = None):
+        """
+        Выполняет обслуживание: сжимает все уровни и удаляет устаревшие сводные данные.
+
+        Args:
+            now (datetime, optional): Текущее время UTC, по умолчанию datetime.utcnow().
+        """
+        now = now or datetime.datetime.utcnow()
+        start = time.monotonic()
+        with self.app.app_context():
+            levels = _levels()
+            for (source, source_width, key), (target, target_width, _) in zip(levels, levels[1:]):
+                cutoff = _align(now - datetime.timedelta(seconds=self.retention_sec[key]), _ALIGN_SEC)
+                compacted = self._compact(source, source_width, target, target_width, cutoff)
+                self._stats['compacted'][key] = self._stats['compacted'].get(key, 0) + compacted
+            last, _, key = levels[-1]
+            if self.retention_sec[key] is not None:
+                cutoff = now - datetime.timedelta(seconds=self.retention_sec[key])
+                deleted = db.session.execute(
+                    text(f'DELETE FROM {last.__tablename__} WHERE bucket_start < :cutoff'),
+                    {'cutoff': _format_time(cutoff)}).rowcount
+                db.session.commit()
+                self._stats['deleted'] += deleted
+        self._stats['runs'] += 1
+        self._stats['last_run_sec'] = time.monotonic() - start
+
+    def _compact(self, source, source_width: int, target, target_width: int,
+                 cutoff: datetime.datetime) -> int:
+        """ сводит строки source старше cutoff в target частями по chunk_sec """
+        time_column = _time_column(source_width)
+        oldest = db.session.execute(
+            text(f'SELECT MIN({time_column}) FROM {source.__tablename__} WHERE {time_column} < :cutoff'),
+            {'cutoff': _format_time(cutoff)}).scalar()
+        if oldest is None:
+            db.session.rollback()
+            return 0
+        columns = ', '.join(_rollup_columns())
+        aggregates = ', '.join(_aggregates(source_width))
+        insert = text(
+            f'INSERT INTO {target.__tablename__} ({columns}) '
+            f'SELECT uav_id, {_bucket(time_column, target_width)}, {aggregates} '
+            f'FROM {source.__tablename__} WHERE {time_column} >= :start AND {time_column} < :end '
+            f'GROUP BY uav_id, {_bucket_key(time_column, target_width)} '
+            f'ON CONFLICT (uav_id, bucket_start) DO UPDATE SET {_merge_assignments()}')
+        delete = text(f'DELETE FROM {source.__tablename__} '
+                      f'WHERE {time_column} >= :start AND {time_column} < :end')
+        compacted = 0
+        chunk_start = _align(datetime.datetime.fromisoformat(oldest), _ALIGN_SEC)
+        while chunk_start < cutoff:
+            chunk_end = min(cutoff, chunk_start + datetime.timedelta(seconds=self.chunk_sec))
+            bounds = {'start': _format_time(chunk_start), 'end': _format_time(chunk_end)}
+            try:
+                db.session.execute(insert, bounds)
+                compacted += db.session.execute(delete, bounds).rowcount
+                db.session.commit()
+            except:
+                db.session.rollback()
+                raise
+            chunk_start = chunk_end
+        return compacted
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_sec):
+            try:
+                self.run_once()
+            except Exception as e:
+                # например, другой процесс сервера одновременно обслуживает ту же базу
+                self._stats['failed_runs'] += 1
+                print(f'Ошибка обслуживания телеметрии: {e}', file=sys.stderr)
+
+
+def _history_query(source, source_width: int, width: int, limit: int = None) -> str:
+    """
+    запрос истории из таблицы уровня source_width с интервалами шириной width
+    (0 - исходные измерения), не более limit первых строк
+    """
+    time_column = _time_column(source_width)
+    where = f'WHERE uav_id = :uav_id AND {time_column} >= :start AND {time_column} < :end'
+    suffix = '' if limit is None else f' LIMIT {int(limit)}'
+    if source_width == 0 and width == 0:
+        select = 'record_time, 1, lat, lat, lat, lon, lon, lon, alt, alt, alt, ' \
+                 'speed, speed, speed, dop, sats'
+        return f'SELECT {select} FROM {source.__tablename__} {where} ORDER BY record_time{suffix}'
+    if source_width == width:
+        return f'SELECT {", ".join(_rollup_columns()[1:])} FROM {source.__tablename__} ' \
+               f'{where} ORDER BY bucket_start{suffix}'
+    key = _bucket_key(time_column, width)
+    return f'SELECT {_bucket(time_column, width)}, {", ".join(_aggregates(source_width))} ' \
+           f'FROM {source.__tablename__} {where} GROUP BY {key} ORDER BY {key}{suffix}'
+
+
+def _history_row(row) -> dict:
+    names = _rollup_columns()[1:]
+    values = dict(zip(names, row))
+    return dict(time=datetime.datetime.fromisoformat(values['bucket_start']),
+                samples=values['samples'],
+                lat=values['lat_mean'], lon=values['lon_mean'],
+                alt=values['alt_mean'], alt_min=values['alt_min'], alt_max=values['alt_max'],
+                speed=values['speed_mean'], speed_min=values['speed_min'],
+                speed_max=values['speed_max'],
+                dop=values['dop_mean'], sats=values['sats_min'])
+
+
+def _merge_history_rows(first: dict, second: dict) -> dict:
+    samples = first['samples'] + second['samples']
+    merged = dict(first, samples=samples)
+    for field in ('lat', 'lon', 'alt', 'speed', 'dop'):
+        values = [(row[field], row['samples']) for row in (first, second) if row[field] is not None]
+        weight = sum(count for _, count in values)
+        merged[field] = sum(value * count for value, count in values) / weight if weight else None
+    for field, func in (('alt_min', min), ('speed_min', min), ('sats', min),
+                        ('alt_max', max), ('speed_max', max)):
+        values = [row[field] for row in (first, second) if row[field] is not None]
+        merged[field] = func(values) if values else None
+    return merged
+
+
+def _bucket_count(start: datetime.datetime, end: datetime.datetime, width: int) -> int:
+    """ количество интервалов шириной width секунд, пересекающих период [start, end) """
+    first = math.floor(start.replace(tzinfo=datetime.timezone.utc).timestamp())
+    last = math.ceil(end.replace(tzinfo=datetime.timezone.utc).timestamp()) - 1
+    return max(0, last // width - first // width + 1)
+
+
+def select_telemetry_resolution(uav_id: str, start: datetime.datetime, end: datetime.datetime,
+                                max_points: int = None) -> int:
+    """
+    Выбирает ширину интервала для истории телеметрии: самую мелкую, при которой
+    количество точек не превышает max_points.
+
+    Args:
+        uav_id (str): Идентификатор БПЛА.
+        start (datetime): Начало периода (UTC).
+        end (datetime): Конец периода (UTC), не включается.
+        max_points (int, optional): Максимальное количество точек, None - без ограничения.
+
+    Returns:
+        int: Ширина интервала в секундах, 0 - исходные измерения.
+    """
+    if max_points is None:
+        return 0
+    bounds = {'uav_id': uav_id, 'start': _format_time(start), 'end': _format_time(end)}
+    stored = sum(
+        db.session.execute(text(
+            f'SELECT COUNT(*) FROM {model.__tablename__} WHERE uav_id = :uav_id '
+            f'AND {_time_column(width)} >= :start AND {_time_column(width)} < :end'), bounds).scalar()
+        for model, width, _ in _levels())
+    if stored <= max_points:
+        return 0
+    for _, width, _ in TELEMETRY_LEVELS[1:]:
+        if _bucket_count(start, end, width) <= max_points:
+            return width
+    span = (end - start).total_seconds()
+    width = _ALIGN_SEC * math.ceil(span / (_ALIGN_SEC * max_points))
+    # интервалы выровнены на начало эпохи, поэтому период может захватить на один интервал больше
+    while _bucket_count(start, end, width) > max_points:
+        width += _ALIGN_SEC
+    return width
+
+
+def query_telemetry_history(uav_id: str, start: datetime.datetime, end: datetime.datetime,
+                            max_points: int = None) -> tuple:
+    """
+    Возвращает историю телеметрии БПЛА за период, объединяя исходные измерения
+    и сводные уровни. Разрешение выбирается автоматически (select_telemetry_resolution);
+    данные уровня, более грубого, чем выбранное разрешение, возвращаются с разрешением уровня.
+
+    Args:
+        uav_id (str): Идентификатор БПЛА.
+        start (datetime): Начало периода (UTC).
+        end (datetime): Конец периода (UTC), не включается.
+        max_points (int, optional): Максимальное количество точек, None - без ограничения.
+
+    Returns:
+        tuple: Ширина интервала в секундах (0 - исходные измерения) и список словарей
+            time, samples, lat, lon, alt, alt_min, alt_max, speed, speed_min, speed_max, dop, sats,
+            упорядоченный по времени.
+    """
+    width = select_telemetry_resolution(uav_id, start, end, max_points)
+    rows, _ = query_telemetry_page(uav_id, start, end, width)
+    return width, rows
+
+
+def query_telemetry_page(uav_id: str, start: datetime.datetime, end: datetime.datetime,
+                         width: int, limit: int = None) -> tuple:
+    """
+    Возвращает первые limit точек истории телеметрии БПЛА за период с заданным разрешением.
+    Каждая таблица читается с LIMIT, поэтому страница не требует чтения всего периода
+    (кроме группировки исходных измерений в интервалы, которая выполняется в SQL).
+
+    Args:
+        uav_id (str): Идентификатор БПЛА.
+        start (datetime): Начало периода (UTC).
+        end (datetime): Конец периода (UTC), не включается.
+        width (int): Ширина интервала в секундах, 0 - исходные измерения.
+        limit (int, optional): Максимальное количество точек, None - без ограничения.
+
+    Returns:
+        tuple: Список точек (как в query_telemetry_history) и время первой
+            не вошедшей точки - начало следующей страницы, None, если точек больше нет.
+    """
+    bounds = {'uav_id': uav_id, 'start': _format_time(start), 'end': _format_time(end)}
+    rows = {}
+    for model, source_width, _ in _levels():
+        # первые limit + 1 различных точек объединения есть среди первых limit + 1 точек каждой таблицы
+        query = _history_query(model, source_width, max(width, source_width),
+                               None if limit is None else limit + 1)
+        for row in db.session.execute(text(query), bounds):
+            history_row = _history_row(row)
+            key = history_row['time']
+            rows[key] = _merge_history_rows(rows[key], history_row) if key in rows else history_row
+    keys = sorted(rows)
+    if limit is not None and len(keys) > limit:
+        return [rows[key] for key in keys[:limit]], keys[limit]
+    return [rows[key] for key in keys], None
+
+
+def _export_stream(model, width: int, names: tuple, id: str, start: float, end: float,
+                   chunk_rows: int):
+    """ порции строк таблицы уровня width для выгрузки, в порядке времени """
+    time_field = getattr(model, _time_column(width))
+    if width == 0:
+        columns = [getattr(model, name) for name in names]
+    else:
+        columns = [null() if _ROLLUP_EXPORT_FIELDS[name] is None else getattr(model, _ROLLUP_EXPORT_FIELDS[name])
+                   for name in names]
+    condition = model.uav_id == id
+    if start is not None:
+        condition &= time_field >= datetime.datetime.utcfromtimestamp(start)
+    if end is not None:
+        condition &= time_field < datetime.datetime.utcfromtimestamp(end)
+    return iter_rows_in_chunks(columns, condition, time_field.asc(), chunk_rows)
+
+
+def iter_telemetry_rows(names: tuple, id: str, start: float = None, end: float = None,
+                        chunk_rows: int = 1000):
+    """
+    Читает телеметрию БПЛА за период для выгрузки порциями, в порядке времени, из всех уровней
+    хранения: период, уже сжатый TelemetryRetention, выгружается строками сводных уровней
+    (время начала интервала, средние значения, минимальное количество спутников, азимут None).
+
+    Args:
+        names (tuple): Поля исходных измерений UavTelemetry, первое - record_time.
+        id (str): Идентификатор БПЛА.
+        start (float, optional): Начало периода, секунды Unix.
+        end (float, optional): Конец периода (не включается), секунды Unix.
+        chunk_rows (int): Количество строк в порции.
+
+    Returns:
+        Iterator[list]: Порции строк - кортежей значений полей names.
+    """
+    streams = []
+    for model, width, _ in _levels():
+        stream = _export_stream(model, width, names, id, start, end, chunk_rows)
+        first = next(stream, None)
+        if first is not None:
+            streams.append(chain([first], stream))
+    if len(streams) == 1:
+        # обычный случай - данные только в одном уровне, порции передаются без слияния
+        yield from streams[0]
+        return
+    rows = heapq.merge(*(chain.from_iterable(stream) for stream in streams), key=itemgetter(0))
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return
+        yield chunk
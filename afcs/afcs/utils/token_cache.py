@@ -0,0 +1,159 @@
+""" кэш проверки токенов администратора
+
+Каждый запрос администратора (authorized_request) проверяет токен доступа,
+а страница администратора опрашивает сервер постоянно, из каждой открытой вкладки.
+Кэш хранит результат проверки токена в памяти процесса не дольше max_age_sec
+и обращается к базе только при промахе.
+
+Как и кэш состояния БПЛА (utils.uav_state_cache), кэш каждого процесса mod_wsgi
+проверяется по общему поколению в файле, отображённом в память. Любое изменение
+пользователей через сессию SQLAlchemy (в том числе массовые update и delete)
+после фиксации транзакции увеличивает поколение, и все процессы
+проверяют токены заново.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
+from threading import Lock
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import models
+from utils.db_utils import entity_exists
+
+_GENERATION = struct.Struct('<Q')
+# ключ session.info: в транзакции изменены пользователи
+_CHANGED_KEY = 'token_cache_changed'
+
+
+class TokenCache:
+    """
+    Кэш результатов проверки токенов доступа.
+
+    Attributes:
+        path (str): Файл поколения, общий для процессов сервера.
+        max_age_sec (float): Наибольший возраст результата проверки.
+        max_entries (int): Наибольшее количество токенов в памяти процесса.
+    """
+
+    def __init__(self, path: str, max_age_sec: float = 30, max_entries: int = 1024):
+        """
+        Args:
+            path (str): Файл поколения, создаётся при необходимости.
+            max_age_sec (float): Наибольший возраст результата проверки.
+            max_entries (int): Наибольшее количество токенов в памяти процесса.
+        """
+        self.path = path
+        self.max_age_sec = max_age_sec
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        with self._file_lock():
+            if os.fstat(self._fd).st_size < _GENERATION.size:
+                os.ftruncate(self._fd, _GENERATION.size)
+        self._map = mmap.mmap(self._fd, _GENERATION.size)
+        self._lock = Lock()
+        # токен -> (поколение, время проверки, результат)
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def _file_lock(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def check(self, token: str) -> bool:
+        """
+        Проверяет, что токен принадлежит пользователю, обращаясь к базе только при промахе.
+
+        Args:
+            token (str): Токен для проверки.
+
+        Returns:
+            bool: True, если токен валиден, иначе False.
+        """
+        generation = _GENERATION.unpack_from(self._map, 0)[0]
+        entry = self._entries.get(token)
+        now = time.monotonic()
+        if entry is not None and entry[0] == generation and now - entry[1] < self.max_age_sec:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        valid = entity_exists(models.User, models.User.access_token, token)
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+        self._entries[token] = (generation, now, valid)
+        return valid
+
+    def invalidate(self):
+        """
+        Делает устаревшими результаты проверки во всех процессах сервера.
+        Вызывается после фиксации изменений пользователей.
+        """
+        with self._lock, self._file_lock():
+            _GENERATION.pack_into(self._map, 0, _GENERATION.unpack_from(self._map, 0)[0] + 1)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Количество попаданий (hits), промахов (misses) и токенов в памяти процесса (entries).
+        """
+        return dict(hits=self.hits, misses=self.misses, entries=len(self._entries))
+
+    def close(self):
+        """
+        Освобождает файл поколения.
+        """
+        self._map.close()
+        os.close(self._fd)
+
+
+def check_token_cached(token: str) -> bool:
+    """
+    Проверяет токен через кэш приложения, а если кэша нет (например, в тестах) - по базе.
+
+    Args:
+        token (str): Токен для проверки.
+
+    Returns:
+        bool: True, если токен валиден, иначе False.
+    """
+    cache = current_app.extensions.get('token_cache')
+    if cache is None:
+        return entity_exists(models.User, models.User.access_token, token)
+    return cache.check(token)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flushed_users(session, flush_context):
+    if any(isinstance(entity, models.User) for entity in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_statements(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and \
+            any(mapper.class_ is models.User for mapper in orm_execute_state.all_mappers):
+        orm_execute_state.session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_users(session):
+    if not session.info.pop(_CHANGED_KEY, False):
+        return
+    cache = current_app.extensions.get('token_cache') if current_app else None
+    if cache is not None:
+        cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_users(session):
+    session.info.pop(_CHANGED_KEY, None)
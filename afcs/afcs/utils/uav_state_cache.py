@@ -0,0 +1,227 @@
+""" кэш состояния БПЛА для запросов, которые БПЛА выполняют постоянно
+
+Запросы БПЛА (flight_info, kill_switch, fly_accept, arm, get_delay, get_state)
+и проверка их подписей читают строки Uav и UavPublicKeys по идентификатору БПЛА.
+Кэш хранит снимки этих строк (неизменяемые namedtuple, а не объекты ORM)
+в памяти процесса и читает базу только при промахе.
+
+Сервер работает в нескольких процессах mod_wsgi, поэтому кэш каждого процесса
+проверяется по общему файлу поколений, отображённому в память: счётчик
+на группу идентификаторов (по crc32) и общий счётчик. Любое изменение
+отслеживаемых моделей через сессию SQLAlchemy (в том числе массовые update
+и delete) после фиксации транзакции увеличивает счётчик, и все процессы
+перечитывают затронутые строки при следующем обращении. Проверка поколения -
+чтение 16 байт памяти, без обращения к базе и без системных вызовов.
+Поколение читается до чтения базы, а увеличивается после фиксации,
+поэтому снимок, прочитанный во время изменения, не переживёт следующего запроса.
+
+Изменения в обход сессии (другой программой) кэш не видит, поэтому снимки
+также устаревают через max_age_sec.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import time
+import zlib
+from collections import namedtuple
+from contextlib import contextmanager
+from threading import Lock
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import models
+from utils.db_utils import get_entity_by_key
+
+# отслеживаемые модели; классы берутся из models при вызове, потому что
+# models импортирует этот модуль через afcs_server, пока ещё не загружен
+TRACKED_MODELS = ('Uav', 'UavPublicKeys')
+
+_GENERATION = struct.Struct('<Q')
+# ключ session.info: идентификаторы изменённых в транзакции БПЛА, ALL_UAVS - все
+_CHANGED_KEY = 'uav_state_cache_changed'
+ALL_UAVS = None
+
+
+class UavStateCache:
+    """
+    Кэш снимков строк TRACKED_MODELS по идентификатору БПЛА.
+
+    Attributes:
+        path (str): Файл поколений, общий для процессов сервера.
+        slots (int): Количество групп идентификаторов в файле поколений.
+        max_age_sec (float): Наибольший возраст снимка.
+        max_entries (int): Наибольшее количество снимков в памяти процесса.
+    """
+
+    def __init__(self, path: str, slots: int = 4096, max_age_sec: float = 60,
+                 max_entries: int = 10000):
+        """
+        Args:
+            path (str): Файл поколений, создаётся при необходимости.
+            slots (int): Количество групп идентификаторов в файле поколений.
+            max_age_sec (float): Наибольший возраст снимка.
+            max_entries (int): Наибольшее количество снимков в памяти процесса.
+        """
+        self.path = path
+        self.slots = slots
+        self.max_age_sec = max_age_sec
+        self.max_entries = max_entries
+        size = (slots + 1) * _GENERATION.size
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        with self._file_lock():
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._lock = Lock()
+        # (таблица, идентификатор) -> (поколение, время чтения, снимок или None)
+        self._entries = {}
+        self._snapshot_types = {}
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def _file_lock(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _slot(self, id: str) -> int:
+        return 1 + zlib.crc32(str(id).encode()) % self.slots
+
+    def _generation(self, slot: int) -> tuple:
+        return (_GENERATION.unpack_from(self._map, 0)[0],
+                _GENERATION.unpack_from(self._map, slot * _GENERATION.size)[0])
+
+    def _snapshot(self, model, entity):
+        snapshot_type = self._snapshot_types.get(model)
+        if snapshot_type is None:
+            snapshot_type = namedtuple(f'{model.__name__}State',
+                                       [column.key for column in model.__mapper__.column_attrs])
+            self._snapshot_types[model] = snapshot_type
+        return snapshot_type(*(getattr(entity, name) for name in snapshot_type._fields))
+
+    def get(self, model, id: str):
+        """
+        Возвращает снимок строки модели по идентификатору БПЛА, читая базу только при промахе.
+
+        Args:
+            model: Модель из TRACKED_MODELS.
+            id (str): Идентификатор БПЛА (первичный ключ модели).
+
+        Returns:
+            namedtuple: Снимок с полями столбцов модели или None, если строки нет.
+        """
+        generation = self._generation(self._slot(id))
+        key = (model.__tablename__, id)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and entry[0] == generation and now - entry[1] < self.max_age_sec:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        entity = get_entity_by_key(model, id)
+        snapshot = None if entity is None else self._snapshot(model, entity)
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+        self._entries[key] = (generation, now, snapshot)
+        return snapshot
+
+    def invalidate(self, ids):
+        """
+        Делает устаревшими снимки БПЛА во всех процессах сервера.
+        Вызывается после фиксации изменений.
+
+        Args:
+            ids: Идентификаторы БПЛА или ALL_UAVS.
+        """
+        slots = [0] if ids is ALL_UAVS else sorted({self._slot(id) for id in ids})
+        with self._lock, self._file_lock():
+            for slot in slots:
+                offset = slot * _GENERATION.size
+                _GENERATION.pack_into(self._map, offset, _GENERATION.unpack_from(self._map, offset)[0] + 1)
+        if ids is ALL_UAVS:
+            self._entries.clear()
+        else:
+            for id in ids:
+                for model in _tracked_models():
+                    self._entries.pop((model.__tablename__, id), None)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Количество попаданий (hits), промахов (misses) и снимков в памяти процесса (entries).
+        """
+        return dict(hits=self.hits, misses=self.misses, entries=len(self._entries))
+
+    def close(self):
+        """
+        Освобождает файл поколений.
+        """
+        self._map.close()
+        os.close(self._fd)
+
+
+def get_cached_entity(model, id: str):
+    """
+    Возвращает снимок строки Uav или UavPublicKeys через кэш приложения,
+    а если кэша нет (например, в тестах) - строку из базы.
+
+    Args:
+        model: Модель из TRACKED_MODELS.
+        id (str): Идентификатор БПЛА.
+
+    Returns:
+        Снимок или объект модели с теми же полями, None, если строки нет.
+    """
+    cache = current_app.extensions.get('uav_state_cache')
+    if cache is None:
+        return get_entity_by_key(model, id)
+    return cache.get(model, id)
+
+
+def _tracked_models() -> tuple:
+    return tuple(getattr(models, name) for name in TRACKED_MODELS)
+
+
+def _mark_changed(session, ids):
+    changed = session.info.get(_CHANGED_KEY, set())
+    if ids is ALL_UAVS or changed is ALL_UAVS:
+        session.info[_CHANGED_KEY] = ALL_UAVS
+    else:
+        session.info[_CHANGED_KEY] = changed | set(ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flushed_uavs(session, flush_context):
+    tracked = _tracked_models()
+    ids = [entity.uav_id if isinstance(entity, models.UavPublicKeys) else entity.id
+           for entity in (*session.new, *session.dirty, *session.deleted)
+           if isinstance(entity, tracked)]
+    if ids:
+        _mark_changed(session, ids)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_statements(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and \
+            any(mapper.class_ in _tracked_models() for mapper in orm_execute_state.all_mappers):
+        _mark_changed(orm_execute_state.session, ALL_UAVS)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_uavs(session):
+    if _CHANGED_KEY not in session.info:
+        return
+    ids = session.info.pop(_CHANGED_KEY)
+    cache = current_app.extensions.get('uav_state_cache') if current_app else None
+    if cache is not None:
+        cache.invalidate(ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_uavs(session):
+    session.info.pop(_CHANGED_KEY, None)
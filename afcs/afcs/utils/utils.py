@@ -1,15 +1,21 @@
+import datetime
 import math
 import os, sys
 import time
 import json
 import ast
 import csv
+import zlib
 from io import StringIO
 from hashlib import sha256
 from Cryptodome import Random
 from Cryptodome.PublicKey import RSA
 from models import *
 from utils.db_utils import *
+from utils.uav_state_cache import get_cached_entity
+from utils.wpl_codec import MAV_CMD_DO_SET_SERVO, MAV_CMD_NAV_LAND, MAV_CMD_NAV_TAKEOFF, \
+    MAV_CMD_NAV_WAYPOINT, WPL_NON_ZERO_DELAY_WAYPOINT, WPL_UNKNOWN_COMMAND, \
+    WPL_UNSUPPORTED_VERSION, WPL_WRONG_DELAY, WPLError, decode_wpl
 
 
 AFCS_KEY_SIZE = 1024
@@ -37,6 +43,8 @@ class MissionVerificationStatus:
     NON_ZERO_DELAY_WAYPOINT = 'Error: The mission contains a waypoint with non-zero delay.'
     WRONG_DELAY = 'Error: Delay in the mission can contain only one parameter (delay in seconds).'
     UNKNOWN_COMMAND = 'Error: The mission contains an unknown command. Allowed commands: 16, 21, 22, 93, 183.'
+    UNKNOWN_BASE_VERSION = 'Error: The mission delta refers to an unknown mission version.'
+    VERSION_MISMATCH = 'Error: The mission does not match its version.'
     
 
 
@@ -69,9 +77,17 @@ def parse_mission(mission: str) -> list:
     return cmds
 
 
+_WPL_VERIFICATION_STATUSES = {
+    WPL_UNKNOWN_COMMAND: MissionVerificationStatus.UNKNOWN_COMMAND,
+    WPL_NON_ZERO_DELAY_WAYPOINT: MissionVerificationStatus.NON_ZERO_DELAY_WAYPOINT,
+    WPL_WRONG_DELAY: MissionVerificationStatus.WRONG_DELAY,
+}
+
+
 def read_mission(file_str: str) -> tuple[list | None, str]:
     """
     Читает миссию из строки файла и преобразует её в список команд.
+    Разбор и проверка выполняются общим с бортовой частью кодеком utils.wpl_codec.
 
     Args:
         file_str (str): Содержимое файла миссии.
@@ -81,59 +97,83 @@ def read_mission(file_str: str) -> tuple[list | None, str]:
 
     Raises:
         Exception: Если файл не поддерживается версией WP.
+        WPLError: Если строка миссии не разбирается.
     """
-    missionlist=[]
-    split_str = '\r\n' if '\r' in file_str else '\n'
-    for i, line in enumerate(file_str.split(split_str)):
-        if line == '':
-            break
-        if i==0:
-            if not line.startswith('QGC WPL 110'):
-                raise Exception('File is not supported WP version')
-        else:
-            linearray=line.split('\t')
-            ln_index=int(linearray[0])
-            ln_currentwp=int(linearray[1])
-            ln_frame=int(linearray[2])
-            ln_command=int(linearray[3])
-            ln_param1=float(linearray[4])
-            ln_param2=float(linearray[5])
-            ln_param3=float(linearray[6])
-            ln_param4=float(linearray[7])
-            ln_param5=float(linearray[8])
-            ln_param6=float(linearray[9])
-            ln_param7=float(linearray[10])
-            #ln_autocontinue=int(linearray[11].strip())
-            
-            if ln_index == 0 and ln_currentwp == 1 and ln_frame == 0:
-                cmd = home_handler(lat=ln_param5, lon=ln_param6, alt=ln_param7)
-            elif ln_command == 22:
-                cmd = takeoff_handler(alt=ln_param7)
-            elif ln_command == 16:
-                if ln_param1 == 0.0:
-                    cmd = waypoint_handler(lat=ln_param5, lon=ln_param6, alt=ln_param7)
-                else:
-                    return None, MissionVerificationStatus.NON_ZERO_DELAY_WAYPOINT
-            elif ln_command == 183:
-                cmd = servo_handler(number=ln_param1, pwm=ln_param2)
-            elif ln_command == 21:
-                if len(missionlist) != 0 and missionlist[0][0] == 'H':
-                    drone_home = missionlist[0]
-                else:
-                    drone_home = None
-                cmd = land_handler(lat=ln_param5, lon=ln_param6, alt=ln_param7, home=drone_home)
-            elif ln_command == 93:
-                if ln_param2 == ln_param3 == ln_param4 == 0.0:
-                    cmd = delay_handler(delay=ln_param1)
-                else:
-                    return None, MissionVerificationStatus.WRONG_DELAY
+    try:
+        wpl = decode_wpl(file_str)
+    except WPLError as e:
+        if e.reason == WPL_UNSUPPORTED_VERSION:
+            raise Exception('File is not supported WP version') from e
+        if e.reason in _WPL_VERIFICATION_STATUSES:
+            return None, _WPL_VERIFICATION_STATUSES[e.reason]
+        raise
+
+    missionlist = []
+    for idx, current, frame, command, param1, param2, lat, lon, alt in zip(
+            wpl.index, wpl.current, wpl.frame, wpl.command, wpl.param1, wpl.param2,
+            wpl.latitude, wpl.longitude, wpl.altitude):
+        if idx == 0 and current == 1 and frame == 0:
+            cmd = home_handler(lat=lat, lon=lon, alt=alt)
+        elif command == MAV_CMD_NAV_TAKEOFF:
+            cmd = takeoff_handler(alt=alt)
+        elif command == MAV_CMD_NAV_WAYPOINT:
+            cmd = waypoint_handler(lat=lat, lon=lon, alt=alt)
+        elif command == MAV_CMD_DO_SET_SERVO:
+            cmd = servo_handler(number=param1, pwm=param2)
+        elif command == MAV_CMD_NAV_LAND:
+            if len(missionlist) != 0 and missionlist[0][0] == 'H':
+                drone_home = missionlist[0]
             else:
-                return None, MissionVerificationStatus.UNKNOWN_COMMAND
-            
-            missionlist.append(cmd)
+                drone_home = None
+            cmd = land_handler(lat=lat, lon=lon, alt=alt, home=drone_home)
+        else:
+            cmd = delay_handler(delay=param1)
+        missionlist.append(cmd)
     return missionlist, MissionVerificationStatus.OK
 
 
+MISSION_VERSION_LENGTH = 16
+
+
+def get_mission_version(mission_str: str) -> str:
+    """
+    Вычисляет версию миссии: начало шестнадцатеричного хеша SHA-256 её текста.
+
+    Args:
+        mission_str (str): Текст миссии в формате QGC WPL.
+
+    Returns:
+        str: Версия миссии.
+    """
+    return sha256(mission_str.encode()).hexdigest()[:MISSION_VERSION_LENGTH]
+
+
+def apply_mission_delta(mission_str: str, start: int, end: int, lines: list) -> str:
+    """
+    Применяет изменение к тексту миссии: строки [start, end) заменяются строками lines.
+    Строки считаются без заголовка и без первого поля (номера команды),
+    номера команд расставляются заново по порядку.
+
+    Args:
+        mission_str (str): Текст миссии в формате QGC WPL.
+        start (int): Номер первой заменяемой строки.
+        end (int): Номер строки после последней заменяемой.
+        lines (list): Новые строки.
+
+    Returns:
+        str: Текст изменённой миссии.
+
+    Raises:
+        ValueError: Если изменение выходит за границы миссии.
+    """
+    header, *body = mission_str.splitlines()
+    body = [line.split('\t', 1)[1] for line in body if line]
+    if not 0 <= start <= end <= len(body):
+        raise ValueError(f'Mission delta [{start}, {end}) is out of range')
+    body[start:end] = lines
+    return '\n'.join([header, *(f'{i}\t{line}' for i, line in enumerate(body))]) + '\n'
+
+
 def home_handler(lat: float, lon: float, alt: float) -> list:
     """
     Обрабатывает команду установки домашней позиции.
@@ -332,7 +372,7 @@ def get_key(key_group: str, private: bool):
     else:
         if 'kos' in key_group:
             id = key_group.split('kos')[1]
-            key = get_entity_by_key(UavPublicKeys, id)
+            key = get_cached_entity(UavPublicKeys, id)
             if key == None:
                 return -1
             n, e = int(key.n), int(key.e)
@@ -493,25 +533,82 @@ def is_point_in_polygon(point, polygon):
     return inside
 
 
-def create_csv_from_telemetry(telemetry_data):
+TELEMETRY_CSV_COLUMNS = ('record_time', 'lat', 'lon', 'alt', 'azimuth', 'dop', 'sats', 'speed')
+
+
+def encode_telemetry_cursor(width: int, time: datetime.datetime) -> str:
+    """
+    Создает курсор следующей страницы истории телеметрии.
+
+    Args:
+        width (int): Ширина интервала страниц, с.
+        time (datetime): Начало следующей страницы (UTC).
+
+    Returns:
+        str: Курсор "<ширина>:<микросекунды Unix>".
+    """
+    return f'{width}:{(time - datetime.datetime(1970, 1, 1)) // datetime.timedelta(microseconds=1)}'
+
+
+def decode_telemetry_cursor(cursor: str):
+    """
+    Разбирает курсор encode_telemetry_cursor.
+
+    Args:
+        cursor (str): Курсор.
+
+    Returns:
+        tuple: Ширина интервала и начало страницы (datetime UTC) или None, если курсор неверный.
     """
-    Создает CSV-строку из телеметрических данных.
+    try:
+        width, time = map(int, cursor.split(':'))
+        if width < 0:
+            return None
+        return width, datetime.datetime(1970, 1, 1) + datetime.timedelta(microseconds=time)
+    except (ValueError, OverflowError):
+        return None
+
+
+def iter_csv_chunks(header, row_chunks):
+    """
+    Формирует CSV по частям: заголовок, затем по одной части на порцию строк.
 
     Args:
-        telemetry_data (list): Список телеметрических данных.
+        header: Названия столбцов.
+        row_chunks: Порции строк (списки кортежей значений).
 
     Returns:
-        str: CSV-строка с телеметрическими данными.
+        Iterator[str]: Части CSV-текста.
     """
     output = StringIO()
     writer = csv.writer(output)
-    writer.writerow(['record_time', 'lat', 'lon', 'alt', 'azimuth', 'dop', 'sats', 'speed'])
+    writer.writerow(header)
+    for rows in row_chunks:
+        writer.writerows(rows)
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate()
+    if output.tell():
+        # строк нет, только заголовок
+        yield output.getvalue()
+
+
+def iter_gzip(chunks):
+    """
+    Сжимает поток текста в формат gzip по частям.
 
-    for telemetry in telemetry_data:
-        writer.writerow([telemetry.record_time, telemetry.lat, telemetry.lon, telemetry.alt, telemetry.azimuth, telemetry.dop, telemetry.sats, telemetry.speed])
+    Args:
+        chunks: Части текста.
 
-    output.seek(0)
-    return output.getvalue()
+    Returns:
+        Iterator[bytes]: Части сжатого потока.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
 
 
 def compute_forbidden_zones_delta(old_zones, new_zones):
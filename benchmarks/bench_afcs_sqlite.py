@@ -0,0 +1,133 @@
+""" замер записи и чтения базы системы мониторинга с настройками SQLite
+по умолчанию и с профилем SQLITE_PERFORMANCE_PRAGMAS
+
+Для каждого профиля создаётся база во временном каталоге и замеряются:
+запись телеметрии по одному измерению (фиксация на каждое измерение) и пакетами,
+чтение последней телеметрии и истории БПЛА, а также одновременная работа
+READERS потоков чтения и потока записи - как запросы mod_wsgi во время
+приёма телеметрии.
+
+запуск: python -m benchmarks.bench_afcs_sqlite
+"""
+import os
+import sys
+import tempfile
+from threading import Event, Thread
+from time import perf_counter, time
+
+from tests.mqtt_broker import MqttBroker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'afcs', 'afcs'))
+# pylint: disable=wrong-import-position
+from afcs_server import create_app, db  # noqa: E402
+from models import Uav, UavTelemetry  # noqa: E402
+from utils.api_handlers import get_telemetry_handler, telemetry_batch_handler, \
+    telemetry_handler  # noqa: E402
+from utils.db_utils import get_entities_by_field_with_order  # noqa: E402
+from utils.sqlite_profile import SQLITE_PERFORMANCE_PRAGMAS  # noqa: E402
+
+FLEET_SIZE = 100
+SINGLE_SAMPLES = 1000
+BATCHES = 50
+BATCH_SIZE = 1000
+READS = 2000
+READERS = 4
+CONCURRENT_SEC = 3
+
+
+def _samples(count: int, base_time: float) -> list:
+    return [dict(id=str(i % FLEET_SIZE), lat='600000000', lon='750000000', alt='100',
+                 azimuth='0', dop='1.2', sats='12', speed='30', ts=base_time + i / FLEET_SIZE)
+            for i in range(count)]
+
+
+def _rate(count: int, func) -> float:
+    start = perf_counter()
+    func()
+    return count / (perf_counter() - start)
+
+
+def _concurrent(app) -> tuple:
+    """ чтение последней телеметрии в READERS потоках во время пакетной записи """
+    stop = Event()
+    counters = {'reads': 0, 'writes': 0, 'errors': 0}
+
+    def reader(index: int):
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    get_telemetry_handler(str(index % FLEET_SIZE))
+                    counters['reads'] += 1
+                except Exception:  # pylint: disable=broad-except
+                    counters['errors'] += 1
+                    db.session.rollback()
+                index += READERS
+
+    def writer():
+        base_time = time() + 10 ** 6
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    telemetry_batch_handler(_samples(100, base_time))
+                    counters['writes'] += 100
+                except Exception:  # pylint: disable=broad-except
+                    counters['errors'] += 1
+                base_time += 1
+
+    threads = [Thread(target=reader, args=(i,)) for i in range(READERS)] + [Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    stop.wait(CONCURRENT_SEC)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return (counters['reads'] / CONCURRENT_SEC, counters['writes'] / CONCURRENT_SEC,
+            counters['errors'])
+
+
+def _run(broker: MqttBroker, name: str, pragmas: dict):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'afcs.db')}",
+            'SQLITE_PRAGMAS': pragmas,
+            'MQTT_BROKER': broker.host, 'MQTT_PORT': broker.port})
+        app.extensions['telemetry_ingest'].stop()
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([Uav(id=str(i), is_armed=False, state='В сети',
+                                    kill_switch_state=False) for i in range(FLEET_SIZE)])
+            db.session.commit()
+            base_time = time()
+            single = _rate(SINGLE_SAMPLES, lambda: [
+                telemetry_handler(**sample) for sample in _samples(SINGLE_SAMPLES, base_time)])
+            batches = [_samples(BATCH_SIZE, base_time + 10 * (i + 1)) for i in range(BATCHES)]
+            batched = _rate(BATCHES * BATCH_SIZE,
+                            lambda: [telemetry_batch_handler(batch) for batch in batches])
+            latest = _rate(READS, lambda: [get_telemetry_handler(str(i % FLEET_SIZE))
+                                           for i in range(READS)])
+            rows_per_uav = UavTelemetry.query.count() // FLEET_SIZE
+            history = _rate(FLEET_SIZE * rows_per_uav, lambda: [
+                get_entities_by_field_with_order(UavTelemetry, UavTelemetry.uav_id, str(i),
+                                                 UavTelemetry.record_time.asc()).all()
+                for i in range(FLEET_SIZE)])
+            db.session.remove()
+        reads, writes, errors = _concurrent(app)
+        with app.app_context():
+            db.engine.dispose()
+    print(f"{name}:\n"
+          f"  запись по одному: {single:.0f} измерений/с, пакетами по {BATCH_SIZE}: "
+          f"{batched:.0f} измерений/с\n"
+          f"  последняя телеметрия: {latest:.0f} запросов/с, история: {history:.0f} строк/с\n"
+          f"  одновременно ({READERS} потока чтения и запись): {reads:.0f} чтений/с, "
+          f"{writes:.0f} измерений/с, ошибок {errors}")
+
+
+def main():
+    """ точка входа """
+    with MqttBroker() as broker:
+        _run(broker, "настройки SQLite по умолчанию", {})
+        _run(broker, "SQLITE_PERFORMANCE_PRAGMAS", SQLITE_PERFORMANCE_PRAGMAS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+""" замер скорости запросов к бортовой геозоне
+
+запуск: python -m benchmarks.bench_geofence
+"""
+import random
+from time import perf_counter
+
+from src.geofence import Geofence
+
+ZONES_COUNT = 5000
+QUERIES_COUNT = 20000
+
+
+def make_zones(count: int, seed: int = 1) -> dict:
+    """ случайные квадратные зоны в районе 1 x 1 градус """
+    rnd = random.Random(seed)
+    features = []
+    for i in range(count):
+        lon, lat = 75.0 + rnd.random(), 63.0 + rnd.random()
+        size = 0.001 + rnd.random() * 0.004
+        coordinates = [[lon, lat], [lon + size, lat], [lon + size, lat + size],
+                       [lon, lat + size], [lon, lat]]
+        features.append({"type": "Feature", "properties": {"name": f"zone{i}"},
+                         "geometry": {"type": "Polygon", "coordinates": [coordinates]}})
+    return {"type": "FeatureCollection", "features": features}
+
+
+def main():
+    """ точка входа """
+    rnd = random.Random(2)
+    zones = make_zones(ZONES_COUNT)
+
+    geofence = Geofence()
+    start = perf_counter()
+    geofence.load_zones(zones)
+    print(f"загрузка {ZONES_COUNT} зон: {(perf_counter() - start) * 1e3:.1f} мс")
+
+    points = [(75.0 + rnd.random(), 63.0 + rnd.random()) for _ in range(QUERIES_COUNT)]
+    start = perf_counter()
+    hits = sum(geofence.is_point_forbidden(lon, lat) for lon, lat in points)
+    elapsed = perf_counter() - start
+    print(f"точка в зоне: {elapsed / QUERIES_COUNT * 1e6:.1f} мкс/запрос, попаданий {hits}")
+
+    segments = [((lon, lat), (lon + 0.0005, lat + 0.0005)) for lon, lat in points]
+    start = perf_counter()
+    hits = sum(geofence.is_segment_forbidden(a, b) for a, b in segments)
+    elapsed = perf_counter() - start
+    print(f"отрезок через зону: {elapsed / QUERIES_COUNT * 1e6:.1f} мкс/запрос, попаданий {hits}")
+
+    delta = make_zones(100, seed=3)
+    for zone in delta["features"]:
+        zone["properties"]["change_type"] = "added"
+        zone["properties"]["name"] += "_delta"
+    start = perf_counter()
+    geofence.apply_delta(delta)
+    print(f"дельта из 100 зон: {(perf_counter() - start) * 1e3:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+""" замер чтения последней телеметрии БПЛА при росте истории телеметрии
+
+Сравнивается прежний запрос (ORDER BY record_time DESC LIMIT 1 по uav_telemetry)
+с чтением строки uav_latest, которое выполняет get_telemetry_handler.
+
+запуск: python -m benchmarks.bench_latest_telemetry
+"""
+import os
+import sys
+import tempfile
+from time import perf_counter, time
+
+from tests.mqtt_broker import MqttBroker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'afcs', 'afcs'))
+# pylint: disable=wrong-import-position
+from afcs_server import create_app, db  # noqa: E402
+from models import Uav, UavTelemetry  # noqa: E402
+from utils.api_handlers import get_telemetry_handler, telemetry_batch_handler  # noqa: E402
+from utils.db_utils import get_entities_by_field_with_order  # noqa: E402
+
+FLEET_SIZE = 100
+HISTORY_SIZES = (10000, 100000, 1000000)
+BATCH_SIZE = 10000
+READS = 2000
+
+
+def _rate(func) -> float:
+    start = perf_counter()
+    for i in range(READS):
+        func(str(i % FLEET_SIZE))
+    return READS / (perf_counter() - start)
+
+
+def main():
+    """ точка входа """
+    with MqttBroker() as broker, tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'afcs.db')}",
+            'MQTT_BROKER': broker.host, 'MQTT_PORT': broker.port})
+        app.extensions['telemetry_ingest'].stop()
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([Uav(id=str(i), is_armed=False, state='В сети',
+                                    kill_switch_state=False) for i in range(FLEET_SIZE)])
+            db.session.commit()
+            stored = 0
+            base_time = time() - 10 ** 7
+            for size in HISTORY_SIZES:
+                while stored < size:
+                    telemetry_batch_handler([
+                        dict(id=str(i % FLEET_SIZE), lat='600000000', lon='750000000', alt='100',
+                             azimuth='0', dop='1.2', sats='12', speed='30',
+                             ts=base_time + i / FLEET_SIZE)
+                        for i in range(stored, stored + BATCH_SIZE)])
+                    stored += BATCH_SIZE
+                assert UavTelemetry.query.count() == size
+                history = _rate(lambda id: get_entities_by_field_with_order(
+                    UavTelemetry, UavTelemetry.uav_id, id,
+                    UavTelemetry.record_time.desc()).first())
+                latest = _rate(get_telemetry_handler)
+                print(f"история {size} строк: запрос по uav_telemetry {history:.0f} запросов/с, "
+                      f"get_telemetry_handler (uav_latest) {latest:.0f} запросов/с")
+
+
+if __name__ == "__main__":
+    main()
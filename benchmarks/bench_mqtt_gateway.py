@@ -0,0 +1,119 @@
+""" замер пропускной способности и задержки передачи телеметрии
+
+TelemetrySender (отдельный процесс) -> локальный брокер MQTT (tests/mqtt_broker.py)
+-> обработчик телеметрии AFCS (create_app, база SQLite во временном каталоге).
+
+Сначала в очередь отправителя сразу кладутся BURST_SAMPLES измерений и замеряется
+время до их записи в базу AFCS, затем измерения подаются с частотой PACED_RATE
+в секунду и замеряется задержка от создания измерения до его получения подписчиком.
+
+запуск: python -m benchmarks.bench_mqtt_gateway
+"""
+import os
+import sys
+import tempfile
+from statistics import median, quantiles
+from time import perf_counter, sleep, time
+
+from geopy import Point as GeoPoint
+import paho.mqtt.client as mqtt
+
+from src.config import LOG_ERROR
+from src.event_types import Event
+from src.queues_dir import QueuesDirectory
+from src.sitl_mqtt import TelemetrySender
+from src.telemetry_codec import decode
+from tests.mqtt_broker import MqttBroker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'afcs', 'afcs'))
+from afcs_server import create_app, db  # noqa: E402  pylint: disable=wrong-import-position
+from models import Uav, UavTelemetry  # noqa: E402  pylint: disable=wrong-import-position
+
+CLIENT_ID = "bench"
+BURST_SAMPLES = 20000
+PACED_RATE = 200
+PACED_SEC = 5
+TIMEOUT_SEC = 120
+
+
+def _telemetry_event(timestamp: float) -> Event:
+    return Event(source="sitl", destination="sitl.mqtt", operation="post_telemetry",
+                 parameters=GeoPoint(60.0, 75.0, 0.1),
+                 extra_parameters={"bearing": 90, "speed": 30, "timestamp": timestamp})
+
+
+def _wait_rows(app, count: int) -> bool:
+    deadline = perf_counter() + TIMEOUT_SEC
+    with app.app_context():
+        while perf_counter() < deadline:
+            if UavTelemetry.query.count() >= count:
+                return True
+            sleep(0.05)
+    return False
+
+
+def main():
+    """ точка входа """
+    with MqttBroker() as broker, tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'afcs.db')}",
+            'MQTT_BROKER': broker.host, 'MQTT_PORT': broker.port})
+        with app.app_context():
+            db.create_all()
+            db.session.add(Uav(id=CLIENT_ID, is_armed=False, state='В сети',
+                               kill_switch_state=False))
+            db.session.commit()
+
+        latencies = []
+        subscriber = mqtt.Client("bench-latency")
+        subscriber.on_message = lambda _, __, msg: latencies.extend(
+            time() - sample['ts'] for sample in decode(msg.payload))
+        subscriber.connect(broker.host, broker.port)
+        subscriber.subscribe(TelemetrySender.MQTT_TOPIC)
+        subscriber.loop_start()
+
+        queues_dir = QueuesDirectory()
+        sender = TelemetrySender(queues_dir, client_id=CLIENT_ID, log_level=LOG_ERROR)
+        sender.MQTT_BROKER = broker.host
+        sender.MQTT_PORT = broker.port
+        sender.start()
+        sleep(1)
+        events_q = queues_dir.get_queue(sender.events_q_name)
+
+        # пропускная способность
+        base_time = time() - 10 * BURST_SAMPLES
+        for i in range(BURST_SAMPLES):
+            events_q.put(_telemetry_event(base_time + i))
+        start = perf_counter()
+        messages_before = broker.received
+        ingested = _wait_rows(app, BURST_SAMPLES)
+        elapsed = perf_counter() - start
+        messages = broker.received - messages_before
+        print(f"пакет из {BURST_SAMPLES} измерений: {elapsed:.2f} с, "
+              f"{BURST_SAMPLES / elapsed:.0f} измерений/с, {messages / elapsed:.0f} сообщений/с"
+              + ("" if ingested else " (не все измерения записаны)"))
+
+        # задержка при равномерной подаче
+        latencies.clear()
+        interval = 1 / PACED_RATE
+        next_time = perf_counter()
+        for _ in range(PACED_RATE * PACED_SEC):
+            events_q.put(_telemetry_event(time()))
+            next_time += interval
+            sleep(max(0.0, next_time - perf_counter()))
+        _wait_rows(app, BURST_SAMPLES + PACED_RATE * PACED_SEC)
+        sender.stop()
+        sender.join()
+        subscriber.loop_stop()
+        subscriber.disconnect()
+
+        if len(latencies) > 1:
+            p95 = quantiles(latencies, n=20)[-1]
+            print(f"{PACED_RATE} измерений/с: задержка до подписчика медиана "
+                  f"{median(latencies) * 1e3:.0f} мс, 95% {p95 * 1e3:.0f} мс, "
+                  f"макс. {max(latencies) * 1e3:.0f} мс")
+        print(f"брокер: принято {broker.received}, доставлено {broker.delivered}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+""" замер скорости проверки запросов монитором безопасности
+
+сравнение перебора списка SecurityPolicy и скомпилированной таблицы
+на 10 000 политик
+
+запуск: python -m benchmarks.bench_policy_table
+"""
+import random
+from time import perf_counter
+
+from src.policy_table import CompiledPolicyTable
+from src.security_policy_type import SecurityPolicy
+
+POLICIES_COUNT = 10000
+REQUESTS_COUNT = 2000
+
+
+def main():
+    """ точка входа """
+    rnd = random.Random(1)
+    policies = [SecurityPolicy(source=f"src{rnd.randrange(100)}",
+                               destination=f"dst{rnd.randrange(100)}",
+                               operation=f"op{i}")
+                for i in range(POLICIES_COUNT)]
+    requests = [(p.source, p.destination, p.operation)
+                for p in rnd.sample(policies, REQUESTS_COUNT // 2)]
+    requests += [(f"src{i}", "dst0", "unknown") for i in range(REQUESTS_COUNT // 2)]
+
+    start = perf_counter()
+    table = CompiledPolicyTable(policies)
+    print(f"компиляция {POLICIES_COUNT} политик: {(perf_counter() - start) * 1e3:.1f} мс")
+
+    start = perf_counter()
+    allowed = sum(SecurityPolicy(source=s, destination=d, operation=o) in policies
+                  for s, d, o in requests)
+    elapsed = perf_counter() - start
+    print(f"список: {elapsed / REQUESTS_COUNT * 1e6:.1f} мкс/запрос, разрешено {allowed}")
+
+    start = perf_counter()
+    allowed = sum(table.is_allowed(s, d, o) for s, d, o in requests)
+    elapsed = perf_counter() - start
+    print(f"таблица: {elapsed / REQUESTS_COUNT * 1e6:.3f} мкс/запрос, разрешено {allowed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+""" замер пропускной способности монитора безопасности в зависимости от числа шардов
+
+запуск: python -m benchmarks.bench_sharded_monitor
+"""
+from multiprocessing import Process, Queue
+from time import perf_counter
+
+from src.config import LOG_ERROR
+from src.event_types import Event
+from src.queues_dir import QueuesDirectory
+from src.security_monitory import BaseSecurityMonitor
+from src.security_policy_type import SecurityPolicy
+from src.sharded_security_monitor import ShardedSecurityMonitor
+
+SOURCES_COUNT = 8
+EVENTS_PER_SOURCE = 5000
+DESTINATION = "sink"
+
+
+class BenchSecurityMonitor(BaseSecurityMonitor):
+    """ монитор, разрешающий все события источников source0..sourceN """
+    log_level = LOG_ERROR
+
+    def __init__(self, queues_dir):
+        super().__init__(queues_dir)
+        self._recalc_interval_sec = 0.01
+        self.set_security_policies([
+            SecurityPolicy(source=f"source{i}", destination=DESTINATION, operation="ping")
+            for i in range(SOURCES_COUNT)])
+
+    def _check_event(self, event: Event):
+        return self._is_authorized(event)
+
+
+def produce(monitor_q, source: str):
+    """ отправка событий от имени одного источника """
+    for i in range(EVENTS_PER_SOURCE):
+        monitor_q.put(Event(source=source, destination=DESTINATION,
+                            operation="ping", parameters=i))
+
+
+def run(shards: int) -> float:
+    """ прогон с заданным числом шардов, возвращает событий в секунду """
+    QueuesDirectory.log_level = LOG_ERROR
+    queues_dir = QueuesDirectory()
+    sink_q = Queue()
+    queues_dir.register(sink_q, DESTINATION)
+    monitor = ShardedSecurityMonitor(BenchSecurityMonitor, queues_dir,
+                                     shards=shards, log_level=LOG_ERROR)
+    monitor.start()
+
+    monitor_q = queues_dir.get_queue("security")
+    producers = [Process(target=produce, args=(monitor_q, f"source{i}"))
+                 for i in range(SOURCES_COUNT)]
+    total = SOURCES_COUNT * EVENTS_PER_SOURCE
+    start = perf_counter()
+    for producer in producers:
+        producer.start()
+    for _ in range(total):
+        sink_q.get()
+    elapsed = perf_counter() - start
+
+    for producer in producers:
+        producer.join()
+    monitor.stop()
+    monitor.join()
+    return total / elapsed
+
+
+def main():
+    """ точка входа """
+    for shards in (1, 2, 4):
+        print(f"шардов {shards}: {run(shards):.0f} событий/с")
+
+
+if __name__ == "__main__":
+    main()
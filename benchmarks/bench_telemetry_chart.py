@@ -0,0 +1,84 @@
+""" замер запроса графика телеметрии /logs/get_telemetry_chart
+
+Для полёта разной длины измеряются время ответа и размер ответа за весь
+полёт и за последние 10 минут, в сравнении с размером полной выгрузки CSV,
+а затем - после сжатия истории TelemetryRetention со сроками по умолчанию.
+
+запуск: python -m benchmarks.bench_telemetry_chart
+"""
+import datetime
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+from tests.mqtt_broker import MqttBroker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'afcs', 'afcs'))
+# pylint: disable=wrong-import-position
+from afcs_server import create_app, db  # noqa: E402
+from models import Uav  # noqa: E402
+from utils.api_handlers import telemetry_batch_handler  # noqa: E402
+
+HISTORY_SIZES = (100000, 1000000)
+RATE_HZ = 10
+BATCH_SIZE = 10000
+START = 1699999980
+REPEATS = 5
+
+
+def _get(client, url: str) -> tuple:
+    start = perf_counter()
+    for _ in range(REPEATS):
+        response = client.get(url)
+        length = len(response.get_data())
+        # потоковый ответ держит контекст запроса до закрытия, как в сервере WSGI
+        response.close()
+    assert response.status_code == 200
+    return (perf_counter() - start) / REPEATS, length
+
+
+def main():
+    """ точка входа """
+    with MqttBroker() as broker, tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'afcs.db')}",
+            'MQTT_BROKER': broker.host, 'MQTT_PORT': broker.port,
+            'TELEMETRY_RETENTION_INTERVAL_SEC': 0})
+        app.extensions['telemetry_ingest'].stop()
+        client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            db.session.add(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+            db.session.commit()
+        stored = 0
+        for size in HISTORY_SIZES:
+            with app.app_context():
+                while stored < size:
+                    telemetry_batch_handler([
+                        dict(id='1', lat=str(600000000 + i), lon='750000000',
+                             alt=str(10000 + i % 700), azimuth='0', dop='1.2', sats='12',
+                             speed=str(i % 30), ts=START + i / RATE_HZ)
+                        for i in range(stored, stored + BATCH_SIZE)])
+                    stored += BATCH_SIZE
+            end = START + size / RATE_HZ
+            csv_seconds, csv_bytes = _get(client, '/logs/get_telemetry_csv?id=1')
+            print(f"{size} строк ({size / RATE_HZ / 3600:.1f} ч): CSV {csv_bytes / 2 ** 20:.1f} МиБ, "
+                  f"{csv_seconds:.2f} с")
+            for name, since in (('весь полёт', START), ('последние 10 мин', end - 600)):
+                seconds, length = _get(
+                    client, f'/logs/get_telemetry_chart?id=1&from={since}&to={end}&points=300')
+                print(f"  график ({name}, 300 точек): {seconds * 1000:.0f} мс, {length / 1024:.1f} КиБ")
+
+        # хранение по умолчанию: исходные измерения 1 ч, по 1 с 6 ч, по 10 с 7 суток
+        with app.app_context():
+            app.extensions['telemetry_retention'].run_once(
+                now=datetime.datetime.utcfromtimestamp(end))
+        seconds, length = _get(
+            client, f'/logs/get_telemetry_chart?id=1&from={START}&to={end}&points=300')
+        print(f"после сжатия истории: график (весь полёт, 300 точек): {seconds * 1000:.0f} мс, "
+              f"{length / 1024:.1f} КиБ")
+
+
+if __name__ == "__main__":
+    main()
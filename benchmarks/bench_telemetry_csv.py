@@ -0,0 +1,88 @@
+""" замер выгрузки телеметрии БПЛА в CSV
+
+Сравнивается прежняя выгрузка (все строки через ORM в одну строку StringIO)
+с потоковой get_telemetry_csv_handler: время до первой части ответа,
+общее время и пиковая память (tracemalloc) в зависимости от длины истории.
+
+запуск: python -m benchmarks.bench_telemetry_csv
+"""
+import csv
+import os
+import sys
+import tempfile
+import tracemalloc
+from io import StringIO
+from time import perf_counter
+
+from tests.mqtt_broker import MqttBroker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'afcs', 'afcs'))
+# pylint: disable=wrong-import-position
+from afcs_server import create_app, db  # noqa: E402
+from models import Uav, UavTelemetry  # noqa: E402
+from utils.api_handlers import get_telemetry_csv_handler, telemetry_batch_handler  # noqa: E402
+
+HISTORY_SIZES = (100000, 1000000)
+BATCH_SIZE = 10000
+
+
+def _orm_csv():
+    """ прежняя выгрузка: объекты ORM и CSV целиком в памяти """
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['record_time', 'lat', 'lon', 'alt', 'azimuth', 'dop', 'sats', 'speed'])
+    for telemetry in UavTelemetry.query.filter(UavTelemetry.uav_id == '1') \
+            .order_by(UavTelemetry.record_time.asc()):
+        writer.writerow([telemetry.record_time, telemetry.lat, telemetry.lon, telemetry.alt,
+                         telemetry.azimuth, telemetry.dop, telemetry.sats, telemetry.speed])
+    yield output.getvalue()
+
+
+def _stream_csv():
+    return get_telemetry_csv_handler('1').iter_encoded()
+
+
+def _measure(chunks) -> tuple:
+    tracemalloc.start()
+    start = perf_counter()
+    first = None
+    size = 0
+    for chunk in chunks():
+        if first is None:
+            first = perf_counter() - start
+        size += len(chunk)
+    total = perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, total, peak / 2 ** 20, size
+
+
+def main():
+    """ точка входа """
+    with MqttBroker() as broker, tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'afcs.db')}",
+            'MQTT_BROKER': broker.host, 'MQTT_PORT': broker.port,
+            'TELEMETRY_RETENTION_INTERVAL_SEC': 0})
+        app.extensions['telemetry_ingest'].stop()
+        # потоковый ответ читается в контексте запроса, как при обработке маршрута
+        with app.test_request_context():
+            db.create_all()
+            db.session.add(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+            db.session.commit()
+            stored = 0
+            for size in HISTORY_SIZES:
+                while stored < size:
+                    telemetry_batch_handler([
+                        dict(id='1', lat=str(600000000 + i), lon='750000000', alt='10000',
+                             azimuth='0', dop='1.2', sats='12', speed='30', ts=1700000000 + i / 10)
+                        for i in range(stored, stored + BATCH_SIZE)])
+                    stored += BATCH_SIZE
+                for name, chunks in (('ORM + StringIO', _orm_csv), ('поток', _stream_csv)):
+                    first, total, peak, length = _measure(chunks)
+                    print(f"{size} строк, {name}: первая часть через {first * 1000:.0f} мс, "
+                          f"всего {total:.2f} с, пик памяти {peak:.1f} МиБ, {length / 2 ** 20:.1f} МиБ CSV")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+""" замер выгрузки телеметрии в CSV и в столбцовый файл .npz и их загрузки для анализа
+
+CSV загружается так, как это делает послеполётный анализ: разбор строк
+с преобразованием времени и чисел в массивы NumPy. Файл .npz загружается np.load.
+
+запуск: python -m benchmarks.bench_telemetry_export
+"""
+import csv
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+from tests.mqtt_broker import MqttBroker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'afcs', 'afcs'))
+# pylint: disable=wrong-import-position
+from afcs_server import create_app, db  # noqa: E402
+from models import Uav  # noqa: E402
+from utils.api_handlers import get_telemetry_csv_handler, telemetry_batch_handler  # noqa: E402
+from utils.telemetry_export import export_telemetry_npz  # noqa: E402
+
+HISTORY_SIZE = 1000000
+BATCH_SIZE = 10000
+
+
+def _load_csv(path: str) -> dict:
+    with open(path, newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        columns = list(zip(*reader))
+    data = {'record_time': np.array(columns[0], dtype='datetime64[us]')}
+    for name, values in zip(header[1:], columns[1:]):
+        data[name] = np.array(values, dtype=np.int64 if name == 'sats' else np.float64)
+    return data
+
+
+def _load_npz(path: str) -> dict:
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def main():
+    """ точка входа """
+    with MqttBroker() as broker, tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'afcs.db')}",
+            'MQTT_BROKER': broker.host, 'MQTT_PORT': broker.port,
+            'TELEMETRY_RETENTION_INTERVAL_SEC': 0})
+        app.extensions['telemetry_ingest'].stop()
+        # потоковый ответ CSV читается в контексте запроса, как при обработке маршрута
+        with app.test_request_context():
+            db.create_all()
+            db.session.add(Uav(id='1', is_armed=False, state='В сети', kill_switch_state=False))
+            db.session.commit()
+            for offset in range(0, HISTORY_SIZE, BATCH_SIZE):
+                telemetry_batch_handler([
+                    dict(id='1', lat=str(600000000 + i), lon='750000000', alt=str(10000 + i % 700),
+                         azimuth=str(i % 360), dop='1.2', sats='12', speed=str(i % 30),
+                         ts=1700000000 + i / 10)
+                    for i in range(offset, offset + BATCH_SIZE)])
+
+            csv_path = os.path.join(tmp, 'telemetry.csv')
+            start = perf_counter()
+            with open(csv_path, 'wb') as file:
+                for chunk in get_telemetry_csv_handler('1').iter_encoded():
+                    file.write(chunk)
+            csv_export = perf_counter() - start
+
+            npz_path = os.path.join(tmp, 'telemetry.npz')
+            start = perf_counter()
+            with open(npz_path, 'wb') as file:
+                export_telemetry_npz(file, '1')
+            npz_export = perf_counter() - start
+
+        for name, path, export, load in (('CSV', csv_path, csv_export, _load_csv),
+                                         ('.npz', npz_path, npz_export, _load_npz)):
+            start = perf_counter()
+            data = load(path)
+            elapsed = perf_counter() - start
+            assert len(data['speed']) == HISTORY_SIZE
+            print(f"{HISTORY_SIZE} строк, {name}: выгрузка {export:.1f} с, "
+                  f"{os.path.getsize(path) / 2 ** 20:.1f} МиБ, загрузка {elapsed * 1000:.0f} мс")
+
+
+if __name__ == "__main__":
+    main()
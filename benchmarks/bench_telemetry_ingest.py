@@ -0,0 +1,69 @@
+""" замер записи телеметрии в базу системы мониторинга
+
+Сравнивается запись каждого измерения отдельной транзакцией (telemetry_handler,
+как раньше в обработчике сообщений MQTT) с отложенной пакетной записью
+TelemetryIngestBuffer. Измерения поступают от FLEET_SIZE БПЛА.
+
+запуск: python -m benchmarks.bench_telemetry_ingest
+"""
+import os
+import sys
+import tempfile
+from time import perf_counter, sleep, time
+
+from tests.mqtt_broker import MqttBroker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'afcs', 'afcs'))
+from afcs_server import create_app, db  # noqa: E402  pylint: disable=wrong-import-position
+from models import Uav  # noqa: E402  pylint: disable=wrong-import-position
+from utils.api_handlers import telemetry_handler  # noqa: E402  pylint: disable=wrong-import-position
+
+FLEET_SIZE = 100
+SINGLE_SAMPLES = 2000
+BUFFERED_SAMPLES = 50000
+
+
+def _samples(count: int, base_time: float) -> list:
+    return [dict(id=str(i % FLEET_SIZE), lat='600000000', lon='750000000', alt='100',
+                 azimuth='0', dop='1.2', sats='12', speed='30', ts=base_time + i / FLEET_SIZE)
+            for i in range(count)]
+
+
+def main():
+    """ точка входа """
+    with MqttBroker() as broker, tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'afcs.db')}",
+            'MQTT_BROKER': broker.host, 'MQTT_PORT': broker.port})
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([Uav(id=str(i), is_armed=False, state='В сети',
+                                    kill_switch_state=False) for i in range(FLEET_SIZE)])
+            db.session.commit()
+
+            start = perf_counter()
+            for sample in _samples(SINGLE_SAMPLES, time() - 10 ** 6):
+                telemetry_handler(**sample)
+            elapsed = perf_counter() - start
+            print(f"по одному измерению: {SINGLE_SAMPLES / elapsed:.0f} измерений/с")
+
+        ingest = app.extensions['telemetry_ingest']
+        samples = _samples(BUFFERED_SAMPLES, time())
+        start = perf_counter()
+        for i in range(0, len(samples), 10):
+            # как в сообщениях MQTT: по 10 измерений
+            ingest.submit(samples[i:i + 10])
+        accepted = perf_counter() - start
+        while ingest.stats()['stored'] < BUFFERED_SAMPLES:
+            sleep(0.01)
+        elapsed = perf_counter() - start
+        stats = ingest.stats()
+        print(f"отложенная запись: приём {BUFFERED_SAMPLES / accepted:.0f} измерений/с, "
+              f"запись {BUFFERED_SAMPLES / elapsed:.0f} измерений/с")
+        print(f"записей {stats['flushes']}, пакет до {stats['max_batch_size']} измерений, "
+              f"запись пакета до {stats['max_flush_sec'] * 1e3:.0f} мс, "
+              f"задержка до {stats['max_delay_sec'] * 1e3:.0f} мс")
+
+
+if __name__ == "__main__":
+    main()
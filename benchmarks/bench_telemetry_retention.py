@@ -0,0 +1,87 @@
+""" замер хранения телеметрии со сжатием в сводные интервалы
+
+Записывается несколько часов телеметрии небольшой группы БПЛА, затем
+сравниваются размер базы и время запроса истории за весь период
+(max_points точек) без обслуживания и после TelemetryRetention.run_once.
+
+запуск: python -m benchmarks.bench_telemetry_retention
+"""
+import datetime
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+from tests.mqtt_broker import MqttBroker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'afcs', 'afcs'))
+# pylint: disable=wrong-import-position
+from afcs_server import create_app, db  # noqa: E402
+from models import Uav  # noqa: E402
+from utils.api_handlers import telemetry_batch_handler  # noqa: E402
+from utils.telemetry_retention import query_telemetry_history  # noqa: E402
+
+FLEET_SIZE = 4
+RATE_HZ = 5
+DURATION_SEC = 6 * 3600
+BATCH_SIZE = 10000
+MAX_POINTS = 1000
+START = 1699999980  # кратно 60
+
+
+def _db_size(path: str) -> float:
+    db.session.execute(db.text('PRAGMA wal_checkpoint(TRUNCATE)'))
+    db.session.execute(db.text('VACUUM'))
+    return os.path.getsize(path) / 2 ** 20
+
+
+def _query_sec(start, end) -> tuple:
+    begin = perf_counter()
+    resolution, rows = query_telemetry_history('0', start, end, MAX_POINTS)
+    return perf_counter() - begin, resolution, len(rows)
+
+
+def main():
+    """ точка входа """
+    with MqttBroker() as broker, tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'afcs.db')
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{path}",
+            'MQTT_BROKER': broker.host, 'MQTT_PORT': broker.port,
+            'TELEMETRY_RETENTION_INTERVAL_SEC': 0})
+        app.extensions['telemetry_ingest'].stop()
+        retention = app.extensions['telemetry_retention']
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([Uav(id=str(i), is_armed=False, state='В сети',
+                                    kill_switch_state=False) for i in range(FLEET_SIZE)])
+            db.session.commit()
+            total = FLEET_SIZE * RATE_HZ * DURATION_SEC
+            for offset in range(0, total, BATCH_SIZE):
+                telemetry_batch_handler([
+                    dict(id=str(i % FLEET_SIZE), lat=str(600000000 + i % 1000), lon='750000000',
+                         alt=str(10000 + i % 500), azimuth='0', dop='1.2', sats='12',
+                         speed=str(i % 30), ts=START + i // FLEET_SIZE / RATE_HZ)
+                    for i in range(offset, min(total, offset + BATCH_SIZE))])
+            start = datetime.datetime.utcfromtimestamp(START)
+            end = datetime.datetime.utcfromtimestamp(START + DURATION_SEC)
+            last_hour = end - datetime.timedelta(hours=1)
+
+            print(f"{total} измерений за {DURATION_SEC // 3600} ч")
+            print(f"без сжатия: база {_db_size(path):.1f} МиБ")
+            for name, since in (('весь период', start), ('последний час', last_hour)):
+                seconds, resolution, points = _query_sec(since, end)
+                print(f"  история ({name}): {seconds * 1000:.0f} мс, разрешение {resolution} с, {points} точек")
+
+            begin = perf_counter()
+            retention.run_once(now=end)
+            print(f"сжатие (исходные измерения 1 ч, по 1 с 6 ч): {perf_counter() - begin:.1f} с, "
+                  f"{retention.stats()['compacted']}")
+            print(f"после сжатия: база {_db_size(path):.1f} МиБ")
+            for name, since in (('весь период', start), ('последний час', last_hour)):
+                seconds, resolution, points = _query_sec(since, end)
+                print(f"  история ({name}): {seconds * 1000:.0f} мс, разрешение {resolution} с, {points} точек")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+""" замер проверки токена администратора (check_user_token)
+
+Сравниваются прежняя проверка (выборка пользователей по токену и count()),
+запрос EXISTS по индексу access_token и проверка через TokenCache.
+Запросы идут из нескольких вкладок страницы администратора с одним токеном.
+
+запуск: python -m benchmarks.bench_token_cache
+"""
+import os
+import secrets
+import sys
+import tempfile
+from time import perf_counter
+
+from tests.mqtt_broker import MqttBroker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'afcs', 'afcs'))
+# pylint: disable=wrong-import-position
+from afcs_server import create_app, db  # noqa: E402
+from models import User  # noqa: E402
+from utils.api_handlers import check_user_token  # noqa: E402
+from utils.db_utils import entity_exists  # noqa: E402
+
+USER_COUNT = 10000
+CHECKS = 20000
+
+
+def _count_check(token: str) -> bool:
+    """ прежняя проверка """
+    users = User.query.filter(User.access_token == token)
+    return users.count() != 0
+
+
+def _exists_check(token: str) -> bool:
+    return entity_exists(User, User.access_token, token)
+
+
+def _measure(check, token: str) -> float:
+    start = perf_counter()
+    for _ in range(CHECKS):
+        assert check(token)
+        # сессия каждого запроса закрывается, как при обработке маршрута
+        db.session.remove()
+    return CHECKS / (perf_counter() - start)
+
+
+def main():
+    """ точка входа """
+    with MqttBroker() as broker, tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'afcs.db')}",
+            'MQTT_BROKER': broker.host, 'MQTT_PORT': broker.port,
+            'TELEMETRY_RETENTION_INTERVAL_SEC': 0,
+            'UAV_STATE_CACHE_TTL_SEC': 0,
+            'TOKEN_CACHE_PATH': os.path.join(tmp, 'token_cache.gen')})
+        app.extensions['telemetry_ingest'].stop()
+        with app.app_context():
+            db.create_all()
+            db.session.add_all(User(username=f'user{i}', password_hash='', access_token=secrets.token_hex(16))
+                               for i in range(USER_COUNT))
+            db.session.commit()
+            token = User.query.first().access_token
+            for name, check in (('count()', _count_check), ('EXISTS по индексу', _exists_check),
+                                ('TokenCache', check_user_token)):
+                print(f"{USER_COUNT} пользователей, {name}: {_measure(check, token):.0f} проверок/с")
+            stats = app.extensions['token_cache'].stats()
+            print(f"кэш: попаданий {stats['hits']}, промахов {stats['misses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+""" замер опроса сервера БПЛА с кэшем состояния и без него
+
+Каждый опрос - то, что сервер делает на подписанный запрос БПЛА: получение
+открытого ключа БПЛА для проверки подписи (get_key), затем fly_accept
+и kill_switch. Опросы идут по кругу по всем БПЛА, каждый сотый опрос
+сопровождается изменением администратора (force_disarm), которое делает
+снимок БПЛА устаревшим.
+
+запуск: python -m benchmarks.bench_uav_state_cache
+"""
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+from tests.mqtt_broker import MqttBroker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'afcs', 'afcs'))
+# pylint: disable=wrong-import-position
+from afcs_server import create_app, db  # noqa: E402
+from models import Uav, UavPublicKeys  # noqa: E402
+from utils.api_handlers import fly_accept_handler, force_disarm_handler, kill_switch_handler  # noqa: E402
+from utils.utils import get_key  # noqa: E402
+
+UAV_COUNT = 100
+POLLS = 20000
+MUTATION_EVERY = 100
+
+
+def _poll(app) -> float:
+    with app.app_context():
+        start = perf_counter()
+        for i in range(POLLS):
+            id = str(i % UAV_COUNT)
+            get_key(f'kos{id}', private=False)
+            fly_accept_handler(id)
+            kill_switch_handler(id)
+            if i % MUTATION_EVERY == 0:
+                force_disarm_handler(id)
+            # сессия каждого запроса закрывается, как при обработке маршрута
+            db.session.remove()
+        return POLLS / (perf_counter() - start)
+
+
+def main():
+    """ точка входа """
+    with MqttBroker() as broker, tempfile.TemporaryDirectory() as tmp:
+        apps = {}
+        for name, ttl in (('без кэша', 0), ('с кэшем', 60)):
+            app = create_app({
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'afcs.db')}",
+                'MQTT_BROKER': broker.host, 'MQTT_PORT': broker.port,
+                'TELEMETRY_RETENTION_INTERVAL_SEC': 0,
+                'UAV_STATE_CACHE_PATH': os.path.join(tmp, 'uav_state_cache.gen'),
+                'UAV_STATE_CACHE_TTL_SEC': ttl})
+            app.extensions['telemetry_ingest'].stop()
+            apps[name] = app
+        with apps['без кэша'].app_context():
+            db.create_all()
+            for i in range(UAV_COUNT):
+                db.session.add(Uav(id=str(i), is_armed=False, state='В сети', kill_switch_state=False))
+                db.session.add(UavPublicKeys(uav_id=str(i), n=str(2 ** 1023 + i), e='65537'))
+            db.session.commit()
+        for name, app in apps.items():
+            print(f"{UAV_COUNT} БПЛА, {name}: {_poll(app):.0f} опросов/с")
+        stats = apps['с кэшем'].extensions['uav_state_cache'].stats()
+        print(f"кэш: попаданий {stats['hits']}, промахов {stats['misses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+""" замер разбора и формирования длинного маршрута общим кодеком QGC WPL
+
+Сравнивается построчный разбор (split('\\t') и приведение каждого поля,
+как раньше в read_mission системы мониторинга) с блочным разбором
+src/wpl_codec.py; также замеряются формирование текста маршрута
+и read_mission системы мониторинга целиком.
+
+запуск: python -m benchmarks.bench_wpl_codec
+"""
+import os
+import sys
+from time import perf_counter
+
+from src.wpl_codec import WPLMission, decode_wpl, encode_wpl
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'afcs', 'afcs'))
+import afcs_server  # noqa: E402,F401  pylint: disable=wrong-import-position,unused-import
+from utils.utils import read_mission  # noqa: E402  pylint: disable=wrong-import-position
+
+WAYPOINTS = 100000
+REPEATS = 3
+
+
+def _mission() -> WPLMission:
+    mission = WPLMission()
+    mission.append((0, 1, 0, 16, 0.0, 0.0, 0.0, 0.0, 60.0, 75.0, 0.0, 1))
+    mission.append((1, 0, 3, 22, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 10.0, 1))
+    for i in range(2, WAYPOINTS):
+        mission.append((i, 0, 3, 16, 0.0, 0.0, 0.0, 0.0, 60 + i * 1e-6, 75 + i * 1e-6, 10.0, 1))
+    return mission
+
+
+def _decode_lines(text: str) -> list:
+    """ построчный разбор: split и одиннадцать приведений на строку """
+    rows = []
+    for line in text.splitlines()[1:]:
+        fields = line.split('\t')
+        rows.append((int(fields[0]), int(fields[1]), int(fields[2]), int(fields[3]),
+                     *map(float, fields[4:11])))
+    return rows
+
+
+def _measure(name: str, func):
+    best = min(_time(func) for _ in range(REPEATS))
+    print(f"{name}: {best * 1e3:.0f} мс, {WAYPOINTS / best:.0f} строк/с")
+
+
+def _time(func) -> float:
+    start = perf_counter()
+    func()
+    return perf_counter() - start
+
+
+def main():
+    """ точка входа """
+    mission = _mission()
+    text = encode_wpl(mission)
+    assert decode_wpl(text) == mission
+    print(f"маршрут: {WAYPOINTS} строк, {len(text) / 2 ** 20:.1f} МБ")
+    _measure("построчный разбор", lambda: _decode_lines(text))
+    _measure("decode_wpl", lambda: decode_wpl(text))
+    _measure("decode_wpl (bytes)", lambda: decode_wpl(text.encode()))
+    _measure("encode_wpl", lambda: encode_wpl(mission))
+    _measure("read_mission системы мониторинга", lambda: read_mission(text))
+
+
+if __name__ == "__main__":
+    main()
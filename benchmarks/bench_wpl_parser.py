@@ -0,0 +1,69 @@
+""" замер импорта длинного маршрута из WPL файла
+
+Сравнивается прежний способ (список строк файла и список GeoPoint)
+с чтением через mmap в массивы NumPy и с загрузкой разобранного маршрута
+из кэша (src/mission_cache.py).
+
+запуск: python -m benchmarks.bench_wpl_parser
+"""
+import os
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+from geopy.point import Point as GeoPoint
+
+from src.mission_importer import MissionImporter
+from src.wpl_parser import WPLParser
+
+WAYPOINTS = 100000
+
+
+def _write_mission(path: str):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write("QGC WPL 110\n")
+        for i in range(WAYPOINTS):
+            file.write(f"{i}\t0\t3\t16\t0\t5\t0\t0\t{60 + i * 1e-5:.7f}\t{75 + i * 1e-5:.7f}\t10\t1\n")
+
+
+def _parse_lines(path: str):
+    """ прежний парсер: все строки в памяти, GeoPoint на каждую точку """
+    with open(path, 'r', encoding='utf-8') as file:
+        lines = file.readlines()[1:]
+    waypoints = []
+    for line in lines:
+        parts = line.strip().split('\t')
+        if len(parts) >= 11:
+            waypoints.append(GeoPoint(float(parts[8]), float(parts[9])))
+    return waypoints
+
+
+def _measure(name: str, func):
+    start = perf_counter()
+    result = func()
+    elapsed = perf_counter() - start
+    # память замеряется отдельным запуском: tracemalloc сильно замедляет разбор
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{name}: {elapsed * 1e3:.0f} мс, пик памяти {peak / 2 ** 20:.1f} МБ, точек {len(result)}")
+
+
+def main():
+    """ точка входа """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'mission.wpl')
+        _write_mission(path)
+        _measure("список строк и GeoPoint", lambda: _parse_lines(path))
+        _measure("mmap -> NumPy", lambda: WPLParser(path).parse_arrays())
+        _measure("MissionImporter без кэша",
+                 lambda: MissionImporter(path, cache_dir=None).get_mission().waypoints)
+        cache_dir = os.path.join(tmp, 'cache')
+        MissionImporter(path, cache_dir)
+        _measure("MissionImporter из кэша",
+                 lambda: MissionImporter(path, cache_dir).get_mission().waypoints)
+
+
+if __name__ == "__main__":
+    main()
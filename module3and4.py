@@ -117,27 +117,15 @@ class SecurityMonitor(BaseSecurityMonitor):
         ]
         self.set_security_policies(policies=default_policies)        
 
-    def set_security_policies(self, policies):
-        """ установка новых политик безопасности """
-        self._security_policies = policies
-        self._log_message(
-            LOG_INFO, f"изменение политик безопасности: {policies}")
-
     def _check_event(self, event: Event):
         """ проверка входящих событий """
         self._log_message(
             LOG_DEBUG, f"проверка события {event}, по умолчанию выполнение запрещено")
 
-        authorized = False
-        request = SecurityPolicy(
-            source=event.source,
-            destination=event.destination,
-            operation=event.operation)
-
-        if request in self._security_policies:
+        authorized = self._is_authorized(event)
+        if authorized:
             self._log_message(
                 LOG_DEBUG, "событие разрешено политиками, выполняем")
-            authorized = True
 
         if authorized is False:
             self._log_message(LOG_ERROR, f"событие не разрешено политиками безопасности! {event}")
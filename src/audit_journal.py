@@ -0,0 +1,236 @@
+""" модуль журнала аудита решений монитора безопасности
+
+Журнал накапливает решения в памяти и записывает их в файл крупными блоками,
+поэтому на каждое событие не приходится ни одного системного вызова.
+
+Формат файла (все числа little-endian):
+    заголовок сегмента  b'#AJ1' (каждое открытие файла на запись)
+    запись строки       'S' id:u16 длина:u16 utf-8
+    запись отказа       'D' время:f64 отправитель:u16 получатель:u16 операция:u16
+                        длина:u16 описание события utf-8
+    запись счётчиков    'C' время:f64 количество:u32,
+                        затем для каждой тройки: три id строк u16,
+                        приращения разрешённых и запрещённых u32
+
+Строки (имена очередей и операций) записываются один раз и далее
+упоминаются по номеру.
+
+Просмотр журнала: python -m src.audit_journal <файл>
+"""
+from collections import deque
+import struct
+import sys
+from time import time
+from typing import Deque, Dict, List, Optional, Tuple
+
+from src.event_types import Event
+
+JOURNAL_MAGIC = b'#AJ1'
+
+_STRING = struct.Struct('<cHH')
+_DENIAL = struct.Struct('<cdHHHH')
+_COUNTERS = struct.Struct('<cdI')
+_COUNTER = struct.Struct('<HHHII')
+
+# максимальная длина описания события в записи отказа
+MAX_DETAIL_LENGTH = 256
+
+
+class AuditJournal:
+    """
+    Журнал аудита решений монитора безопасности.
+
+    Attributes:
+        path (str): путь к файлу журнала.
+        capacity (int): размер кольцевого буфера записей об отказах.
+        flush_interval_sec (float): период сброса буфера в файл.
+    """
+
+    def __init__(self, path: str, capacity: int = 1024, flush_interval_sec: float = 1.0):
+        """
+        Args:
+            path (str): путь к файлу журнала.
+            capacity (int): размер кольцевого буфера записей об отказах.
+            flush_interval_sec (float): период сброса буфера в файл.
+        """
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval_sec = flush_interval_sec
+
+        # (отправитель, получатель, операция) -> [разрешено, запрещено] с прошлого сброса
+        self._counters: Dict[Tuple[str, str, str], List[int]] = {}
+        self._denials: Deque[Tuple[float, str, str, str, str]] = deque(maxlen=capacity)
+        self._string_ids: Dict[str, int] = {}
+        self._file = None
+        self._last_flush = time()
+
+    def __getstate__(self):
+        # открытый файл не передаётся в другой процесс, он будет открыт заново
+        state = self.__dict__.copy()
+        state['_file'] = None
+        return state
+
+    def record(self, event: Event, authorized: bool):
+        """
+        Учитывает решение монитора по событию.
+
+        Args:
+            event (Event): проверенное событие.
+            authorized (bool): решение монитора.
+        """
+        key = (event.source, event.destination, event.operation)
+        counters = self._counters.get(key)
+        if counters is None:
+            counters = self._counters[key] = [0, 0]
+        if authorized:
+            counters[0] += 1
+            return
+
+        counters[1] += 1
+        if len(self._denials) == self.capacity:
+            # буфер заполнен: сбрасываем его целиком, не дожидаясь периода
+            self.flush()
+        self._denials.append(
+            (time(), event.source, event.destination, event.operation,
+             repr(event.parameters)[:MAX_DETAIL_LENGTH]))
+
+    def flush_if_due(self):
+        """ сбрасывает буфер в файл, если истёк период сброса """
+        if time() - self._last_flush >= self.flush_interval_sec:
+            self.flush()
+
+    def _string_id(self, value: str, chunks: List[bytes]) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._string_ids)
+            self._string_ids[value] = string_id
+            data = value.encode()
+            chunks.append(_STRING.pack(b'S', string_id, len(data)))
+            chunks.append(data)
+        return string_id
+
+    def flush(self):
+        """ записывает накопленные решения в файл одним вызовом write """
+        self._last_flush = time()
+        if not self._counters and not self._denials:
+            return
+
+        chunks: List[bytes] = []
+        if self._file is None:
+            # каждое открытие начинает новый сегмент журнала со своей таблицей строк
+            self._file = open(self.path, 'ab')
+            self._string_ids.clear()
+            chunks.append(JOURNAL_MAGIC)
+
+        while self._denials:
+            timestamp, source, destination, operation, detail = self._denials.popleft()
+            ids = [self._string_id(value, chunks) for value in (source, destination, operation)]
+            data = detail.encode()
+            chunks.append(_DENIAL.pack(b'D', timestamp, *ids, len(data)))
+            chunks.append(data)
+
+        if self._counters:
+            entries = []
+            for (source, destination, operation), (allowed, denied) in self._counters.items():
+                ids = [self._string_id(value, chunks) for value in (source, destination, operation)]
+                entries.append(_COUNTER.pack(*ids, allowed, denied))
+            chunks.append(_COUNTERS.pack(b'C', self._last_flush, len(entries)))
+            chunks.extend(entries)
+            self._counters.clear()
+
+        self._file.write(b''.join(chunks))
+        self._file.flush()
+
+    def close(self):
+        """ сбрасывает буфер и закрывает файл """
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_audit_journal(path: str) -> dict:
+    """
+    Читает журнал аудита.
+
+    Args:
+        path (str): путь к файлу журнала.
+
+    Returns:
+        dict: 'counts' - {(отправитель, получатель, операция): [разрешено, запрещено]},
+            'denials' - список записей об отказах
+            (время, отправитель, получатель, операция, описание).
+
+    Raises:
+        ValueError: Если файл не является журналом аудита или повреждён.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    counts: Dict[Tuple[str, str, str], List[int]] = {}
+    denials = []
+    strings: Dict[int, str] = {}
+    offset = 0
+    while offset < len(data):
+        if data.startswith(JOURNAL_MAGIC, offset):
+            # начало сегмента: таблица строк начинается заново
+            strings.clear()
+            offset += len(JOURNAL_MAGIC)
+            continue
+        record_type = data[offset:offset + 1]
+        if record_type == b'S':
+            _, string_id, length = _STRING.unpack_from(data, offset)
+            offset += _STRING.size
+            strings[string_id] = data[offset:offset + length].decode()
+            offset += length
+        elif record_type == b'D':
+            _, timestamp, source, destination, operation, length = \
+                _DENIAL.unpack_from(data, offset)
+            offset += _DENIAL.size
+            detail = data[offset:offset + length].decode(errors='replace')
+            offset += length
+            denials.append((timestamp, strings[source], strings[destination],
+                            strings[operation], detail))
+        elif record_type == b'C':
+            _, _, count = _COUNTERS.unpack_from(data, offset)
+            offset += _COUNTERS.size
+            for _ in range(count):
+                source, destination, operation, allowed, denied = \
+                    _COUNTER.unpack_from(data, offset)
+                offset += _COUNTER.size
+                key = (strings[source], strings[destination], strings[operation])
+                totals = counts.setdefault(key, [0, 0])
+                totals[0] += allowed
+                totals[1] += denied
+        else:
+            raise ValueError(f"повреждённый журнал аудита, смещение {offset}")
+    return {'counts': counts, 'denials': denials}
+
+
+def summarize_audit_journal(path: str, last_denials: Optional[int] = 10) -> str:
+    """
+    Формирует текстовую сводку журнала аудита.
+
+    Args:
+        path (str): путь к файлу журнала.
+        last_denials (int, optional): сколько последних отказов показать.
+
+    Returns:
+        str: сводка.
+    """
+    journal = read_audit_journal(path)
+    lines = ["отправитель -> получатель: операция\tразрешено\tзапрещено"]
+    for (source, destination, operation), (allowed, denied) in sorted(journal['counts'].items()):
+        lines.append(f"{source} -> {destination}: {operation}\t{allowed}\t{denied}")
+    denials = journal['denials']
+    if last_denials:
+        denials = denials[-last_denials:]
+    if denials:
+        lines.append(f"последние отказы ({len(denials)} из {len(journal['denials'])}):")
+        for timestamp, source, destination, operation, detail in denials:
+            lines.append(f"{timestamp:.3f} {source} -> {destination}: {operation} {detail}")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    print(summarize_audit_journal(sys.argv[1]))
@@ -0,0 +1,77 @@
+""" модуль канала-мандата (capability) для разрешённых маршрутов событий
+
+Монитор безопасности выдаёт отправителю канал для уже разрешённой политиками
+тройки (отправитель, получатель, операция). События, отправленные через канал,
+попадают сразу в очередь получателя, минуя очередь монитора, а монитору
+остаётся только счётчик доставленных событий для аудита.
+
+При любом изменении политик монитор увеличивает номер эпохи, и все выданные
+ранее каналы становятся недействительными: события через них снова идут
+через монитор безопасности на полную проверку. Политики меняются только
+до запуска монитора (см. BaseSecurityMonitor.set_security_policies).
+"""
+from typing import Any
+
+from src.event_types import Event
+
+
+class CapabilityChannel:
+    """
+    Отзываемый канал прямой доставки событий для одной разрешённой тройки.
+
+    Создаётся монитором безопасности (BaseSecurityMonitor.issue_capability)
+    до запуска процессов и передаётся отправителю при его создании.
+    """
+
+    def __init__(self, source: str, destination: str, operation: str,
+                 destination_q, monitor_q, epoch, issued_epoch: int, counter):
+        """
+        Args:
+            source (str): отправитель.
+            destination (str): получатель.
+            operation (str): операция.
+            destination_q (Queue): очередь получателя.
+            monitor_q (Queue): очередь монитора безопасности (для отозванного канала).
+            epoch (Value): общий номер эпохи политик монитора.
+            issued_epoch (int): номер эпохи на момент выдачи канала.
+            counter (RawValue): счётчик событий, доставленных через канал.
+        """
+        self.source = source
+        self.destination = destination
+        self.operation = operation
+        self._destination_q = destination_q
+        self._monitor_q = monitor_q
+        self._epoch = epoch
+        self._issued_epoch = issued_epoch
+        self._counter = counter
+
+    @property
+    def is_valid(self) -> bool:
+        """ канал действителен, пока политики не менялись """
+        return self._epoch.value == self._issued_epoch
+
+    @property
+    def delivered(self) -> int:
+        """ количество событий, доставленных через канал напрямую """
+        return self._counter.value
+
+    def send(self, parameters: Any, extra_parameters: Any = None):
+        """
+        Отправляет событие получателю.
+
+        Пока канал действителен, событие кладётся прямо в очередь получателя,
+        иначе отправляется в монитор безопасности на проверку.
+
+        Args:
+            parameters (Any): параметры события.
+            extra_parameters (Any): дополнительные параметры события.
+        """
+        event = Event(source=self.source, destination=self.destination,
+                      operation=self.operation, parameters=parameters,
+                      extra_parameters=extra_parameters)
+        if self._epoch.value == self._issued_epoch:
+            self._destination_q.put(event)
+            # у канала один отправитель, поэтому счётчик обходится без блокировки
+            self._counter.value += 1
+        else:
+            self._monitor_q.put(event)
@@ -1,3 +1,6 @@
+import os
+import tempfile
+
 PLANNER_QUEUE_NAME = "planner"
 COMMUNICATION_GATEWAY_QUEUE_NAME = "communication"
 CONTROL_SYSTEM_QUEUE_NAME = "control"
@@ -11,6 +14,13 @@ MISSION_SENDER_QUEUE_NAME = "planner.mqtt"
 SAFETY_BLOCK_QUEUE_NAME = "safety"
 SECURITY_MONITOR_QUEUE_NAME = "security"
 
+# брокер MQTT системы мониторинга
+MQTT_BROKER_HOST = "localhost"
+MQTT_BROKER_PORT = 1883
+
+# каталог кэша разобранных маршрутов (см. src/mission_cache.py)
+MISSION_CACHE_DIR = os.path.join(tempfile.gettempdir(), "cyberimmunity-mission-cache")
+
 DEFAULT_LOG_LEVEL = 2  # 1 - errors, 2 - verbose, 3 - debug
 LOG_FAILURE = 0
 LOG_ERROR = 1
@@ -0,0 +1,345 @@
+""" модуль бортовой геозоны (проверка запрещённых для движения зон) """
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# размер ячейки сетки пространственного индекса, в градусах
+DEFAULT_CELL_SIZE_DEG = 0.01
+
+# типы изменений в дельте запрещённых зон (см. compute_forbidden_zones_delta в СУПА)
+ZONE_ADDED = 'added'
+ZONE_MODIFIED = 'modified'
+ZONE_DELETED = 'deleted'
+
+
+class Geofence:
+    """
+    Класс бортовой геозоны: хранит набор запрещённых зон и отвечает на запросы
+    о попадании точки или отрезка маршрута в зону.
+
+    Ограничивающие прямоугольники зон индексируются равномерной сеткой,
+    поэтому при запросе проверяются только зоны из соответствующих ячеек,
+    а проверки рёбер полигонов выполняются векторно.
+
+    Координаты задаются в порядке GeoJSON: (долгота, широта).
+
+    Attributes:
+        cell_size (float): размер ячейки сетки в градусах.
+        version (int): версия набора зон, увеличивается при каждом изменении.
+    """
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE_DEG):
+        """
+        Инициализирует пустую геозону.
+
+        Args:
+            cell_size (float): размер ячейки сетки в градусах.
+
+        Raises:
+            ValueError: Если размер ячейки не положительный.
+        """
+        if cell_size <= 0:
+            raise ValueError("Размер ячейки должен быть положительным!")
+
+        self.cell_size = cell_size
+        self.version = 0
+
+        # вершины зон (N x 2, замкнутый контур) и их ограничивающие прямоугольники
+        self._zones: Dict[str, np.ndarray] = {}
+        self._bboxes: Dict[str, Tuple[float, float, float, float]] = {}
+        # сетка: ячейка -> имена зон, чьи прямоугольники её пересекают
+        self._grid: Dict[Tuple[int, int], Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._zones)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._zones
+
+    @property
+    def zone_names(self) -> List[str]:
+        """ имена загруженных зон """
+        return list(self._zones.keys())
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(np.floor(x / self.cell_size)), int(np.floor(y / self.cell_size))
+
+    def _cells_for_bbox(self, bbox: Tuple[float, float, float, float]):
+        min_ix, min_iy = self._cell(bbox[0], bbox[1])
+        max_ix, max_iy = self._cell(bbox[2], bbox[3])
+        for ix in range(min_ix, max_ix + 1):
+            for iy in range(min_iy, max_iy + 1):
+                yield ix, iy
+
+    def set_zone(self, name: str, coordinates: Iterable):
+        """
+        Добавляет новую или заменяет существующую зону.
+
+        Args:
+            name (str): имя зоны.
+            coordinates (Iterable): вершины полигона [(долгота, широта), ...].
+
+        Raises:
+            ValueError: Если у полигона меньше трёх вершин.
+        """
+        vertices = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        if len(vertices) > 1 and np.array_equal(vertices[0], vertices[-1]):
+            # в GeoJSON контур замкнут, последняя вершина дублирует первую
+            vertices = vertices[:-1]
+        if len(vertices) < 3:
+            raise ValueError(f"Зона {name} должна содержать не менее трёх вершин!")
+
+        if name in self._zones:
+            self._unindex(name)
+
+        self._zones[name] = vertices
+        bbox = (float(vertices[:, 0].min()), float(vertices[:, 1].min()),
+                float(vertices[:, 0].max()), float(vertices[:, 1].max()))
+        self._bboxes[name] = bbox
+        for cell in self._cells_for_bbox(bbox):
+            self._grid.setdefault(cell, set()).add(name)
+        self.version += 1
+
+    def remove_zone(self, name: str) -> bool:
+        """
+        Удаляет зону.
+
+        Args:
+            name (str): имя зоны.
+
+        Returns:
+            bool: True, если зона была удалена, иначе False.
+        """
+        if name not in self._zones:
+            return False
+        self._unindex(name)
+        del self._zones[name]
+        del self._bboxes[name]
+        self.version += 1
+        return True
+
+    def _unindex(self, name: str):
+        for cell in self._cells_for_bbox(self._bboxes[name]):
+            names = self._grid.get(cell)
+            if names is None:
+                continue
+            names.discard(name)
+            if not names:
+                del self._grid[cell]
+
+    def clear(self):
+        """ удаляет все зоны """
+        self._zones.clear()
+        self._bboxes.clear()
+        self._grid.clear()
+        self.version += 1
+
+    def load_zones(self, forbidden_zones: dict):
+        """
+        Загружает полный набор зон в формате GeoJSON FeatureCollection,
+        ранее загруженные зоны удаляются.
+
+        Args:
+            forbidden_zones (dict): GeoJSON с запрещёнными зонами.
+        """
+        self.clear()
+        for zone in forbidden_zones['features']:
+            self.set_zone(zone['properties']['name'], zone['geometry']['coordinates'][0])
+
+    def apply_delta(self, delta_zones: dict):
+        """
+        Применяет дельту изменений зон без перестроения всего индекса.
+
+        Args:
+            delta_zones (dict): GeoJSON с дельтой, у каждой зоны в свойствах
+                указан change_type (added, modified или deleted).
+
+        Raises:
+            ValueError: Если тип изменения неизвестен.
+        """
+        for zone in delta_zones['features']:
+            name = zone['properties']['name']
+            change_type = zone['properties'].get('change_type', ZONE_MODIFIED)
+            if change_type in (ZONE_ADDED, ZONE_MODIFIED):
+                self.set_zone(name, zone['geometry']['coordinates'][0])
+            elif change_type == ZONE_DELETED:
+                self.remove_zone(name)
+            else:
+                raise ValueError(f"Неизвестный тип изменения зоны {name}: {change_type}")
+
+    def _candidates(self, bbox: Tuple[float, float, float, float]) -> Set[str]:
+        candidates = set()
+        for cell in self._cells_for_bbox(bbox):
+            names = self._grid.get(cell)
+            if names:
+                candidates.update(names)
+        return {name for name in candidates
+                if self._bboxes[name][0] <= bbox[2] and bbox[0] <= self._bboxes[name][2]
+                and self._bboxes[name][1] <= bbox[3] and bbox[1] <= self._bboxes[name][3]}
+
+    @staticmethod
+    def _point_in_vertices(x: float, y: float, vertices: np.ndarray) -> bool:
+        """ векторная проверка чётности пересечений луча с рёбрами полигона """
+        x1, y1 = vertices[:, 0], vertices[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        straddles = (y1 > y) != (y2 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = (x2 - x1) * (y - y1) / (y2 - y1) + x1
+        return bool(np.count_nonzero(straddles & (x < x_cross)) & 1)
+
+    @staticmethod
+    def _segment_crosses_vertices(start: Tuple[float, float], end: Tuple[float, float],
+                                  vertices: np.ndarray) -> bool:
+        """ векторная проверка пересечения отрезка с рёбрами полигона """
+        ax, ay = start
+        bx, by = end
+        cx, cy = vertices[:, 0], vertices[:, 1]
+        dx, dy = np.roll(cx, -1), np.roll(cy, -1)
+
+        d1 = (dx - cx) * (ay - cy) - (dy - cy) * (ax - cx)
+        d2 = (dx - cx) * (by - cy) - (dy - cy) * (bx - cx)
+        d3 = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+        d4 = (bx - ax) * (dy - ay) - (by - ay) * (dx - ax)
+        crosses = (d1 * d2 <= 0) & (d3 * d4 <= 0)
+        # на одной прямой с ребром все четыре ориентации нулевые: отрезок пересекает
+        # ребро, только если их проекции перекрываются
+        collinear = (d1 == 0) & (d2 == 0)
+        overlaps_x = np.maximum(np.minimum(cx, dx), min(ax, bx)) \
+            <= np.minimum(np.maximum(cx, dx), max(ax, bx))
+        overlaps_y = np.maximum(np.minimum(cy, dy), min(ay, by)) \
+            <= np.minimum(np.maximum(cy, dy), max(ay, by))
+        overlaps = overlaps_x & overlaps_y
+        return bool(np.any(crosses & (~collinear | overlaps)))
+
+    def zones_at(self, lon: float, lat: float) -> List[str]:
+        """
+        Возвращает имена всех зон, в которые попадает точка.
+
+        Args:
+            lon (float): долгота.
+            lat (float): широта.
+
+        Returns:
+            List[str]: имена зон.
+        """
+        names = self._grid.get(self._cell(lon, lat))
+        if not names:
+            return []
+        result = []
+        for name in names:
+            bbox = self._bboxes[name]
+            if bbox[0] <= lon <= bbox[2] and bbox[1] <= lat <= bbox[3] \
+                    and self._point_in_vertices(lon, lat, self._zones[name]):
+                result.append(name)
+        return result
+
+    def is_point_forbidden(self, lon: float, lat: float) -> bool:
+        """
+        Проверяет, находится ли точка в какой-либо запрещённой зоне.
+
+        Args:
+            lon (float): долгота.
+            lat (float): широта.
+
+        Returns:
+            bool: True, если точка в запрещённой зоне, иначе False.
+        """
+        return len(self.zones_at(lon, lat)) != 0
+
+    def zones_on_segment(self, start: Tuple[float, float],
+                         end: Tuple[float, float]) -> List[str]:
+        """
+        Возвращает имена всех зон, которые пересекает или содержит отрезок.
+
+        Args:
+            start (Tuple[float, float]): начало отрезка (долгота, широта).
+            end (Tuple[float, float]): конец отрезка (долгота, широта).
+
+        Returns:
+            List[str]: имена зон.
+        """
+        bbox = (min(start[0], end[0]), min(start[1], end[1]),
+                max(start[0], end[0]), max(start[1], end[1]))
+        result = []
+        for name in self._candidates(bbox):
+            vertices = self._zones[name]
+            if self._segment_crosses_vertices(start, end, vertices) \
+                    or self._point_in_vertices(start[0], start[1], vertices):
+                result.append(name)
+        return result
+
+    def is_segment_forbidden(self, start: Tuple[float, float],
+                             end: Tuple[float, float]) -> bool:
+        """
+        Проверяет, пересекает ли отрезок какую-либо запрещённую зону.
+
+        Args:
+            start (Tuple[float, float]): начало отрезка (долгота, широта).
+            end (Tuple[float, float]): конец отрезка (долгота, широта).
+
+        Returns:
+            bool: True, если отрезок задевает запрещённую зону, иначе False.
+        """
+        return len(self.zones_on_segment(start, end)) != 0
+
+    @staticmethod
+    def _convex_hull(points: np.ndarray) -> np.ndarray:
+        """ выпуклая оболочка точек против часовой стрелки (алгоритм Эндрю) """
+        points = sorted(set(map(tuple, points)))
+        if len(points) < 3:
+            return np.array(points, dtype=float)
+
+        def half(ordered):
+            chain = []
+            for point in ordered:
+                while len(chain) >= 2 and \
+                        (chain[-1][0] - chain[-2][0]) * (point[1] - chain[-2][1]) \
+                        - (chain[-1][1] - chain[-2][1]) * (point[0] - chain[-2][0]) <= 0:
+                    chain.pop()
+                chain.append(point)
+            return chain[:-1]
+
+        return np.array(half(points) + half(reversed(points)), dtype=float)
+
+    def crosses_boundary(self, points: Iterable) -> bool:
+        """
+        Проверяет, задевает ли граница какой-либо зоны выпуклую оболочку точек.
+
+        Если не задевает, оболочка целиком внутри зоны или целиком вне всех зон,
+        и для любых точек и отрезков в ней ответы геозоны одинаковы.
+
+        Args:
+            points (Iterable): точки (долгота, широта).
+
+        Returns:
+            bool: True, если граница зоны проходит через оболочку или касается её.
+        """
+        hull = self._convex_hull(np.asarray(points, dtype=float))
+        bbox = (hull[:, 0].min(), hull[:, 1].min(), hull[:, 0].max(), hull[:, 1].max())
+        edges = list(zip(hull, np.roll(hull, -1, axis=0)))
+        for name in self._candidates(bbox):
+            vertices = self._zones[name]
+            if any(self._segment_crosses_vertices(tuple(start), tuple(end), vertices)
+                   for start, end in edges):
+                return True
+            # граница зоны, не пересекающая рёбра оболочки, может лежать внутри неё целиком
+            if len(hull) >= 3:
+                inside = np.ones(len(vertices), dtype=bool)
+                for start, end in edges:
+                    inside &= (end[0] - start[0]) * (vertices[:, 1] - start[1]) \
+                        - (end[1] - start[1]) * (vertices[:, 0] - start[0]) >= 0
+                if np.any(inside):
+                    return True
+        return False
+
+    def get_zone(self, name: str) -> Optional[np.ndarray]:
+        """
+        Возвращает вершины зоны.
+
+        Args:
+            name (str): имя зоны.
+
+        Returns:
+            Optional[np.ndarray]: вершины (N x 2) или None, если зоны нет.
+        """
+        return self._zones.get(name)
@@ -0,0 +1,162 @@
+""" модуль дискового кэша импортированных маршрутов
+
+Разобранный маршрут сохраняется в файл .npy, имя которого - хэш содержимого
+WPL файла. При следующем запуске с тем же файлом маршрута (в том числе
+из другого сценария или другой машины симуляции) разбор не выполняется:
+массив точек отображается в память через mmap.
+
+Изменённый WPL файл даёт другой хэш, поэтому устаревшая запись просто
+перестаёт использоваться и со временем удаляется: в кэше хранится не более
+max_entries записей, удаляются давно не использовавшиеся. Записи другой
+версии формата кэша удаляются сразу.
+"""
+from hashlib import sha256
+import os
+import tempfile
+from typing import Callable, Optional
+
+import numpy as np
+
+# увеличивается при изменении разбора WPL файла или формата записи
+CACHE_FORMAT_VERSION = 3
+_ENTRY_PREFIX = f"mission-v{CACHE_FORMAT_VERSION}-"
+_ENTRY_SUFFIX = ".npy"
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+class MissionCache:
+    """
+    Кэш разобранных маршрутов: массивов широта/долгота/высота формы (3, N).
+
+    Attributes:
+        cache_dir (str): каталог кэша.
+        max_entries (int): максимальное количество записей в кэше.
+        hits (int): количество маршрутов, загруженных из кэша.
+        misses (int): количество маршрутов, разобранных заново.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = 64):
+        """
+        Args:
+            cache_dir (str): каталог кэша, создаётся при необходимости.
+            max_entries (int): максимальное количество записей в кэше.
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def content_hash(file_path: str) -> str:
+        """
+        Вычисляет хэш содержимого файла маршрута.
+
+        Args:
+            file_path (str): путь к WPL файлу.
+
+        Returns:
+            str: шестнадцатеричный sha256 содержимого.
+        """
+        digest = sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(_HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{_ENTRY_PREFIX}{key}{_ENTRY_SUFFIX}")
+
+    def load(self, key: str) -> Optional[np.ndarray]:
+        """
+        Загружает запись кэша через mmap.
+
+        Args:
+            key (str): хэш содержимого файла маршрута.
+
+        Returns:
+            Optional[np.ndarray]: массив точек только для чтения или None, если записи нет.
+        """
+        path = self._entry_path(key)
+        try:
+            table = np.load(path, mmap_mode='r', allow_pickle=False)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # повреждённая запись (например, прерванная запись на диск)
+            self._remove(path)
+            return None
+        if table.ndim != 2 or table.shape[0] != 3:
+            self._remove(path)
+            return None
+        # время изменения файла - время последнего использования записи
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return table
+
+    def store(self, key: str, table: np.ndarray):
+        """
+        Сохраняет запись кэша. Запись атомарна: файл сначала пишется
+        во временный файл, поэтому параллельные процессы не увидят её частично.
+
+        Args:
+            key (str): хэш содержимого файла маршрута.
+            table (np.ndarray): массив точек формы (3, N).
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                np.save(file, np.ascontiguousarray(table, dtype=np.float64), allow_pickle=False)
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError:
+            self._remove(tmp_path)
+            return
+        self._prune()
+
+    def get_or_parse(self, file_path: str, parse: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Возвращает разобранный маршрут из кэша или разбирает файл и сохраняет результат.
+
+        Args:
+            file_path (str): путь к WPL файлу.
+            parse (Callable[[], np.ndarray]): разбор файла, возвращает массив формы (N, 3).
+
+        Returns:
+            np.ndarray: массив широта/долгота/высота формы (3, N).
+        """
+        key = self.content_hash(file_path)
+        table = self.load(key)
+        if table is not None:
+            self.hits += 1
+            return table
+        self.misses += 1
+        table = np.ascontiguousarray(parse().T)
+        self.store(key, table)
+        return table
+
+    def _prune(self):
+        """ удаление записей другой версии формата и давно не использовавшихся записей """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(_ENTRY_SUFFIX):
+                continue
+            if not entry.name.startswith(_ENTRY_PREFIX):
+                if entry.name.startswith("mission-v"):
+                    self._remove(entry.path)
+                continue
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
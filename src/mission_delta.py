@@ -0,0 +1,95 @@
+""" модуль построения маршрутного задания в формате QGC WPL и его изменений
+
+Маршрут передаётся в систему мониторинга текстом QGC WPL 110. Версия маршрута -
+первые MISSION_VERSION_LENGTH символов шестнадцатеричного sha256 этого текста,
+система мониторинга вычисляет её так же.
+
+Изменение маршрута относительно известной получателю версии передаётся
+одним фрагментом: строки [start, end) прежнего маршрута заменяются строками lines.
+Номера строк в изменении считаются без заголовка, а сами строки - без
+первого поля (номера команды): номера команд получатель расставляет заново
+по порядку, поэтому вставка точки не меняет все последующие строки.
+"""
+from hashlib import sha256
+from typing import List, Tuple
+
+from src.mission_type import Mission
+
+WPL_HEADER = "QGC WPL 110"
+MISSION_VERSION_LENGTH = 16
+
+
+def mission_to_wpl_lines(mission: Mission) -> List[str]:
+    """
+    Строит строки маршрута QGC WPL без заголовка и номеров команд.
+
+    Args:
+        mission (Mission): маршрутное задание.
+
+    Returns:
+        List[str]: строки маршрута: домашняя точка, затем путевые точки.
+    """
+    lines = [f"1\t0\t16\t0\t5\t0\t0\t{mission.home.latitude}\t{mission.home.longitude}\t0\t1"]
+    lines.extend(f"0\t3\t16\t0\t5\t0\t0\t{wp.latitude}\t{wp.longitude}\t0\t1"
+                 for wp in mission.waypoints)
+    return lines
+
+
+def wpl_from_lines(lines: List[str]) -> str:
+    """
+    Собирает текст QGC WPL из строк без номеров команд за один проход.
+
+    Args:
+        lines (List[str]): строки маршрута.
+
+    Returns:
+        str: текст маршрута.
+    """
+    return "\n".join([WPL_HEADER, *(f"{i}\t{line}" for i, line in enumerate(lines))]) + "\n"
+
+
+def mission_version(mission_str: str) -> str:
+    """
+    Вычисляет версию маршрута по его тексту.
+
+    Args:
+        mission_str (str): текст маршрута QGC WPL.
+
+    Returns:
+        str: версия маршрута.
+    """
+    return sha256(mission_str.encode()).hexdigest()[:MISSION_VERSION_LENGTH]
+
+
+def diff_lines(old: List[str], new: List[str]) -> Tuple[int, int, List[str]]:
+    """
+    Находит изменённый фрагмент маршрута за линейное время:
+    общие начало и конец прежнего и нового маршрута не передаются.
+
+    Args:
+        old (List[str]): строки прежнего маршрута.
+        new (List[str]): строки нового маршрута.
+
+    Returns:
+        Tuple[int, int, List[str]]: строки old[start:end] заменяются на возвращённые строки.
+    """
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    suffix = 0
+    while suffix < limit - start and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return start, len(old) - suffix, new[start:len(new) - suffix]
+
+
+def apply_diff(old: List[str], start: int, end: int, lines: List[str]) -> List[str]:
+    """
+    Применяет изменение к строкам маршрута.
+
+    Raises:
+        ValueError: Если фрагмент выходит за границы маршрута.
+    """
+    if not 0 <= start <= end <= len(old):
+        raise ValueError(f"изменение [{start}, {end}) выходит за границы маршрута")
+    return old[:start] + lines + old[end:]
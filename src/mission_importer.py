@@ -1,22 +1,32 @@
 """ модуль для импортирования миссии из wpl файла """
 
-from typing import List
+from typing import List, Optional
 from geopy import Point as GeoPoint
+from src.config import MISSION_CACHE_DIR
+from src.mission_cache import MissionCache
 from src.mission_type import GeoSpecificSpeedLimit, Mission
-from src.wpl_parser import WPLParser
+from src.wpl_parser import GeoPointArray, WPLParser
 
 
 class MissionImporter:
     """ класс для импортирования миссии """
 
-    def __init__(self, mission_file: str):
+    def __init__(self, mission_file: str, cache_dir: Optional[str] = MISSION_CACHE_DIR):
         """__init__ конструктор
 
         Args:
             mission_file (str): имя файла с миссией
+            cache_dir (str, optional): каталог кэша разобранных маршрутов,
+                None - разбирать файл при каждом импорте
         """
         self._wpl_parser = WPLParser(file_path=mission_file)
-        self._waypoints = self._wpl_parser.parse()
+        if cache_dir is None:
+            # координаты точек хранятся в массивах, GeoPoint создаются по обращению
+            self._waypoints = self._wpl_parser.parse_points()
+        else:
+            table = MissionCache(cache_dir).get_or_parse(
+                mission_file, self._wpl_parser.parse_arrays)
+            self._waypoints = GeoPointArray(table[0], table[1])
         self._mission = Mission(
             home=self._waypoints[0], waypoints=self._waypoints, speed_limits=[], armed=False)
 
@@ -1,163 +1,149 @@
-""" модуль отправки телеметрии в систему мониторинга """
-from multiprocessing import Queue, Process
-from queue import Empty
+""" модуль отправки маршрутного задания в систему мониторинга """
 import json
-from time import sleep, time
+from collections import deque
+from typing import Dict, List, Optional
 
-import paho.mqtt.client as mqtt
-
-from src.config import CRITICALITY_STR, \
-    LOG_DEBUG, LOG_ERROR, LOG_INFO, MISSION_SENDER_QUEUE_NAME, DEFAULT_LOG_LEVEL
+from src.config import LOG_DEBUG, LOG_ERROR, LOG_INFO, MISSION_SENDER_QUEUE_NAME, \
+    DEFAULT_LOG_LEVEL
+from src.mission_delta import diff_lines, mission_to_wpl_lines, mission_version, wpl_from_lines
 from src.mission_type import Mission
+from src.event_types import Event
 from src.queues_dir import QueuesDirectory
-from src.event_types import Event, ControlEvent
-
-
-class MissionSender(Process):
-    """ класс отправки маршрутного задания в систему мониторинга по mqtt """
-    MQTT_BROKER = "localhost"
-    MQTT_PORT = 1883
-    MQTT_MISSION_TOPIC = 'api/mission'
-    TIMEOUT = 5
+from src.mqtt_connection import MqttConnection
+from src.mqtt_sender import BaseMqttSender
+
+# результаты обработки маршрута (см. MissionVerificationStatus в СУПА)
+MISSION_ACCEPTED = 'Mission accepted.'
+# система мониторинга не смогла применить изменение: нужен полный маршрут
+MISSION_RESEND_STATUSES = (
+    'Error: The mission delta refers to an unknown mission version.',
+    'Error: The mission does not match its version.',
+)
+
+
+class MissionSender(BaseMqttSender):
+    """ класс отправки маршрутного задания в систему мониторинга по mqtt
+
+    Первый маршрут отправляется целиком, последующие - изменением относительно
+    последней версии, которую система мониторинга подтвердила в ответе
+    (топик MQTT_STATUS_TOPIC/<client_id>, см. src.mission_delta). Если изменение
+    не удалось применить, маршрут отправляется целиком. Для надёжности
+    каждый FULL_MISSION_EVERY-й маршрут также отправляется целиком.
+    """
+    MQTT_TOPIC = 'api/mission'
+    MQTT_STATUS_TOPIC = 'api/mission/status'
+    FULL_MISSION_EVERY = 10
 
     log_prefix = "[MISSION_PLANNER.MQTT]"
     event_source_name = MISSION_SENDER_QUEUE_NAME
-    events_q_name = event_source_name    
+    events_q_name = event_source_name
 
     def __init__(self, queues_dir: QueuesDirectory, client_id='', log_level = DEFAULT_LOG_LEVEL):
-        super().__init__()
-
-        self._queues_dir = queues_dir
-        self._client_id = client_id
-
-        # создаём очередь для сообщений на обработку
-        self._events_q = Queue()
-        self._events_q_name = self.events_q_name
-        self._queues_dir.register(
-            queue=self._events_q, name=self._events_q_name)
-
-        self._quit = False
-        # очередь управляющих команд (например, для остановки симуляции)
-        self._control_q = Queue()
-
-        self._mqttc = None
-        self._published = False
-
-        # инициализируем интервал обновления
-        self._recalc_interval_sec = 0.5
-        self.log_level = log_level
-
-    def _log_message(self, criticality: int, message: str):
-        """_log_message печатает сообщение заданного уровня критичности
-
-        Args:
-            criticality (int): уровень критичности
-            message (str): текст сообщения
-        """
-        if criticality <= self.log_level:
-            print(f"[{CRITICALITY_STR[criticality]}]{self.log_prefix} {message}")
-
-    # The callback for when the client receives a CONNACK response from the server.
-    def _on_connect(self, _, userdata, flags, reason_code):
-        self._log_message(
-            LOG_DEBUG, f"Connected with result code {reason_code}, other info: {userdata}, {flags}")
-
-    def _on_log(self, _, __, ___, buf):
-        if self.log_level > 2:
-            print(f"{self.log_prefix} LOG >> {buf}")
-
-    # The callback for when a PUBLISH message is received from the server.
-    def _on_message(self, _, __, msg):
-        print(msg.topic+" "+str(msg.payload))
-
-    def _on_publish(self, _, __, ___):
-        self._published = True
-
-    def stop(self):
-        """ запрос остановки работы """
-        self._control_q.put(ControlEvent(operation='stop'))
-
-    # проверка наличия новых управляющих команд
-    def _check_control_q(self):
-        try:
-            request: ControlEvent = self._control_q.get_nowait()
-            self._log_message(LOG_DEBUG, "проверяем запрос {request}")
-            if not isinstance(request, ControlEvent):
-                return
-            if request.operation == 'stop':
-                # поступил запрос на остановку монитора, поднимаем "красный флаг"
-                self._quit = True
-        except Empty:
-            # никаких команд не поступило, ну и ладно
-            pass
+        super().__init__(queues_dir, client_id=client_id, log_level=log_level)
+        # последний отправленный маршрут
+        self._sent_lines: Optional[List[str]] = None
+        self._sent_version: Optional[str] = None
+        # последний маршрут, подтверждённый системой мониторинга, - основа изменений
+        self._acked_lines: Optional[List[str]] = None
+        self._acked_version: Optional[str] = None
+        # отправленные и ещё не подтверждённые версии -> строки маршрута
+        self._unacked: Dict[str, List[str]] = {}
+        self._deltas_sent = 0
+        # ответы системы мониторинга из сетевого потока paho, обрабатываются перед отправкой и в _on_idle
+        self._statuses = deque()
+        # последний отправленный маршрут нужно отправить целиком
+        self._resend_full = False
+
+    def attach(self, connection: MqttConnection):
+        super().attach(connection)
+        connection.subscribe(f"{self.MQTT_STATUS_TOPIC}/{self._client_id}", self._statuses.append)
 
     def _mission_to_mavlink_waypoints(self, mission: Mission):
-        result = "QGC WPL 110\n"
-        result += f"0\t1\t0\t16\t0\t5\t0\t0\t{mission.home.latitude}" + \
-                  f"\t{mission.home.longitude}\t0\t1\n"
-        for i, wp in enumerate(mission.waypoints):
-            result += f"{i}\t0\t3\t16\t0\t5\t0\t0\t{wp.latitude}\t{wp.longitude}\t0\t1\n"
-        return result
+        return wpl_from_lines(mission_to_wpl_lines(mission))
+
+    def _full_payload(self, mission_str: str, version: str) -> str:
+        return json.dumps({'id': self._client_id, 'version': version, 'mission_str': mission_str})
+
+    def _mission_payload(self, lines: List[str], mission_str: str, version: str) -> str:
+        """ сообщение с изменением маршрута, если оно короче полного маршрута, иначе полный """
+        full = self._full_payload(mission_str, version)
+        # повторная отправка неподтверждённой версии - всегда полным маршрутом
+        if self._acked_lines is None or version == self._sent_version \
+                or self._deltas_sent + 1 >= self.FULL_MISSION_EVERY:
+            self._deltas_sent = 0
+            return full
+        start, end, changed = diff_lines(self._acked_lines, lines)
+        delta = json.dumps({'id': self._client_id, 'base_version': self._acked_version,
+                            'version': version, 'start': start, 'end': end, 'lines': changed})
+        if len(delta) >= len(full):
+            self._deltas_sent = 0
+            return full
+        self._deltas_sent += 1
+        return delta
 
     def _post_mission(self, event: Event):
         try:
             mission: Mission = event.parameters
-            payload = json.dumps({
-                'id': self._client_id,
-                'mission_str': self._mission_to_mavlink_waypoints(mission)
-            })
-            self._mqttc.publish(
-                self.MQTT_MISSION_TOPIC, payload, qos=1)
-            start_time = time()
-            while not self._published and time() - start_time < self.TIMEOUT:
-                sleep(0.1)
-            if self._published:
-                self._log_message(LOG_INFO, f"отправлен маршрут: {payload}")
-            else:
-                self._log_message(LOG_INFO, "таймаут отправки маршрута")
+            # основа изменения - последняя подтверждённая версия с учётом пришедших ответов
+            self._process_statuses()
+            lines = mission_to_wpl_lines(mission)
+            mission_str = wpl_from_lines(lines)
+            version = mission_version(mission_str)
+            # пропускается только последний отправленный маршрут, который система мониторинга
+            # уже приняла; отклонённый, потерянный или оставшийся без ответа отправляется снова
+            if version == self._acked_version == self._sent_version:
+                self._log_message(LOG_DEBUG, f"маршрут {version} не изменился")
+                return
+            payload = self._mission_payload(lines, mission_str, version)
+            if self._publish(payload):
+                self._sent_lines = lines
+                self._sent_version = version
+                self._resend_full = False
+                self._unacked[version] = lines
+                # без ответов (например, от прежней версии системы мониторинга) список не растёт
+                while len(self._unacked) > self.FULL_MISSION_EVERY:
+                    del self._unacked[next(iter(self._unacked))]
+                self._log_message(
+                    LOG_INFO, f"отправлен маршрут {version} ({len(payload)} байт)")
+                self._log_message(LOG_DEBUG, f"отправлен маршрут: {payload}")
         except Exception as e:
             self._log_message(LOG_ERROR, f"ошибка отправки маршрута: {e}")
 
-    def _check_events_q(self):
-        while True:
+    def _process_statuses(self):
+        """ учёт ответов системы мониторинга о результате обработки маршрута """
+        while self._statuses:
             try:
-                event: Event = self._events_q.get_nowait()
-                # print(f"{self.log_prefix} обрабатываем событие: {event}")
-                if not isinstance(event, Event):
-                    return
-                if event.operation == 'post_mission':
-                    self._post_mission(event)
-            except Empty:
-                # все входящие события обработаны
-                break
-
-    def run(self):
-        self._log_message(LOG_INFO, "старт клиента телеметрии")
-
-        mqttc = mqtt.Client(client_id=self._client_id)
-        mqttc.connect(self.MQTT_BROKER,
-                      self.MQTT_PORT, 60)
-
-        mqttc.on_connect = self._on_connect
-
-        mqttc.on_message = self._on_message
-
-        self._published = False
-
-        mqttc.on_publish = self._on_publish
-
-        mqttc.on_log = self._on_log
-
-        self._mqttc = mqttc
-
-        self._mqttc.loop_start()
-        self._log_message(
-            LOG_INFO, "клиент отправки маршрута создан и запущен")
-
-        while self._quit is False:
-            self._check_events_q()
-            self._check_control_q()
-            sleep(self._recalc_interval_sec)
-
-        self._mqttc.loop_stop()
-        self._mqttc.disconnect()
+                answer = json.loads(self._statuses.popleft())
+                version, status = answer['version'], answer['status']
+            except (ValueError, KeyError, TypeError) as e:
+                self._log_message(LOG_ERROR, f"неверный ответ на маршрут: {e}")
+                continue
+            if status == MISSION_ACCEPTED:
+                lines = self._unacked.pop(version, None)
+                if lines is not None:
+                    self._acked_lines = lines
+                    self._acked_version = version
+                    self._log_message(LOG_DEBUG, f"маршрут {version} подтверждён")
+            elif status in MISSION_RESEND_STATUSES:
+                self._unacked.pop(version, None)
+                # основа изменений у получателя другая: до подтверждения отправляются полные маршруты
+                self._acked_lines = self._acked_version = None
+                self._resend_full = version == self._sent_version
+                self._log_message(LOG_INFO, f"маршрут {version} не применён: {status}")
+            else:
+                self._unacked.pop(version, None)
+                self._log_message(LOG_ERROR, f"маршрут {version} отклонён: {status}")
+
+    def _on_idle(self):
+        self._process_statuses()
+        if self._resend_full and self._connection.can_send():
+            payload = self._full_payload(wpl_from_lines(self._sent_lines), self._sent_version)
+            if self._publish(payload):
+                self._resend_full = False
+                self._deltas_sent = 0
+                self._unacked[self._sent_version] = self._sent_lines
+                self._log_message(LOG_INFO, f"маршрут {self._sent_version} отправлен целиком")
+
+    def _handle_event(self, event: Event):
+        if event.operation == 'post_mission':
+            self._post_mission(event)
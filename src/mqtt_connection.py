@@ -0,0 +1,167 @@
+""" модуль соединения с брокером MQTT системы мониторинга """
+from typing import Callable, Dict, Optional
+
+import paho.mqtt.client as mqtt
+
+from src.config import MQTT_BROKER_HOST, MQTT_BROKER_PORT
+from src.mqtt_inflight import DeliveryCallback, InflightTracker
+
+
+class MqttConnection:
+    """
+    Соединение с брокером MQTT с автоматическим переподключением.
+
+    Подключение выполняется в сетевом потоке paho, поэтому недоступный
+    при старте брокер не приводит к ошибке: клиент повторяет попытки
+    с экспоненциально растущей задержкой от reconnect_min_delay_sec
+    до reconnect_max_delay_sec. Так же восстанавливается оборванное соединение.
+
+    Через одно соединение могут отправлять сообщения несколько отправителей,
+    статистика отправки ведётся по каждому топику. Отправители также могут
+    подписаться на ответы системы мониторинга (subscribe), подписки
+    восстанавливаются после переподключения.
+    """
+
+    def __init__(self, client_id: str = '', host: str = MQTT_BROKER_HOST,
+                 port: int = MQTT_BROKER_PORT, inflight_window: int = 32,
+                 ack_timeout_sec: float = 5.0, reconnect_min_delay_sec: int = 1,
+                 reconnect_max_delay_sec: int = 30,
+                 log: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            client_id (str): идентификатор клиента.
+            host (str): адрес брокера.
+            port (int): порт брокера.
+            inflight_window (int): максимальное количество неподтверждённых сообщений.
+            ack_timeout_sec (float): время ожидания подтверждения.
+            reconnect_min_delay_sec (int): начальная задержка переподключения.
+            reconnect_max_delay_sec (int): максимальная задержка переподключения.
+            log (Callable[[str], None], optional): функция вывода сообщений о соединении.
+        """
+        self.client_id = client_id
+        self.host = host
+        self.port = port
+        self.reconnect_min_delay_sec = reconnect_min_delay_sec
+        self.reconnect_max_delay_sec = reconnect_max_delay_sec
+        self.log = log
+
+        self.inflight = InflightTracker(window=inflight_window, timeout_sec=ack_timeout_sec)
+        self.connects = 0
+        self.disconnects = 0
+        self._client = None
+        # топик -> обработчик содержимого сообщения, вызывается из сетевого потока paho
+        self._subscriptions: Dict[str, Callable[[bytes], None]] = {}
+
+    def __getstate__(self):
+        # клиент paho создаётся в том процессе, где работает соединение
+        state = self.__dict__.copy()
+        state['_client'] = None
+        return state
+
+    def _on_connect(self, client, __, ___, reason_code):
+        if reason_code == mqtt.CONNACK_ACCEPTED:
+            self.connects += 1
+            # брокер не хранит подписки клиента с чистой сессией, они отправляются при каждом подключении
+            for topic in self._subscriptions:
+                client.subscribe(topic, qos=1)
+        if self.log is not None:
+            self.log(f"подключение к брокеру {self.host}:{self.port}: "
+                      f"{mqtt.connack_string(reason_code)}")
+
+    def _on_disconnect(self, _, __, reason_code):
+        self.disconnects += 1
+        if self.log is not None and reason_code != mqtt.MQTT_ERR_SUCCESS:
+            self.log(f"соединение с брокером потеряно: {mqtt.error_string(reason_code)}, "
+                      "переподключение")
+
+    def _on_publish(self, _, __, mid):
+        self.inflight.complete(mid)
+
+    def open(self):
+        """ запуск сетевого потока, подключение выполняется в нём """
+        client = mqtt.Client(client_id=self.client_id)
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_publish = self._on_publish
+        for topic, callback in self._subscriptions.items():
+            client.message_callback_add(topic, self._message_callback(callback))
+        client.reconnect_delay_set(self.reconnect_min_delay_sec, self.reconnect_max_delay_sec)
+        client.connect_async(self.host, self.port, 60)
+        client.loop_start()
+        self._client = client
+
+    def close(self):
+        """ отключение от брокера и остановка сетевого потока """
+        if self._client is None:
+            return
+        self._client.disconnect()
+        self._client.loop_stop()
+        self._client = None
+
+    @property
+    def is_connected(self) -> bool:
+        """ соединение с брокером установлено """
+        return self._client is not None and self._client.is_connected()
+
+    def can_send(self) -> bool:
+        """ соединение установлено и в окне неподтверждённых сообщений есть место """
+        return self.is_connected and self.inflight.can_send()
+
+    def publish(self, topic: str, payload, qos: int = 1,
+                on_done: Optional[DeliveryCallback] = None) -> Optional[str]:
+        """
+        Отправка сообщения без ожидания подтверждения.
+
+        Args:
+            topic (str): топик.
+            payload: сообщение.
+            qos (int): уровень качества обслуживания.
+            on_done (DeliveryCallback, optional): уведомление о подтверждении брокером
+                или таймауте, только для успешно переданного клиенту сообщения.
+
+        Returns:
+            Optional[str]: None при успехе, иначе описание ошибки.
+        """
+        if self._client is None:
+            self.inflight.fail(topic)
+            return "соединение не открыто"
+        info = self._client.publish(topic, payload, qos=qos)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            self.inflight.fail(topic)
+            return mqtt.error_string(info.rc)
+        self.inflight.track(info.mid, topic, on_done)
+        return None
+
+    @staticmethod
+    def _message_callback(callback: Callable[[bytes], None]):
+        return lambda _, __, msg: callback(msg.payload)
+
+    def subscribe(self, topic: str, callback: Callable[[bytes], None]):
+        """
+        Подписка на топик, действует и после переподключения.
+
+        Args:
+            topic (str): топик.
+            callback (Callable[[bytes], None]): обработчик содержимого сообщения,
+                вызывается из сетевого потока paho.
+        """
+        self._subscriptions[topic] = callback
+        if self._client is None:
+            return
+        self._client.message_callback_add(topic, self._message_callback(callback))
+        if self._client.is_connected():
+            self._client.subscribe(topic, qos=1)
+
+    def expire(self):
+        """ снимает с учёта сообщения, не подтверждённые за время ожидания """
+        return self.inflight.expire()
+
+    def stats(self) -> dict:
+        """ статистика соединения и отправки, в том числе по топикам """
+        return {
+            "connected": self.is_connected,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            **self.inflight.stats(),
+            "topics": self.inflight.topic_stats(),
+        }
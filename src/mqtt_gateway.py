@@ -0,0 +1,119 @@
+""" модуль общего шлюза MQTT бортовой системы
+
+Отправители (TelemetrySender, MissionSender и другие наследники BaseMqttSender)
+создаются как обычно и регистрируют свои очереди, но не запускаются
+отдельными процессами: их очереди обрабатывает один процесс шлюза,
+публикуя сообщения всех топиков через одно соединение с брокером.
+"""
+from multiprocessing import Queue, Process
+from queue import Empty
+from time import monotonic, sleep
+from typing import List
+
+from src.config import CRITICALITY_STR, LOG_ERROR, LOG_INFO, \
+    MQTT_BROKER_HOST, MQTT_BROKER_PORT, DEFAULT_LOG_LEVEL
+from src.event_types import ControlEvent
+from src.mqtt_connection import MqttConnection
+from src.mqtt_sender import BaseMqttSender
+
+
+class MqttGateway(Process):
+    """ шлюз, обслуживающий несколько отправителей через одно соединение с брокером """
+    log_prefix = "[MQTT]"
+
+    def __init__(self, senders: List[BaseMqttSender], client_id='',
+                 host: str = MQTT_BROKER_HOST, port: int = MQTT_BROKER_PORT,
+                 inflight_window: int = 64, ack_timeout_sec: float = 5.0,
+                 stats_interval_sec: float = 10.0, log_level=DEFAULT_LOG_LEVEL):
+        """
+        Args:
+            senders (List[BaseMqttSender]): отправители, не запущенные как процессы.
+            client_id (str): идентификатор клиента mqtt.
+            host (str): адрес брокера.
+            port (int): порт брокера.
+            inflight_window (int): общее окно неподтверждённых сообщений.
+            ack_timeout_sec (float): время ожидания подтверждения.
+            stats_interval_sec (float): период вывода статистики по топикам.
+            log_level (int): уровень логирования.
+        """
+        super().__init__()
+        self._senders = senders
+        self._connection = MqttConnection(
+            client_id=client_id, host=host, port=port, inflight_window=inflight_window,
+            ack_timeout_sec=ack_timeout_sec)
+
+        self._quit = False
+        # очередь управляющих команд (например, для остановки)
+        self._control_q = Queue()
+
+        self._stats_interval_sec = stats_interval_sec
+        self._recalc_interval_sec = 0.1
+        self.log_level = log_level
+
+    def _log_message(self, criticality: int, message: str):
+        """_log_message печатает сообщение заданного уровня критичности
+
+        Args:
+            criticality (int): уровень критичности
+            message (str): текст сообщения
+        """
+        if criticality <= self.log_level:
+            print(f"[{CRITICALITY_STR[criticality]}]{self.log_prefix} {message}")
+
+    def _log_connection(self, message: str):
+        self._log_message(LOG_INFO, message)
+
+    def stop(self):
+        """ запрос остановки работы """
+        self._control_q.put(ControlEvent(operation='stop'))
+
+    # проверка наличия новых управляющих команд
+    def _check_control_q(self):
+        try:
+            request: ControlEvent = self._control_q.get_nowait()
+            if not isinstance(request, ControlEvent):
+                return
+            if request.operation == 'stop':
+                # поступил запрос на остановку, поднимаем "красный флаг"
+                self._quit = True
+        except Empty:
+            # никаких команд не поступило, ну и ладно
+            pass
+
+    def _check_inflight(self):
+        """ учёт сообщений, не подтверждённых брокером за время ожидания """
+        expired = self._connection.expire()
+        if expired:
+            self._log_message(LOG_ERROR, f"таймаут подтверждения отправки: {expired}")
+
+    def _log_stats(self, criticality: int = LOG_INFO):
+        stats = self._connection.stats()
+        topics = stats.pop("topics")
+        self._log_message(criticality, f"соединение: {stats}")
+        for topic, topic_stats in topics.items():
+            self._log_message(criticality, f"{topic}: {topic_stats}")
+
+    def run(self):
+        self._log_message(
+            LOG_INFO, f"старт шлюза, топики: {[s.MQTT_TOPIC for s in self._senders]}")
+
+        self._connection.log = self._log_connection
+        self._connection.open()
+        for sender in self._senders:
+            sender.attach(self._connection)
+
+        last_stats = monotonic()
+        while self._quit is False:
+            for sender in self._senders:
+                sender.process()
+            self._check_control_q()
+            self._check_inflight()
+            if monotonic() - last_stats >= self._stats_interval_sec:
+                last_stats = monotonic()
+                self._log_stats()
+            sleep(self._recalc_interval_sec)
+
+        for sender in self._senders:
+            sender.flush()
+        self._log_stats()
+        self._connection.close()
@@ -0,0 +1,202 @@
+""" модуль учёта сообщений MQTT, ожидающих подтверждения доставки (QoS 1) """
+from threading import Lock
+from time import monotonic
+from typing import Callable, Dict, List, Optional, Tuple
+
+# вызывается с mid и признаком доставки: True - подтверждено брокером, False - таймаут
+DeliveryCallback = Callable[[int, bool], None]
+
+
+class InflightTracker:
+    """
+    Окно сообщений, отправленных брокеру и ещё не подтверждённых им.
+
+    Отправитель регистрирует идентификатор сообщения (mid), полученный от
+    publish(), а обработчик on_publish клиента paho отмечает подтверждение.
+    Так отправитель не ждёт подтверждения каждого сообщения,
+    но и не отправляет больше, чем позволяет окно.
+
+    on_publish вызывается из сетевого потока paho, поэтому все методы
+    защищены блокировкой.
+
+    Если сообщения регистрируются с указанием топика, статистика
+    ведётся также по каждому топику. Отправитель, которому важна доставка
+    конкретного сообщения, передаёт в track() функцию on_done: она вызывается
+    после подтверждения (из сетевого потока paho) или по таймауту (из expire()).
+
+    Attributes:
+        window (int): максимальное количество неподтверждённых сообщений.
+        timeout_sec (float): время ожидания подтверждения.
+    """
+    # подтверждение может прийти из сетевого потока раньше, чем publish() вернёт mid;
+    # такое подтверждение засчитывается, только если track() вызван в пределах EARLY_ACK_SEC
+    EARLY_ACK_SEC = 1.0
+
+    def __init__(self, window: int = 32, timeout_sec: float = 5.0):
+        """
+        Args:
+            window (int): максимальное количество неподтверждённых сообщений.
+            timeout_sec (float): время ожидания подтверждения.
+        """
+        self.window = window
+        self.timeout_sec = timeout_sec
+
+        self._lock = Lock()
+        # mid -> (время отправки, топик, функция уведомления о доставке)
+        self._inflight: Dict[int, Tuple[float, Optional[str], Optional[DeliveryCallback]]] = {}
+        # топик -> [отправлено, подтверждено, ошибок]
+        self._topics: Dict[str, List[int]] = {}
+        # подтверждения, пришедшие раньше регистрации сообщения: mid -> время подтверждения
+        self._early_acks: Dict[int, float] = {}
+        # mid сообщений, снятых с учёта по таймауту, для которых подтверждение ещё может прийти;
+        # paho повторно использует mid, поэтому опоздавшее подтверждение не должно засчитаться новому
+        self._expired: Dict[int, None] = {}
+
+        self.sent = 0
+        self.acked = 0
+        self.failed = 0
+        self._latency_sum = 0.0
+        self._latency_count = 0
+        self.max_latency = 0.0
+
+    def __getstate__(self):
+        # блокировка не передаётся в другой процесс, создаётся заново
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def can_send(self) -> bool:
+        """ есть ли место в окне для нового сообщения """
+        with self._lock:
+            return len(self._inflight) < self.window
+
+    def _topic_counters(self, topic: Optional[str]) -> Optional[List[int]]:
+        if topic is None:
+            return None
+        counters = self._topics.get(topic)
+        if counters is None:
+            counters = self._topics[topic] = [0, 0, 0]
+        return counters
+
+    def _remember(self, mids: dict, mid: int, value):
+        """ запоминает mid, вытесняя самые старые, чтобы хранить не больше window """
+        mids[mid] = value
+        while len(mids) > self.window:
+            del mids[next(iter(mids))]
+
+    def track(self, mid: int, topic: Optional[str] = None,
+              on_done: Optional[DeliveryCallback] = None):
+        """
+        Регистрирует отправленное сообщение.
+
+        Args:
+            mid (int): идентификатор сообщения из publish().
+            topic (str, optional): топик сообщения.
+            on_done (DeliveryCallback, optional): уведомление о доставке или таймауте.
+        """
+        with self._lock:
+            self.sent += 1
+            counters = self._topic_counters(topic)
+            if counters is not None:
+                counters[0] += 1
+            early_ack = self._early_acks.pop(mid, None)
+            acked = early_ack is not None and monotonic() - early_ack <= self.EARLY_ACK_SEC
+            self._expired.pop(mid, None)
+            if acked:
+                self.acked += 1
+                if counters is not None:
+                    counters[1] += 1
+            else:
+                self._inflight[mid] = (monotonic(), topic, on_done)
+        if acked and on_done is not None:
+            on_done(mid, True)
+
+    def fail(self, topic: Optional[str] = None):
+        """ учитывает сообщение, которое не удалось отправить """
+        with self._lock:
+            self.failed += 1
+            counters = self._topic_counters(topic)
+            if counters is not None:
+                counters[2] += 1
+
+    def complete(self, mid: int) -> Optional[float]:
+        """
+        Отмечает подтверждение сообщения брокером, вызывается из on_publish.
+
+        Args:
+            mid (int): идентификатор сообщения.
+
+        Returns:
+            Optional[float]: время от отправки до подтверждения в секундах
+                или None, если сообщение ещё не было зарегистрировано.
+        """
+        with self._lock:
+            inflight = self._inflight.pop(mid, None)
+            if inflight is None:
+                if mid in self._expired:
+                    # подтверждение после таймаута: сообщение уже учтено как ошибка
+                    del self._expired[mid]
+                else:
+                    self._remember(self._early_acks, mid, monotonic())
+                return None
+            start, topic, on_done = inflight
+            latency = monotonic() - start
+            self.acked += 1
+            if topic is not None:
+                self._topics[topic][1] += 1
+            self._latency_sum += latency
+            self._latency_count += 1
+            self.max_latency = max(self.max_latency, latency)
+        if on_done is not None:
+            on_done(mid, True)
+        return latency
+
+    def expire(self) -> List[int]:
+        """
+        Снимает с учёта сообщения, не подтверждённые за время ожидания.
+
+        Returns:
+            List[int]: идентификаторы просроченных сообщений.
+        """
+        deadline = monotonic() - self.timeout_sec
+        callbacks = []
+        with self._lock:
+            expired = [mid for mid, (start, _, _) in self._inflight.items() if start < deadline]
+            for mid in expired:
+                _, topic, on_done = self._inflight.pop(mid)
+                if topic is not None:
+                    self._topics[topic][2] += 1
+                if on_done is not None:
+                    callbacks.append((mid, on_done))
+                self._remember(self._expired, mid, None)
+            self.failed += len(expired)
+        for mid, on_done in callbacks:
+            on_done(mid, False)
+        return expired
+
+    def stats(self) -> dict:
+        """ статистика отправки: отправлено, подтверждено, ошибок, задержки подтверждения """
+        with self._lock:
+            measured = self._latency_count
+            return {
+                "sent": self.sent,
+                "acked": self.acked,
+                "failed": self.failed,
+                "inflight": len(self._inflight),
+                "avg_ack_latency_sec": self._latency_sum / measured if measured else 0.0,
+                "max_ack_latency_sec": self.max_latency,
+            }
+
+    def topic_stats(self) -> Dict[str, dict]:
+        """ статистика отправки по топикам: отправлено, подтверждено, ошибок """
+        with self._lock:
+            return {topic: {"sent": sent, "acked": acked, "failed": failed}
+                    for topic, (sent, acked, failed) in self._topics.items()}
@@ -0,0 +1,165 @@
+""" модуль базового отправителя сообщений в систему мониторинга по mqtt """
+from abc import abstractmethod
+from multiprocessing import Queue, Process
+from queue import Empty
+from time import sleep
+from typing import Optional
+
+from src.config import CRITICALITY_STR, LOG_ERROR, LOG_INFO, \
+    MQTT_BROKER_HOST, MQTT_BROKER_PORT, DEFAULT_LOG_LEVEL
+from src.event_types import Event, ControlEvent
+from src.mqtt_connection import MqttConnection
+from src.mqtt_inflight import DeliveryCallback
+from src.queues_dir import QueuesDirectory
+
+
+class BaseMqttSender(Process):
+    """
+    Базовый класс отправителя сообщений в систему мониторинга.
+
+    Отправитель принимает события из своей очереди и публикует сообщения в свой топик.
+    Он может работать отдельным процессом со своим соединением с брокером
+    или внутри MqttGateway, через общее соединение.
+    """
+    MQTT_BROKER = MQTT_BROKER_HOST
+    MQTT_PORT = MQTT_BROKER_PORT
+    MQTT_TOPIC = ''
+    TIMEOUT = 5
+    # максимальное количество неподтверждённых брокером сообщений
+    INFLIGHT_WINDOW = 32
+
+    log_prefix = "[MQTT]"
+    events_q_name = ''
+
+    def __init__(self, queues_dir: QueuesDirectory, client_id='', log_level=DEFAULT_LOG_LEVEL):
+        super().__init__()
+
+        self._queues_dir = queues_dir
+        self._client_id = client_id
+
+        # создаём очередь для сообщений на обработку
+        self._events_q = Queue()
+        self._events_q_name = self.events_q_name
+        self._queues_dir.register(
+            queue=self._events_q, name=self._events_q_name)
+
+        self._quit = False
+        # очередь управляющих команд (например, для остановки симуляции)
+        self._control_q = Queue()
+
+        # соединение с брокером, создаётся при запуске
+        self._connection: Optional[MqttConnection] = None
+
+        # инициализируем интервал обновления
+        self._recalc_interval_sec = 0.5
+        self.log_level = log_level
+
+    def _log_message(self, criticality: int, message: str):
+        """_log_message печатает сообщение заданного уровня критичности
+
+        Args:
+            criticality (int): уровень критичности
+            message (str): текст сообщения
+        """
+        if criticality <= self.log_level:
+            print(f"[{CRITICALITY_STR[criticality]}]{self.log_prefix} {message}")
+
+    def _log_connection(self, message: str):
+        self._log_message(LOG_INFO, message)
+
+    def attach(self, connection: MqttConnection):
+        """ подключение отправителя к соединению с брокером """
+        self._connection = connection
+
+    def _publish(self, payload, on_done: Optional[DeliveryCallback] = None) -> bool:
+        """_publish отправка сообщения без ожидания подтверждения,
+        подтверждение учитывается соединением
+
+        Args:
+            payload: сообщение.
+            on_done (DeliveryCallback, optional): уведомление о подтверждении брокером
+                или таймауте; вызывается из сетевого потока paho
+
+        Returns:
+            bool: True, если сообщение передано клиенту mqtt
+        """
+        error = self._connection.publish(self.MQTT_TOPIC, payload, on_done=on_done)
+        if error is not None:
+            self._log_message(LOG_ERROR, f"ошибка отправки в {self.MQTT_TOPIC}: {error}")
+            return False
+        return True
+
+    @abstractmethod
+    def _handle_event(self, event: Event):
+        """ обработка события из очереди отправителя """
+
+    def _on_idle(self):
+        """ действия после обработки очереди, например отправка накопленных данных """
+
+    def flush(self):
+        """ отправка накопленных данных перед закрытием соединения """
+
+    def _can_accept_events(self) -> bool:
+        """ можно ли забирать события из очереди; по умолчанию - пока есть
+        соединение и место в окне неподтверждённых сообщений """
+        return self._connection.can_send()
+
+    def _check_events_q(self):
+        # пока забирать события нельзя, они остаются в очереди
+        while self._can_accept_events():
+            try:
+                event: Event = self._events_q.get_nowait()
+                if not isinstance(event, Event):
+                    return
+                self._handle_event(event)
+            except Empty:
+                # все входящие события обработаны
+                break
+
+    def process(self):
+        """ один цикл обработки очереди, вызывается в run или в MqttGateway """
+        self._check_events_q()
+        self._on_idle()
+
+    def stop(self):
+        """ запрос остановки работы """
+        self._control_q.put(ControlEvent(operation='stop'))
+
+    # проверка наличия новых управляющих команд
+    def _check_control_q(self):
+        try:
+            request: ControlEvent = self._control_q.get_nowait()
+            if not isinstance(request, ControlEvent):
+                return
+            if request.operation == 'stop':
+                # поступил запрос на остановку, поднимаем "красный флаг"
+                self._quit = True
+        except Empty:
+            # никаких команд не поступило, ну и ладно
+            pass
+
+    def _check_inflight(self):
+        """ учёт сообщений, не подтверждённых брокером за время ожидания """
+        expired = self._connection.expire()
+        if expired:
+            self._log_message(
+                LOG_ERROR, f"таймаут подтверждения отправки в {self.MQTT_TOPIC}: {expired}")
+
+    def run(self):
+        self._log_message(LOG_INFO, f"старт отправки в {self.MQTT_TOPIC}")
+
+        self.attach(MqttConnection(
+            client_id=self._client_id, host=self.MQTT_BROKER, port=self.MQTT_PORT,
+            inflight_window=self.INFLIGHT_WINDOW, ack_timeout_sec=self.TIMEOUT,
+            log=self._log_connection))
+        self._connection.open()
+
+        while self._quit is False:
+            self.process()
+            self._check_control_q()
+            self._check_inflight()
+            sleep(self._recalc_interval_sec)
+
+        self.flush()
+        self._log_message(LOG_INFO, f"статистика отправки: {self._connection.stats()}")
+        self._connection.close()
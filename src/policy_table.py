@@ -0,0 +1,108 @@
+""" модуль скомпилированной таблицы политик безопасности """
+from sys import intern
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, Mapping
+
+from src.security_policy_type import SecurityPolicy
+
+# подстановочный знак: политика действует для любого значения поля
+ANY = '*'
+
+_EMPTY_DESTINATIONS: Mapping[str, FrozenSet[str]] = MappingProxyType({})
+_EMPTY_OPERATIONS: FrozenSet[str] = frozenset()
+
+
+def _freeze(trie: Mapping[str, Mapping[str, Iterable[str]]]) -> Mapping[str, Mapping[str, FrozenSet[str]]]:
+    """ дерево политик только для чтения """
+    return MappingProxyType({
+        source: MappingProxyType({destination: frozenset(operations)
+                                  for destination, operations in destinations.items()})
+        for source, destinations in trie.items()
+    })
+
+
+class CompiledPolicyTable:
+    """
+    Неизменяемая таблица политик безопасности для быстрой проверки запросов.
+
+    Политики компилируются в префиксное дерево
+    отправитель -> получатель -> множество операций,
+    поэтому проверка запроса сводится к двум поискам в словарях и одному
+    в множестве, без создания новых объектов и без перебора списка политик.
+
+    Любое из полей политики может быть подстановочным знаком ANY ('*').
+    Уровни дерева доступны только для чтения (MappingProxyType и frozenset).
+    """
+    __slots__ = ('_trie', '_has_wildcards', '_size')
+
+    def __init__(self, policies: Iterable[SecurityPolicy] = ()):
+        """
+        Компилирует политики в таблицу.
+
+        Args:
+            policies (Iterable[SecurityPolicy]): политики безопасности.
+        """
+        trie: Dict[str, Dict[str, set]] = {}
+        has_wildcards = False
+        for policy in policies:
+            source = intern(policy.source)
+            destination = intern(policy.destination)
+            operation = intern(policy.operation)
+            if ANY in (source, destination, operation):
+                has_wildcards = True
+            trie.setdefault(source, {}).setdefault(destination, set()).add(operation)
+
+        self._trie = _freeze(trie)
+        self._has_wildcards = has_wildcards
+        self._size = sum(len(operations)
+                         for destinations in self._trie.values()
+                         for operations in destinations.values())
+
+    def __getstate__(self):
+        # MappingProxyType не сериализуется, таблица передаётся в другой процесс обычными словарями
+        return ({source: dict(destinations) for source, destinations in self._trie.items()},
+                self._has_wildcards, self._size)
+
+    def __setstate__(self, state):
+        trie, has_wildcards, size = state
+        object.__setattr__(self, '_trie', _freeze(trie))
+        object.__setattr__(self, '_has_wildcards', has_wildcards)
+        object.__setattr__(self, '_size', size)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __setattr__(self, name, value):
+        if hasattr(self, '_size'):
+            raise AttributeError("таблица политик неизменяема")
+        super().__setattr__(name, value)
+
+    def is_allowed(self, source: str, destination: str, operation: str) -> bool:
+        """
+        Проверяет, разрешён ли запрос политиками.
+
+        Args:
+            source (str): отправитель.
+            destination (str): получатель.
+            operation (str): операция.
+
+        Returns:
+            bool: True, если запрос разрешён, иначе False.
+        """
+        if operation in self._trie.get(source, _EMPTY_DESTINATIONS).get(
+                destination, _EMPTY_OPERATIONS):
+            return True
+        if not self._has_wildcards:
+            return False
+        return self._is_allowed_by_wildcards(source, destination, operation)
+
+    def _is_allowed_by_wildcards(self, source: str, destination: str, operation: str) -> bool:
+        for source_key in (source, ANY):
+            destinations = self._trie.get(source_key)
+            if destinations is None:
+                continue
+            for destination_key in (destination, ANY):
+                operations = destinations.get(destination_key)
+                if operations is not None and (operation in operations or ANY in operations):
+                    return True
+        return False
@@ -13,6 +13,7 @@ from src.config import CRITICALITY_STR, DEFAULT_LOG_LEVEL, SAFETY_BLOCK_QUEUE_NA
 from src.mission_type import Mission
 from src.queues_dir import QueuesDirectory
 from src.event_types import Event, ControlEvent
+from src.geofence import Geofence
 from src.route import Route
 
 
@@ -57,9 +58,24 @@ class BaseSafetyBlock(Process):
             "set_direction": self._set_new_direction,
             "position_update": self._set_new_position,
             "lock_cargo": self._lock_cargo,
-            "release_cargo": self._release_cargo
+            "release_cargo": self._release_cargo,
+            "set_forbidden_zones": self._set_forbidden_zones,
+            "update_forbidden_zones": self._update_forbidden_zones
         }
         self._route: Optional[Route] = None
+        # запрещённые для движения зоны
+        self._geofence = Geofence()
+
+        # кэш последнего вердикта проверки безопасности:
+        # действует, пока машинка в той же ячейке и на том же сегменте маршрута,
+        # а маршрут и запрещённые зоны не менялись; ячейки, через которые
+        # проходит граница зоны, проверяются заново при каждом обновлении
+        self._verdict_cell_size_deg = 0.00005  # примерно 5 м по широте
+        self._mission_version = 0
+        self._verdict_key: Optional[tuple] = None
+        self._verdict: bool = False
+        self._verdict_hits = 0
+        self._verdict_misses = 0
 
     def _log_message(self, criticality: int, message: str):
         """_log_message печатает сообщение заданного уровня критичности
@@ -88,6 +104,90 @@ class BaseSafetyBlock(Process):
         self._mission = mission
         self._route = Route(points=self._mission.waypoints,
                             speed_limits=self._mission.speed_limits)
+        self._mission_version += 1
+
+    def _set_forbidden_zones(self, forbidden_zones: dict):
+        """ установка полного набора запрещённых зон (GeoJSON) """
+        self._geofence.load_zones(forbidden_zones)
+        self._log_message(
+            LOG_INFO, f"установлены запрещённые зоны: {len(self._geofence)}")
+
+    def _update_forbidden_zones(self, delta_zones: dict):
+        """ применение дельты изменений запрещённых зон (GeoJSON) """
+        self._geofence.apply_delta(delta_zones)
+        self._log_message(
+            LOG_INFO, f"обновлены запрещённые зоны, всего: {len(self._geofence)}")
+
+    def _is_position_forbidden(self, position: GeoPoint) -> bool:
+        """ проверка нахождения точки в запрещённой зоне """
+        return self._geofence.is_point_forbidden(position.longitude, position.latitude)
+
+    def _is_segment_forbidden(self, start: GeoPoint, end: GeoPoint) -> bool:
+        """ проверка пересечения отрезка пути с запрещёнными зонами """
+        return self._geofence.is_segment_forbidden(
+            (start.longitude, start.latitude), (end.longitude, end.latitude))
+
+    def _compute_safety_verdict(self, position: GeoPoint) -> bool:
+        """_compute_safety_verdict полная проверка безопасности текущего положения,
+        может быть расширена в наследниках (например, проверкой коридора маршрута)
+
+        Args:
+            position (GeoPoint): текущее положение
+
+        Returns:
+            bool: True, если движение безопасно
+        """
+        if self._is_position_forbidden(position):
+            return False
+        if self._route is not None and not self._route.route_finished:
+            next_point = self._route.next_point()
+            if next_point is not None and self._is_segment_forbidden(position, next_point):
+                return False
+        return True
+
+    def _is_safe(self) -> bool:
+        """_is_safe вердикт проверки безопасности с кэшированием по ячейке и сегменту
+
+        Returns:
+            bool: True, если движение безопасно
+        """
+        if self._position is None:
+            return False
+
+        cell = (int(self._position.longitude // self._verdict_cell_size_deg),
+                int(self._position.latitude // self._verdict_cell_size_deg))
+        key = (*cell, self._route.current_index if self._route is not None else -1,
+               self._mission_version, self._geofence.version)
+        if key == self._verdict_key:
+            self._verdict_hits += 1
+            return self._verdict
+
+        self._verdict_misses += 1
+        self._verdict = self._compute_safety_verdict(self._position)
+        self._verdict_key = key if self._is_verdict_uniform(cell) else None
+        return self._verdict
+
+    def _is_verdict_uniform(self, cell: tuple) -> bool:
+        """_is_verdict_uniform одинаков ли вердикт для любого положения в ячейке:
+        ни ячейку, ни отрезки из неё к следующей точке маршрута не пересекает граница зоны
+
+        Args:
+            cell (tuple): ячейка (по долготе, по широте)
+
+        Returns:
+            bool: True, если вердикт можно кэшировать
+        """
+        size = self._verdict_cell_size_deg
+        points = [((cell[0] + dx) * size, (cell[1] + dy) * size) for dx in (0, 1) for dy in (0, 1)]
+        if self._route is not None and not self._route.route_finished:
+            next_point = self._route.next_point()
+            if next_point is not None:
+                points.append((next_point.longitude, next_point.latitude))
+        return not self._geofence.crosses_boundary(points)
+
+    def get_verdict_cache_stats(self) -> dict:
+        """ статистика кэша вердиктов: попадания и промахи """
+        return {"hits": self._verdict_hits, "misses": self._verdict_misses}
 
     @abstractmethod
     def _set_new_direction(self, direction: float):
@@ -123,6 +223,9 @@ class BaseSafetyBlock(Process):
             else:
                 self._log_message(LOG_INFO, "сегмент пройден")
 
+        if not self._is_safe():
+            self._log_message(LOG_ERROR, f"небезопасное местоположение {position}")
+
     def _check_events_q(self):
         """_check_events_q
         проверяет входящие события до их полного исчерпания
@@ -1,19 +1,25 @@
 """ модуль монитора безопасности """
-from abc import abstractmethod
-from multiprocessing import Queue, Process
+from abc import ABCMeta, abstractmethod
+from multiprocessing import Queue, Process, RawValue, Value
 from queue import Empty
-
-from time import sleep
+from typing import Dict, List, Optional, Tuple
 
 from src.config import LOG_ERROR, SECURITY_MONITOR_QUEUE_NAME,\
     CRITICALITY_STR, DEFAULT_LOG_LEVEL, \
     LOG_DEBUG, LOG_INFO
 from src.queues_dir import QueuesDirectory
 from src.event_types import Event, ControlEvent
+from src.audit_journal import AuditJournal
+from src.capability_channel import CapabilityChannel
+from src.policy_table import CompiledPolicyTable
+
 
+class BaseSecurityMonitor(Process, metaclass=ABCMeta):
+    """ класс монитора безопасности
 
-class BaseSecurityMonitor(Process):
-    """ класс монитора безопасности """
+    Наследник обязан реализовать _check_event, иначе монитор не создаётся;
+    для проверки по политикам в нём используется _is_authorized.
+    """
     log_prefix = "[SECURITY]"
     event_source_name = SECURITY_MONITOR_QUEUE_NAME
     events_q_name = event_source_name
@@ -40,7 +46,19 @@ class BaseSecurityMonitor(Process):
         # очередь управляющих команд (например, для остановки работы модуля)
         self._control_q = Queue()
 
-        self._security_policies = {}
+        self._started = False
+        self._security_policies = []
+        # скомпилированная таблица для быстрой проверки запросов
+        self._policy_table = CompiledPolicyTable()
+
+        # режим каналов-мандатов для разрешённых маршрутов (по умолчанию выключен),
+        # эпоха увеличивается при изменении политик и отзывает все выданные каналы
+        self._capabilities_enabled = False
+        self._capability_epoch = Value('L', 0)
+        self._capabilities: List[CapabilityChannel] = []
+
+        # журнал аудита решений (по умолчанию выключен)
+        self._audit_journal: Optional[AuditJournal] = None
 
         self._log_message(LOG_INFO, "создан монитор безопасности")
 
@@ -79,19 +97,136 @@ class BaseSecurityMonitor(Process):
                 # в очереди не команд на обработку,
                 # выходим из цикла проверки
                 break
-            if not isinstance(event, Event):
-                # событие неправильного типа, пропускаем
-                continue
+            self._handle_event(event)
+
+    def _wait_events_q(self):
+        """_wait_events_q ожидает первое сообщение не дольше интервала обновления,
+        затем проверяет все накопившиеся сообщения
+        """
+        try:
+            event: Event = self._events_q.get(timeout=self._recalc_interval_sec)
+        except Empty:
+            return
+        self._handle_event(event)
+        self._check_events_q()
 
+    def _handle_event(self, event: Event):
+        """ проверка и пересылка одного события """
+        if not isinstance(event, Event):
+            # событие неправильного типа, пропускаем
+            return
+
+        if self.log_level >= LOG_DEBUG:
             self._log_message(LOG_DEBUG, f"получен запрос {event}")
 
-            if self._check_event(event):
-                self._proceed(event)
+        authorized = self._check_event(event)
+        if self._audit_journal is not None:
+            self._audit_journal.record(event, authorized)
+        if authorized:
+            self._proceed(event)
+
+    def start(self):
+        super().start()
+        # таблица политик теперь живёт в процессе монитора, копия в этом процессе не используется
+        self._started = True
+
+    def set_security_policies(self, policies,
+                              policy_table: Optional[CompiledPolicyTable] = None):
+        """set_security_policies установка новых политик безопасности,
+        возможна только до запуска монитора: изменения после start()
+        не передаются в процесс монитора
+
+        Args:
+            policies (List[SecurityPolicy]): политики безопасности
+            policy_table (CompiledPolicyTable, optional): уже скомпилированная
+                таблица этих политик (например, общая для нескольких мониторов)
+
+        Raises:
+            RuntimeError: Если монитор уже запущен.
+        """
+        if self._started:
+            raise RuntimeError("политики безопасности нельзя изменить после запуска монитора")
+        self._security_policies = policies
+        if policy_table is None:
+            policy_table = CompiledPolicyTable(policies)
+        self._policy_table = policy_table
+        with self._capability_epoch.get_lock():
+            self._capability_epoch.value += 1
+        self._log_message(
+            LOG_INFO, f"изменение политик безопасности: {policies}")
+
+    def _is_authorized(self, event: Event) -> bool:
+        """ проверка события по скомпилированной таблице политик """
+        return self._policy_table.is_allowed(
+            event.source, event.destination, event.operation)
 
     @abstractmethod
     def _check_event(self, event: Event):
         """ проверка события на допустимость политиками безопасности """
 
+    def enable_audit_journal(self, path: str, capacity: int = 1024,
+                             flush_interval_sec: float = 1.0):
+        """enable_audit_journal включение журнала аудита решений
+
+        Args:
+            path (str): путь к файлу журнала
+            capacity (int, optional): размер буфера записей об отказах
+            flush_interval_sec (float, optional): период сброса журнала в файл
+        """
+        self._audit_journal = AuditJournal(
+            path=path, capacity=capacity, flush_interval_sec=flush_interval_sec)
+
+    def enable_capabilities(self):
+        """ включение режима каналов-мандатов """
+        self._capabilities_enabled = True
+
+    def issue_capability(self, source: str, destination: str,
+                         operation: str) -> Optional[CapabilityChannel]:
+        """issue_capability выдача канала прямой доставки для разрешённой тройки,
+        вызывается до запуска процессов, чтобы канал можно было передать отправителю.
+        Тройка проверяется через _check_event наследника на событии без параметров;
+        события канала дальше не проверяются, поэтому каналы выдаются только
+        для маршрутов, проверка которых не зависит от параметров события
+
+        Args:
+            source (str): отправитель
+            destination (str): получатель
+            operation (str): операция
+
+        Returns:
+            Optional[CapabilityChannel]: канал или None, если режим выключен,
+                тройка не разрешена политиками или получатель не найден
+        """
+        if not self._capabilities_enabled:
+            return None
+        if not self._check_event(Event(source=source, destination=destination,
+                                       operation=operation, parameters=None)):
+            self._log_message(
+                LOG_ERROR, f"отказ в выдаче канала {source} -> {destination}: {operation}")
+            return None
+        destination_q = self._queues_dir.get_queue(destination)
+        if destination_q is None:
+            return None
+
+        channel = CapabilityChannel(
+            source=source, destination=destination, operation=operation,
+            destination_q=destination_q,
+            monitor_q=self._queues_dir.get_queue(self._events_q_name),
+            epoch=self._capability_epoch, issued_epoch=self._capability_epoch.value,
+            counter=RawValue('Q', 0))
+        self._capabilities.append(channel)
+        self._log_message(
+            LOG_INFO, f"выдан канал {source} -> {destination}: {operation}")
+        return channel
+
+    def get_capability_audit(self) -> Dict[Tuple[str, str, str], int]:
+        """ количество событий, доставленных через каналы, по тройкам """
+        audit: Dict[Tuple[str, str, str], int] = {}
+        for channel in self._capabilities:
+            key = (channel.source, channel.destination, channel.operation)
+            audit[key] = audit.get(key, 0) + channel.delivered
+        return audit
+
     def _proceed(self, event: Event):
         """ отправить проверенное событие конечному получателю """
         destination_q = self._queues_dir.get_queue(event.destination)
@@ -100,8 +235,9 @@ class BaseSecurityMonitor(Process):
                 LOG_ERROR, f"ошибка обработки запроса {event}, получатель не найден")
         else:
             destination_q.put(event)
-            self._log_message(
-                LOG_DEBUG, f"запрос отправлен получателю {event}")
+            if self.log_level >= LOG_DEBUG:
+                self._log_message(
+                    LOG_DEBUG, f"запрос отправлен получателю {event}")
 
     def stop(self):
         """stop запрос остановки работы блока
@@ -112,6 +248,10 @@ class BaseSecurityMonitor(Process):
         self._log_message(LOG_INFO, "старт блока грузового отсека")
 
         while self._quit is False:
-            sleep(self._recalc_interval_sec)
-            self._check_events_q()
+            self._wait_events_q()
             self._check_control_q()
+            if self._audit_journal is not None:
+                self._audit_journal.flush_if_due()
+
+        if self._audit_journal is not None:
+            self._audit_journal.close()
@@ -0,0 +1,175 @@
+""" модуль шардированного монитора безопасности
+
+Все события между компонентами проходят через монитор безопасности,
+поэтому в шардированном режиме работает несколько процессов-мониторов,
+каждый со своей входной очередью. Событие направляется в очередь шарда
+по отправителю (или получателю), так что порядок событий для каждой пары
+(отправитель, получатель) сохраняется.
+"""
+from multiprocessing import Queue
+from typing import Dict, List, Type
+from zlib import crc32
+
+from src.config import CRITICALITY_STR, DEFAULT_LOG_LEVEL, LOG_INFO, \
+    SECURITY_MONITOR_QUEUE_NAME
+from src.event_types import Event
+from src.policy_table import CompiledPolicyTable
+from src.queues_dir import QueuesDirectory
+from src.security_monitory import BaseSecurityMonitor
+
+SHARD_BY_SOURCE = 'source'
+SHARD_BY_DESTINATION = 'destination'
+
+
+class ShardedQueue:
+    """
+    Входная очередь монитора безопасности, распределяющая события по шардам.
+
+    Регистрируется в каталоге очередей под именем монитора безопасности,
+    поэтому отправители пользуются ей как обычной очередью.
+    """
+
+    def __init__(self, queues: List[Queue], shard_by: str = SHARD_BY_SOURCE):
+        """
+        Args:
+            queues (List[Queue]): входные очереди шардов.
+            shard_by (str): поле события для выбора шарда (source или destination).
+
+        Raises:
+            ValueError: Если поле для выбора шарда неизвестно.
+        """
+        if shard_by not in (SHARD_BY_SOURCE, SHARD_BY_DESTINATION):
+            raise ValueError(f"Неизвестный способ шардирования: {shard_by}")
+        self.queues = queues
+        self.shard_by = shard_by
+        self._shards: Dict[str, int] = {}
+
+    def __getstate__(self):
+        # кэш индексов шардов у каждого процесса свой
+        return {'queues': self.queues, 'shard_by': self.shard_by}
+
+    def __setstate__(self, state):
+        self.queues = state['queues']
+        self.shard_by = state['shard_by']
+        self._shards = {}
+
+    def shard_of(self, key: str) -> int:
+        """
+        Возвращает номер шарда для ключа. Используется crc32, а не hash(),
+        чтобы номер совпадал во всех процессах.
+
+        Args:
+            key (str): имя отправителя или получателя.
+
+        Returns:
+            int: номер шарда.
+        """
+        shard = self._shards.get(key)
+        if shard is None:
+            shard = crc32(key.encode()) % len(self.queues)
+            self._shards[key] = shard
+        return shard
+
+    def put(self, event: Event, block: bool = True, timeout=None):
+        """ отправка события в очередь соответствующего шарда """
+        key = event.source if self.shard_by == SHARD_BY_SOURCE else event.destination
+        self.queues[self.shard_of(key)].put(event, block, timeout)
+
+
+class ShardedSecurityMonitor:
+    """
+    Группа мониторов безопасности, работающих параллельно в отдельных процессах.
+
+    Управляется так же, как отдельный компонент (start, stop, join),
+    поэтому может быть добавлена в SystemComponentsContainer.
+    Все шарды используют одну и ту же скомпилированную таблицу политик.
+    """
+    log_prefix = "[SECURITY]"
+
+    def __init__(self, monitor_class: Type[BaseSecurityMonitor], queues_dir: QueuesDirectory,
+                 shards: int = 2, shard_by: str = SHARD_BY_SOURCE,
+                 log_level=DEFAULT_LOG_LEVEL):
+        """
+        Args:
+            monitor_class (Type[BaseSecurityMonitor]): класс монитора безопасности,
+                конструктор которого принимает каталог очередей.
+            queues_dir (QueuesDirectory): каталог очередей.
+            shards (int): количество шардов.
+            shard_by (str): поле события для выбора шарда (source или destination).
+            log_level (int): уровень логирования.
+
+        Raises:
+            ValueError: Если количество шардов меньше одного.
+        """
+        if shards < 1:
+            raise ValueError("Количество шардов должно быть не меньше одного!")
+        self.log_level = log_level
+
+        # каждый монитор при создании регистрирует свою очередь,
+        # после создания всех шардов место в каталоге занимает общая очередь
+        self._monitors: List[BaseSecurityMonitor] = [
+            monitor_class(queues_dir) for _ in range(shards)]
+        self._events_q = ShardedQueue(
+            [monitor._events_q for monitor in self._monitors],  # pylint: disable=protected-access
+            shard_by=shard_by)
+        queues_dir.register(queue=self._events_q, name=SECURITY_MONITOR_QUEUE_NAME)
+
+        # политики компилируются один раз, таблица общая для всех шардов
+        self.set_security_policies(
+            self._monitors[0]._security_policies)  # pylint: disable=protected-access
+
+        self._log_message(LOG_INFO, f"создан шардированный монитор безопасности: {shards}")
+
+    def _log_message(self, criticality: int, message: str):
+        """_log_message печатает сообщение заданного уровня критичности
+
+        Args:
+            criticality (int): уровень критичности
+            message (str): текст сообщения
+        """
+        if criticality <= self.log_level:
+            print(f"[{CRITICALITY_STR[criticality]}]{self.log_prefix} {message}")
+
+    @property
+    def monitors(self) -> List[BaseSecurityMonitor]:
+        """ мониторы-шарды """
+        return self._monitors
+
+    def set_security_policies(self, policies):
+        """ установка новых политик безопасности для всех шардов """
+        policy_table = CompiledPolicyTable(policies)
+        for monitor in self._monitors:
+            monitor.set_security_policies(policies, policy_table=policy_table)
+
+    def enable_audit_journal(self, path: str, **kwargs):
+        """ включение журнала аудита, у каждого шарда свой файл path.<номер шарда> """
+        for index, monitor in enumerate(self._monitors):
+            monitor.enable_audit_journal(f"{path}.{index}", **kwargs)
+
+    def enable_capabilities(self):
+        """ включение режима каналов-мандатов """
+        for monitor in self._monitors:
+            monitor.enable_capabilities()
+
+    def issue_capability(self, source: str, destination: str, operation: str):
+        """ выдача канала прямой доставки, см. BaseSecurityMonitor.issue_capability """
+        return self._monitors[0].issue_capability(source, destination, operation)
+
+    def get_capability_audit(self):
+        """ количество событий, доставленных через каналы, по тройкам """
+        return self._monitors[0].get_capability_audit()
+
+    def start(self):
+        """ запуск всех шардов """
+        for monitor in self._monitors:
+            monitor.start()
+
+    def stop(self):
+        """ запрос остановки всех шардов """
+        for monitor in self._monitors:
+            monitor.stop()
+
+    def join(self, timeout=None):
+        """ ожидание завершения всех шардов """
+        for monitor in self._monitors:
+            monitor.join(timeout)
@@ -1,7 +1,7 @@
 """" модуль симулятора движения """
 from multiprocessing import Queue, Process
 from queue import Empty
-from time import sleep
+from time import sleep, time
 from geopy import Point, distance
 
 from src.config import CRITICALITY_STR, LOG_DEBUG, \
@@ -125,7 +125,8 @@ class SITL(Process):
                       operation="post_telemetry",
                       parameters=self._position,
                       extra_parameters={
-                          "bearing": self._bearing, "speed": self._speed_kmph}
+                          "bearing": self._bearing, "speed": self._speed_kmph,
+                          "timestamp": time()}
                       )
         telemetry_gateway_q = self._queues_dir.get_queue(
             SITL_TELEMETRY_QUEUE_NAME)
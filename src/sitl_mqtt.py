@@ -1,165 +1,203 @@
 """ модуль отправки телеметрии в систему мониторинга
 """
-from multiprocessing import Queue, Process
-from queue import Empty
-from time import sleep, time
+from collections import deque
+from time import monotonic, time
+from typing import Dict, List, Optional, Tuple, Union
 
 from geopy import Point as GeoPoint
-import paho.mqtt.client as mqtt
 
-from src.config import CRITICALITY_STR, LOG_DEBUG, LOG_ERROR, LOG_INFO, \
-    SITL_TELEMETRY_QUEUE_NAME, DEFAULT_LOG_LEVEL
+from src.config import LOG_DEBUG, LOG_ERROR, LOG_INFO, SITL_TELEMETRY_QUEUE_NAME, \
+    DEFAULT_LOG_LEVEL
 from src.queues_dir import QueuesDirectory
-from src.event_types import Event, ControlEvent
+from src.event_types import Event
+from src.mqtt_sender import BaseMqttSender
+from src.telemetry_codec import TELEMETRY_FORMAT_BINARY, TELEMETRY_FORMAT_TEXT, TelemetrySample, \
+    check_sample, encode
+from src.telemetry_spool import TelemetrySpool
 
 
-class TelemetrySender(Process):
+class TelemetrySender(BaseMqttSender):
     """ класс отправки телеметрии в систему мониторинга """
-    MQTT_BROKER = "localhost"
-    MQTT_PORT = 1883
     MQTT_TOPIC = "api/telemetry"
-    TIMEOUT = 5
+    # пакет телеметрии отправляется при накоплении BATCH_MAX_SAMPLES измерений
+    # или через BATCH_MAX_DELAY_SEC после первого измерения в пакете
+    BATCH_MAX_SAMPLES = 10
+    BATCH_MAX_DELAY_SEC = 1.0
+    # измерения из дискового буфера отправляются пакетами по REPLAY_BATCH_SAMPLES,
+    # не чаще REPLAY_MAX_MESSAGES_PER_SEC сообщений в секунду
+    REPLAY_BATCH_SAMPLES = 500
+    REPLAY_MAX_MESSAGES_PER_SEC = 2.0
 
     log_prefix = "[SITL.MQTT]"
     event_source_name = SITL_TELEMETRY_QUEUE_NAME
     events_q_name = event_source_name
 
-    def __init__(self, queues_dir: QueuesDirectory, client_id='', log_level = DEFAULT_LOG_LEVEL):
-        super().__init__()
-
-        self._queues_dir = queues_dir
-        self._client_id = client_id
-
-        # создаём очередь для сообщений на обработку
-        self._events_q = Queue()
-        self._events_q_name = TelemetrySender.events_q_name
-        self._queues_dir.register(
-            queue=self._events_q, name=self._events_q_name)
-
-        self._quit = False
-        # очередь управляющих команд (например, для остановки симуляции)
-        self._control_q = Queue()
-
-        self._mqttc = None
-        self._published = False
-
-        # инициализируем интервал обновления
-        self._recalc_interval_sec = 0.5
-        self.log_level = log_level
-
-    def _log_message(self, criticality: int, message: str):
-        """_log_message печатает сообщение заданного уровня критичности
-
-        Args:
-            criticality (int): уровень критичности
-            message (str): текст сообщения
-        """
-        if criticality <= self.log_level:
-            print(f"[{CRITICALITY_STR[criticality]}]{self.log_prefix} {message}")
-
-    # The callback for when the client receives a CONNACK response from the server.
-    def _on_connect(self, _, userdata, flags, reason_code):
-        self._log_message(
-            LOG_DEBUG, f"Connected with result code {reason_code}, other info: {userdata}, {flags}")
-        # Subscribing in on_connect() means that if we lose the connection and
-        # reconnect then subscriptions will be renewed.
-        # client.subscribe("$SYS/#")
-
-    def _on_log(self, _, __, ___, buf):
-        if self.log_level > 2:
-            print(f"{self.log_prefix} LOG >> {buf}")
-
-    # The callback for when a PUBLISH message is received from the server.
-    def _on_message(self, _, __, msg):
-        print(msg.topic+" "+str(msg.payload))
-
-    def _on_publish(self, _, __, ___):
-        self._published = True
-
-    def stop(self):
-        """ запрос остановки работы """
-        self._control_q.put(ControlEvent(operation='stop'))
-
-    # проверка наличия новых управляющих команд
-    def _check_control_q(self):
-        try:
-            request: ControlEvent = self._control_q.get_nowait()
-            # print(f"{self.log_prefix} проверяем запрос {request}")
-            if not isinstance(request, ControlEvent):
-                return
-            if request.operation == 'stop':
-                # поступил запрос на остановку монитора, поднимаем "красный флаг"
-                self._quit = True
-        except Empty:
-            # никаких команд не поступило, ну и ладно
-            pass
+    def __init__(self, queues_dir: QueuesDirectory, client_id='', log_level = DEFAULT_LOG_LEVEL,
+                 batch_max_samples: int = BATCH_MAX_SAMPLES,
+                 batch_max_delay_sec: float = BATCH_MAX_DELAY_SEC,
+                 telemetry_format: str = TELEMETRY_FORMAT_BINARY,
+                 spool_path: Optional[str] = None, spool_max_samples: int = 100000):
+        super().__init__(queues_dir, client_id=client_id, log_level=log_level)
+
+        # формат сообщений телеметрии, см. src.telemetry_codec
+        self._telemetry_format = telemetry_format
+        # накопленные измерения
+        self._batch: List[TelemetrySample] = []
+        self._batch_started = 0.0
+        self._batch_max_samples = max(1, batch_max_samples)
+        self._batch_max_delay_sec = batch_max_delay_sec
+
+        # дисковый буфер на время отсутствия соединения с брокером
+        self._spool = TelemetrySpool(spool_path, spool_max_samples) if spool_path else None
+        self._last_replay = 0.0
+        # с дисковым буфером пакеты считаются доставленными только после подтверждения брокера:
+        # ключ -> измерения, отправленные сразу, или (after_id, last_id) строк буфера
+        self._pending: Dict[int, Union[List[TelemetrySample], Tuple[int, int]]] = {}
+        self._pending_seq = 0
+        # результаты доставки (ключ, доставлено) из сетевого потока paho,
+        # обрабатываются в потоке отправителя, которому принадлежит база буфера
+        self._deliveries = deque()
+        # последняя строка буфера, отправленная и ещё не подтверждённая
+        self._replay_after = 0
 
     def _post_telemetry(self, event: Event):
         try:
             position: GeoPoint = event.parameters
             bearing = int(event.extra_parameters["bearing"])
             speed = int(event.extra_parameters["speed"])
-
-            payload = f'id={self._client_id}&lat={int(position.latitude*(1E+7))}&' +\
-                f'lon={int(position.longitude*(1E+7))}&alt={int(position.altitude*100)}&' +\
-                f'azimuth={bearing*(1E+7)}&dop={1.2}&sats={12}&speed={speed}'
-
-            self._mqttc.publish(
-                TelemetrySender.MQTT_TOPIC, payload, qos=1)
-            start_time = time()
-
-            while not self._published and time() - start_time < TelemetrySender.TIMEOUT:
-                sleep(0.1)
-
-            if self._published:
-                self._log_message(
-                    LOG_DEBUG, f"отправлена телеметрия: {payload}")
-            else:
-                self._log_message(LOG_ERROR, "таймаут отправки телеметрии")
+            timestamp = event.extra_parameters.get("timestamp", time())
+
+            sample = TelemetrySample(
+                timestamp=timestamp, latitude=position.latitude, longitude=position.longitude,
+                altitude=position.altitude, azimuth=bearing, dop=1.2, sats=12, speed=speed)
+            if self._telemetry_format == TELEMETRY_FORMAT_BINARY:
+                # измерение, не помещающееся в двоичный формат, отбрасывается сразу,
+                # чтобы не испортить весь пакет
+                check_sample(sample)
+                # смещение времени в пакете неотрицательно: более раннее измерение начинает новый пакет
+                if self._batch and timestamp < self._batch[0].timestamp:
+                    self._flush_batch()
+
+            if not self._batch:
+                self._batch_started = monotonic()
+            self._batch.append(sample)
+            if len(self._batch) >= self._batch_max_samples:
+                self._flush_batch()
 
         except Exception as e:
             self._log_message(LOG_ERROR, f"ошибка отправки телеметрии: {e}")
 
-    def _check_events_q(self):
-        while True:
+    def _send_samples(self, samples: List[TelemetrySample], on_done=None) -> bool:
+        """ отправка измерений одним сообщением """
+        try:
+            payload = encode(self._client_id, samples, self._telemetry_format)
+        except Exception as e:
+            if self._telemetry_format == TELEMETRY_FORMAT_TEXT:
+                self._log_message(LOG_ERROR, f"ошибка кодирования телеметрии: {e}")
+                return False
+            # пакет, не помещающийся в двоичный формат, отправляется в текстовом
+            self._log_message(LOG_ERROR, f"ошибка кодирования телеметрии: {e}, пакет отправляется текстом")
             try:
-                event: Event = self._events_q.get_nowait()
-                # print(f"{self.log_prefix} обрабатываем событие: {event}")
-                if not isinstance(event, Event):
-                    return
-                if event.operation == 'post_telemetry':
-                    self._post_telemetry(event)
-            except Empty:
-                # все входящие события обработаны
-                break
-
-    def run(self):
-        self._log_message(LOG_INFO, "старт клиента телеметрии")
-
-        mqttc = mqtt.Client(client_id=self._client_id)
-        mqttc.connect(TelemetrySender.MQTT_BROKER,
-                      TelemetrySender.MQTT_PORT, 60)
-
-        mqttc.on_connect = self._on_connect
-
-        mqttc.on_message = self._on_message
-
-        self._published = False
-
-        mqttc.on_publish = self._on_publish
-
-        mqttc.on_log = self._on_log
-
-        self._mqttc = mqttc
-
-        self._mqttc.loop_start()
-        self._log_message(
-            LOG_INFO, "клиент отправки телеметрии создан и запущен")
-
-        while self._quit is False:
-            self._check_events_q()
-            self._check_control_q()
-            sleep(self._recalc_interval_sec)
-
-        self._mqttc.loop_stop()
-        self._mqttc.disconnect()
+                payload = encode(self._client_id, samples, TELEMETRY_FORMAT_TEXT)
+            except Exception as e:
+                self._log_message(LOG_ERROR, f"ошибка кодирования телеметрии: {e}")
+                return False
+        if not self._publish(payload, on_done):
+            return False
+        if self.log_level >= LOG_DEBUG:
+            self._log_message(
+                LOG_DEBUG, f"отправлен пакет телеметрии ({len(samples)}): {payload!r}")
+        return True
+
+    def _spool_samples(self, samples: List[TelemetrySample]):
+        dropped = self._spool.push(samples)
+        if dropped:
+            self._log_message(
+                LOG_ERROR, f"буфер телеметрии переполнен, удалено старых измерений: {dropped}")
+
+    def _send_tracked(self, samples: List[TelemetrySample],
+                      pending: Union[List[TelemetrySample], Tuple[int, int]]) -> bool:
+        """ отправка измерений с уведомлением о доставке, pending - что делать с ними по результату """
+        self._pending_seq += 1
+        key = self._pending_seq
+        self._pending[key] = pending
+        if self._send_samples(samples, lambda _, delivered: self._deliveries.append((key, delivered))):
+            return True
+        del self._pending[key]
+        return False
+
+    def _process_deliveries(self):
+        """ подтверждённые строки буфера удаляются, неподтверждённые пакеты отправляются снова """
+        while self._deliveries:
+            key, delivered = self._deliveries.popleft()
+            pending = self._pending.pop(key, None)
+            if pending is None:
+                continue
+            if isinstance(pending, list):
+                # пакет, отправленный сразу: без подтверждения он записывается в буфер
+                if not delivered:
+                    self._spool_samples(pending)
+                continue
+            after_id, last_id = pending
+            if delivered:
+                self._spool.remove_range(after_id, last_id)
+            else:
+                # строки остались в буфере, отправка продолжится с них
+                self._replay_after = min(self._replay_after, after_id)
+
+    def _flush_batch(self):
+        """ отправка накопленных измерений, без соединения - запись в дисковый буфер """
+        if not self._batch:
+            return
+        batch = list(self._batch)
+        self._batch.clear()
+        if self._spool is None:
+            self._send_samples(batch)
+            return
+        # пока в буфере есть измерения, новые встают в конец очереди за ними
+        if len(self._spool) or not self._connection.can_send() \
+                or not self._send_tracked(batch, batch):
+            self._spool_samples(batch)
+
+    def _replay_spool(self):
+        """ отправка измерений из дискового буфера с ограничением частоты """
+        if self._spool is None or not len(self._spool) or not self._connection.can_send():
+            return
+        if monotonic() - self._last_replay < 1 / self.REPLAY_MAX_MESSAGES_PER_SEC:
+            return
+        self._last_replay = monotonic()
+        after_id = self._replay_after
+        # строки удаляются из буфера только после подтверждения брокером
+        last_id, samples = self._spool.peek(self.REPLAY_BATCH_SAMPLES, after_id)
+        if samples and self._send_tracked(samples, (after_id, last_id)):
+            self._replay_after = last_id
+
+    def _handle_event(self, event: Event):
+        if event.operation == 'post_telemetry':
+            self._post_telemetry(event)
+
+    def _can_accept_events(self) -> bool:
+        # с дисковым буфером события забираются и без соединения
+        return self._spool is not None or super()._can_accept_events()
+
+    def _on_idle(self):
+        # отправка пакета, если первое измерение в нём ждёт дольше допустимого
+        if self._batch and monotonic() - self._batch_started >= self._batch_max_delay_sec \
+                and (self._spool is not None or self._connection.can_send()):
+            self._flush_batch()
+        if self._spool is not None:
+            self._process_deliveries()
+        self._replay_spool()
+
+    def flush(self):
+        self._flush_batch()
+        if self._spool is not None:
+            self._process_deliveries()
+            # неподтверждённые пакеты, отправленные сразу, сохраняются до следующего запуска;
+            # строки буфера в нём и остаются
+            for pending in self._pending.values():
+                if isinstance(pending, list):
+                    self._spool_samples(pending)
+            self._pending.clear()
+            self._log_message(LOG_INFO, f"буфер телеметрии: {self._spool.stats()}")
+            self._spool.close()
@@ -0,0 +1,163 @@
+""" модуль кодирования телеметрии для отправки в систему мониторинга
+
+Поддерживаются два формата сообщения:
+
+    текстовый   строки запроса, по одной на измерение:
+                id=..&lat=..&lon=..&alt=..&azimuth=..&dop=..&sats=..&speed=..&ts=..
+    двоичный    заголовок '<BBHd': признак TELEMETRY_MAGIC, версия формата,
+                количество измерений, время первого измерения (секунды Unix);
+                длина идентификатора БПЛА u8 и идентификатор в utf-8;
+                затем измерения фиксированной длины '<IiiiHHBH':
+                смещение времени (мс), широта и долгота (1e-7 град), высота (см),
+                азимут (0.01 град), снижение точности (0.01), количество спутников,
+                скорость (0.01 км/ч). Все числа little-endian.
+
+Первый байт двоичного сообщения не может начинать текстовое сообщение,
+поэтому получатель различает форматы по нему.
+Декодер сервера (afcs/afcs/utils/telemetry_codec.py) повторяет этот формат.
+"""
+import struct
+from typing import Iterable, List, NamedTuple
+from urllib.parse import parse_qs
+
+TELEMETRY_FORMAT_TEXT = 'text'
+TELEMETRY_FORMAT_BINARY = 'binary'
+
+TELEMETRY_MAGIC = 0xFE
+TELEMETRY_VERSION = 1
+
+_HEADER = struct.Struct('<BBHd')
+_ID_LENGTH = struct.Struct('<B')
+_SAMPLE = struct.Struct('<IiiiHHBH')
+
+
+class TelemetrySample(NamedTuple):
+    """ измерение телеметрии """
+    timestamp: float  # время измерения, секунды Unix
+    latitude: float   # широта, град
+    longitude: float  # долгота, град
+    altitude: float   # высота, м
+    azimuth: float    # азимут, град
+    dop: float        # снижение точности
+    sats: int         # количество спутников
+    speed: float      # скорость, км/ч
+
+
+def encode_text(client_id: str, samples: Iterable[TelemetrySample]) -> str:
+    """
+    Кодирует измерения в текстовый формат.
+
+    Args:
+        client_id (str): идентификатор БПЛА.
+        samples (Iterable[TelemetrySample]): измерения.
+
+    Returns:
+        str: сообщение, по строке запроса на измерение.
+    """
+    return '\n'.join(
+        f'id={client_id}&lat={int(s.latitude*(1E+7))}&' +
+        f'lon={int(s.longitude*(1E+7))}&alt={int(s.altitude*100)}&' +
+        f'azimuth={s.azimuth*(1E+7)}&dop={s.dop}&sats={s.sats}&speed={s.speed}&' +
+        f'ts={s.timestamp:.3f}'
+        for s in samples)
+
+
+def _pack_sample(s: TelemetrySample, base_time: float) -> bytes:
+    return _SAMPLE.pack(
+        round((s.timestamp - base_time) * 1000),
+        round(s.latitude * 1e7), round(s.longitude * 1e7), round(s.altitude * 100),
+        round((s.azimuth % 360) * 100) % 36000, round(s.dop * 100),
+        s.sats, round(s.speed * 100))
+
+
+def check_sample(sample: TelemetrySample):
+    """
+    Проверяет, что измерение помещается в поля двоичного формата
+    (смещение времени проверяется при кодировании пакета).
+
+    Raises:
+        ValueError: Если значение не помещается в поле формата или не является числом.
+    """
+    try:
+        _pack_sample(sample, sample.timestamp)
+    except (struct.error, TypeError, ValueError, OverflowError) as e:
+        raise ValueError(f"измерение не помещается в двоичный формат: {e}") from e
+
+
+def encode_binary(client_id: str, samples: List[TelemetrySample]) -> bytes:
+    """
+    Кодирует измерения в двоичный формат.
+
+    Args:
+        client_id (str): идентификатор БПЛА.
+        samples (List[TelemetrySample]): измерения.
+
+    Returns:
+        bytes: сообщение.
+
+    Raises:
+        struct.error: Если значение не помещается в поле формата.
+    """
+    base_time = samples[0].timestamp if samples else 0.0
+    client_id_bytes = client_id.encode()
+    chunks = [_HEADER.pack(TELEMETRY_MAGIC, TELEMETRY_VERSION, len(samples), base_time),
+              _ID_LENGTH.pack(len(client_id_bytes)), client_id_bytes]
+    for s in samples:
+        chunks.append(_pack_sample(s, base_time))
+    return b''.join(chunks)
+
+
+def encode(client_id: str, samples: List[TelemetrySample],
+           telemetry_format: str = TELEMETRY_FORMAT_BINARY):
+    """
+    Кодирует измерения в заданный формат.
+
+    Raises:
+        ValueError: Если формат неизвестен.
+    """
+    if telemetry_format == TELEMETRY_FORMAT_BINARY:
+        return encode_binary(client_id, samples)
+    if telemetry_format == TELEMETRY_FORMAT_TEXT:
+        return encode_text(client_id, samples)
+    raise ValueError(f"Неизвестный формат телеметрии: {telemetry_format}")
+
+
+def decode(payload: bytes) -> List[dict]:
+    """
+    Декодирует сообщение телеметрии любого формата.
+
+    Значения возвращаются в единицах текстового формата
+    (широта и долгота в 1e-7 град, высота в см, азимут в 1e-7 град).
+
+    Args:
+        payload (bytes): сообщение.
+
+    Returns:
+        List[dict]: измерения, по словарю с полями текстового формата на измерение.
+
+    Raises:
+        ValueError: Если сообщение повреждено или версия формата не поддерживается.
+    """
+    if payload[:1] != bytes((TELEMETRY_MAGIC,)):
+        return [{k: v[0] for k, v in parse_qs(query_string).items()}
+                for query_string in payload.decode().splitlines() if query_string]
+
+    try:
+        _, version, count, base_time = _HEADER.unpack_from(payload)
+        if version != TELEMETRY_VERSION:
+            raise ValueError(f"неподдерживаемая версия формата телеметрии: {version}")
+        offset = _HEADER.size
+        (id_length,) = _ID_LENGTH.unpack_from(payload, offset)
+        offset += _ID_LENGTH.size
+        client_id = payload[offset:offset + id_length].decode()
+        offset += id_length
+        body = payload[offset:]
+        if len(body) != count * _SAMPLE.size:
+            raise ValueError("длина сообщения телеметрии не соответствует количеству измерений")
+        return [{'id': client_id, 'lat': lat, 'lon': lon, 'alt': alt,
+                 'azimuth': azimuth * 1e5, 'dop': dop / 100, 'sats': sats,
+                 'speed': speed / 100, 'ts': base_time + time_offset / 1000}
+                for time_offset, lat, lon, alt, azimuth, dop, sats, speed
+                in _SAMPLE.iter_unpack(body)]
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"повреждённое сообщение телеметрии: {e}") from e
@@ -0,0 +1,158 @@
+""" модуль дискового буфера телеметрии (store-and-forward)
+
+Пока соединения с брокером нет, измерения телеметрии записываются
+в базу SQLite на диске, а после восстановления соединения отправляются
+крупными пакетами, начиная с самых старых. Размер буфера ограничен:
+при переполнении удаляются самые старые измерения.
+"""
+import sqlite3
+from typing import List, Tuple
+
+from src.telemetry_codec import TelemetrySample
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS telemetry_spool (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp REAL, latitude REAL, longitude REAL, altitude REAL,
+    azimuth REAL, dop REAL, sats INTEGER, speed REAL
+)
+"""
+_INSERT = "INSERT INTO telemetry_spool " \
+    "(timestamp, latitude, longitude, altitude, azimuth, dop, sats, speed) " \
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+class TelemetrySpool:
+    """
+    Дисковый буфер измерений телеметрии.
+
+    База открывается при первом обращении, поэтому объект можно создать
+    в одном процессе, а использовать в другом.
+
+    Attributes:
+        path (str): путь к файлу базы.
+        max_samples (int): максимальное количество измерений в буфере.
+        spooled (int): количество измерений, записанных в буфер.
+        replayed (int): количество измерений, извлечённых из буфера для отправки.
+        dropped (int): количество измерений, удалённых при переполнении.
+    """
+
+    def __init__(self, path: str, max_samples: int = 100000):
+        """
+        Args:
+            path (str): путь к файлу базы.
+            max_samples (int): максимальное количество измерений в буфере.
+        """
+        self.path = path
+        self.max_samples = max_samples
+        self.spooled = 0
+        self.replayed = 0
+        self.dropped = 0
+        self._size = 0
+        self._db = None
+
+    def __getstate__(self):
+        # соединение с базой не передаётся в другой процесс, открывается заново
+        state = self.__dict__.copy()
+        state['_db'] = None
+        return state
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(_CREATE_TABLE)
+            # измерения, оставшиеся с прошлого запуска, тоже будут отправлены
+            (self._size,) = self._db.execute("SELECT COUNT(*) FROM telemetry_spool").fetchone()
+        return self._db
+
+    def __len__(self) -> int:
+        self._connection()
+        return self._size
+
+    def push(self, samples: List[TelemetrySample]) -> int:
+        """
+        Записывает измерения в буфер одной транзакцией.
+
+        Args:
+            samples (List[TelemetrySample]): измерения.
+
+        Returns:
+            int: количество самых старых измерений, удалённых из-за переполнения.
+        """
+        db = self._connection()
+        overflow = max(0, self._size + len(samples) - self.max_samples)
+        with db:
+            db.execute("BEGIN")
+            db.executemany(_INSERT, samples)
+            if overflow:
+                db.execute("DELETE FROM telemetry_spool WHERE id IN "
+                           "(SELECT id FROM telemetry_spool ORDER BY id LIMIT ?)", (overflow,))
+        self._size += len(samples) - overflow
+        self.spooled += len(samples)
+        self.dropped += overflow
+        return overflow
+
+    def peek(self, limit: int, after_id: int = 0) -> Tuple[int, List[TelemetrySample]]:
+        """
+        Возвращает самые старые измерения, не удаляя их из буфера.
+
+        Args:
+            limit (int): максимальное количество измерений.
+            after_id (int): номер измерения, после которого начинать, например
+                последнего из уже отправленных, но ещё не подтверждённых.
+
+        Returns:
+            Tuple[int, List[TelemetrySample]]: номер последнего измерения для remove_range
+                и remove_through и сами измерения.
+        """
+        rows = self._connection().execute(
+            "SELECT * FROM telemetry_spool WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)).fetchall()
+        if not rows:
+            return after_id, []
+        return rows[-1][0], [TelemetrySample(*row[1:]) for row in rows]
+
+    def remove_range(self, after_id: int, last_id: int):
+        """
+        Удаляет из буфера измерения после after_id до last_id включительно,
+        после подтверждения их доставки.
+
+        Args:
+            after_id (int): after_id, переданный в peek().
+            last_id (int): номер последнего измерения, возвращённый peek().
+        """
+        db = self._connection()
+        with db:
+            db.execute("BEGIN")
+            removed = db.execute("DELETE FROM telemetry_spool WHERE id > ? AND id <= ?",
+                                 (after_id, last_id)).rowcount
+        self._size -= removed
+        self.replayed += removed
+
+    def remove_through(self, last_id: int):
+        """
+        Удаляет из буфера измерения до last_id включительно, после их отправки.
+
+        Args:
+            last_id (int): номер последнего удаляемого измерения.
+        """
+        db = self._connection()
+        with db:
+            db.execute("BEGIN")
+            removed = db.execute(
+                "DELETE FROM telemetry_spool WHERE id <= ?", (last_id,)).rowcount
+        self._size -= removed
+        self.replayed += removed
+
+    def stats(self) -> dict:
+        """ статистика буфера """
+        return {"size": len(self), "spooled": self.spooled,
+                "replayed": self.replayed, "dropped": self.dropped}
+
+    def close(self):
+        """ закрытие базы """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,261 @@
+""" кодек маршрутных заданий в формате QGC WPL 110
+
+Модуль общий для бортовой части и системы мониторинга: его копия лежит
+в afcs/afcs/utils/wpl_codec.py и должна совпадать с этим файлом побайтно
+(проверяется тестом tests/module/test_wpl_codec.py). Поэтому модуль
+использует только стандартную библиотеку и ничего не импортирует из проекта.
+
+Маршрут разбирается в столбцы (array.array): по столбцу на поле строки WPL.
+Строки разбираются блоками: все поля блока выделяются одним split(),
+затем каждый столбец преобразуется целиком срезом по полям.
+Блоки, где не у всех строк 12 полей, разбираются построчно.
+
+Правила проверки маршрута:
+    - первая строка - заголовок QGC WPL 110;
+    - маршрут заканчивается на первой пустой строке или в конце текста;
+    - в строке 11 или 12 полей (autocontinue может отсутствовать, тогда 1);
+    - строка с index 0, current 1 и frame 0 - домашняя точка, её команда не проверяется;
+    - остальные команды: 16, 21, 22, 93, 183;
+    - у путевой точки (16) param1 (задержка) равен 0;
+    - у задержки (93) param2, param3 и param4 равны 0.
+"""
+from array import array
+from itertools import islice
+from typing import Iterable, Iterator, Tuple, Union
+
+WPL_HEADER = "QGC WPL 110"
+
+MAV_CMD_NAV_WAYPOINT = 16
+MAV_CMD_NAV_LAND = 21
+MAV_CMD_NAV_TAKEOFF = 22
+MAV_CMD_NAV_DELAY = 93
+MAV_CMD_DO_SET_SERVO = 183
+
+ALLOWED_COMMANDS = frozenset((MAV_CMD_NAV_WAYPOINT, MAV_CMD_NAV_LAND, MAV_CMD_NAV_TAKEOFF,
+                              MAV_CMD_NAV_DELAY, MAV_CMD_DO_SET_SERVO))
+# команды, задающие точку маршрута
+POSITION_COMMANDS = frozenset((MAV_CMD_NAV_WAYPOINT, MAV_CMD_NAV_LAND, MAV_CMD_NAV_TAKEOFF))
+
+# причины отказа в разборе маршрута
+WPL_UNSUPPORTED_VERSION = "unsupported_version"
+WPL_MALFORMED_LINE = "malformed_line"
+WPL_UNKNOWN_COMMAND = "unknown_command"
+WPL_NON_ZERO_DELAY_WAYPOINT = "non_zero_delay_waypoint"
+WPL_WRONG_DELAY = "wrong_delay"
+
+INT_COLUMNS = ("index", "current", "frame", "command")
+FLOAT_COLUMNS = ("param1", "param2", "param3", "param4", "latitude", "longitude", "altitude")
+COLUMNS = INT_COLUMNS + FLOAT_COLUMNS + ("autocontinue",)
+
+DECODE_CHUNK_LINES = 4096
+_LINE_SEPARATOR = " | "
+
+WPLRow = Tuple[int, int, int, int, float, float, float, float, float, float, float, int]
+
+
+class WPLError(ValueError):
+    """
+    Маршрут не прошёл разбор или проверку.
+
+    Attributes:
+        reason (str): причина, одна из констант WPL_*.
+        row (int): номер строки маршрута без заголовка, начиная с 0; -1 для заголовка.
+    """
+
+    def __init__(self, reason: str, row: int):
+        super().__init__(f"{reason} (строка {row})")
+        self.reason = reason
+        self.row = row
+
+
+class WPLMission:
+    """
+    Маршрут в столбцах: атрибуты с именами из COLUMNS, целочисленные
+    столбцы - array('q'), вещественные - array('d').
+    """
+
+    def __init__(self):
+        for name in COLUMNS:
+            setattr(self, name, array('d' if name in FLOAT_COLUMNS else 'q'))
+
+    def __len__(self) -> int:
+        return len(self.command)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, WPLMission) and \
+            all(getattr(self, name) == getattr(other, name) for name in COLUMNS)
+
+    def append(self, row: WPLRow):
+        """ добавление строки маршрута """
+        for name, value in zip(COLUMNS, row):
+            getattr(self, name).append(value)
+
+    def row(self, row: int) -> WPLRow:
+        """ строка маршрута с номером row """
+        return tuple(getattr(self, name)[row] for name in COLUMNS)
+
+    def rows(self) -> Iterator[WPLRow]:
+        """ строки маршрута """
+        return zip(*(getattr(self, name) for name in COLUMNS))
+
+    def is_home(self, row: int) -> bool:
+        """ строка row - домашняя точка """
+        return self.index[row] == 0 and self.current[row] == 1 and self.frame[row] == 0
+
+    def position_rows(self) -> array:
+        """
+        Номера строк с точками маршрута: домашняя точка и команды
+        из POSITION_COMMANDS с ненулевыми координатами.
+        """
+        return array('q', (
+            row for row, (command, lat, lon) in enumerate(
+                zip(self.command, self.latitude, self.longitude))
+            if self.is_home(row) or
+            (command in POSITION_COMMANDS and (lat != 0.0 or lon != 0.0))))
+
+
+def _extend_fast(mission: WPLMission, tokens: list):
+    """ блок, в каждой строке которого 12 полей, строки разделены _LINE_SEPARATOR """
+    for offset, name in enumerate(COLUMNS):
+        convert = float if name in FLOAT_COLUMNS else int
+        column = tokens[offset::13]
+        values = getattr(mission, name)
+        if column.count(column[0]) == len(column):
+            # большинство столбцов (frame, параметры, autocontinue) постоянны
+            values.extend(array(values.typecode, (convert(column[0]),)) * len(column))
+        else:
+            values.extend(map(convert, column))
+
+
+def _extend_rows(mission: WPLMission, lines: list, first_row: int) -> bool:
+    """
+    Построчный разбор блока.
+
+    Returns:
+        bool: True, если в блоке встретилась пустая строка (конец маршрута).
+    """
+    for row, line in enumerate(lines, first_row):
+        fields = line.split()
+        if not fields:
+            return True
+        if len(fields) not in (11, 12):
+            raise WPLError(WPL_MALFORMED_LINE, row)
+        try:
+            mission.append((
+                int(fields[0]), int(fields[1]), int(fields[2]), int(fields[3]),
+                *map(float, fields[4:11]), int(fields[11]) if len(fields) == 12 else 1))
+        except ValueError:
+            raise WPLError(WPL_MALFORMED_LINE, row) from None
+    return False
+
+
+def _validate(mission: WPLMission, first_row: int):
+    """ проверка команд строк маршрута, начиная с first_row """
+    command = mission.command[first_row:]
+    param1, param2, param3, param4 = (
+        getattr(mission, name)[first_row:] for name in ("param1", "param2", "param3", "param4"))
+    violations = []
+    if not ALLOWED_COMMANDS.issuperset(command):
+        violations.extend((i, WPL_UNKNOWN_COMMAND)
+                          for i, c in enumerate(command) if c not in ALLOWED_COMMANDS)
+    # построчная проверка нужна, только если в блоке есть ненулевые параметры
+    if MAV_CMD_NAV_WAYPOINT in command and param1.count(0.0) != len(param1):
+        violations.extend(
+            (i, WPL_NON_ZERO_DELAY_WAYPOINT)
+            for i, (c, p1) in enumerate(zip(command, param1))
+            if c == MAV_CMD_NAV_WAYPOINT and p1 != 0.0)
+    if MAV_CMD_NAV_DELAY in command and \
+            param2.count(0.0) + param3.count(0.0) + param4.count(0.0) != 3 * len(command):
+        violations.extend(
+            (i, WPL_WRONG_DELAY)
+            for i, (c, p2, p3, p4) in enumerate(zip(command, param2, param3, param4))
+            if c == MAV_CMD_NAV_DELAY and (p2 != 0.0 or p3 != 0.0 or p4 != 0.0))
+    # домашняя точка не проверяется; ошибка - первая по порядку строк
+    for i, reason in sorted(violations):
+        if not mission.is_home(first_row + i):
+            raise WPLError(reason, first_row + i)
+
+
+def decode_wpl_lines(lines: Iterable[Union[str, bytes]],
+                     chunk_lines: int = DECODE_CHUNK_LINES) -> WPLMission:
+    """
+    Разбирает и проверяет маршрут, заданный строками (с переводом строки или без).
+
+    Args:
+        lines (Iterable[Union[str, bytes]]): строки маршрута, первая - заголовок.
+        chunk_lines (int): количество строк в блоке разбора.
+
+    Returns:
+        WPLMission: маршрут.
+
+    Raises:
+        WPLError: Если маршрут не прошёл разбор или проверку.
+    """
+    lines = iter(lines)
+    header = next(lines, '')
+    if isinstance(header, bytes):
+        header = header.decode('ascii', 'replace')
+    if not header.startswith(WPL_HEADER):
+        raise WPLError(WPL_UNSUPPORTED_VERSION, -1)
+    mission = WPLMission()
+    while True:
+        chunk = list(islice(lines, chunk_lines))
+        if not chunk:
+            break
+        first_row = len(mission)
+        is_bytes = isinstance(chunk[0], bytes)
+        separator = _LINE_SEPARATOR.encode() if is_bytes else _LINE_SEPARATOR
+        tokens = separator.join(chunk).split()
+        finished = False
+        # в каждой строке ровно 12 полей, если разделитель - каждое 13-е поле
+        if len(tokens) == 13 * len(chunk) - 1 and \
+                tokens[12::13].count(separator.strip()) == len(chunk) - 1:
+            try:
+                _extend_fast(mission, tokens)
+            except ValueError:
+                # откат блока и построчный разбор, чтобы найти ошибочную строку
+                for name in COLUMNS:
+                    del getattr(mission, name)[first_row:]
+                finished = _extend_rows(mission, chunk, first_row)
+        else:
+            finished = _extend_rows(mission, chunk, first_row)
+        _validate(mission, first_row)
+        if finished:
+            break
+    return mission
+
+
+def decode_wpl(data: Union[str, bytes]) -> WPLMission:
+    """
+    Разбирает и проверяет текст маршрута.
+
+    Args:
+        data (Union[str, bytes]): текст маршрута QGC WPL.
+
+    Returns:
+        WPLMission: маршрут.
+
+    Raises:
+        WPLError: Если маршрут не прошёл разбор или проверку.
+    """
+    return decode_wpl_lines(data.splitlines())
+
+
+def encode_wpl(mission: WPLMission) -> str:
+    """
+    Формирует текст маршрута QGC WPL, decode_wpl восстанавливает из него тот же маршрут.
+
+    Args:
+        mission (WPLMission): маршрут.
+
+    Returns:
+        str: текст маршрута.
+    """
+    columns = []
+    for name in COLUMNS:
+        values = getattr(mission, name)
+        if values and values.count(values[0]) == len(values):
+            columns.append([repr(values[0])] * len(values))
+        else:
+            columns.append(list(map(repr, values)))
+    return "\n".join([WPL_HEADER, *map("\t".join, zip(*columns))]) + "\n"
@@ -1,12 +1,61 @@
 """ парсер WPL файла с маршрутом """
+from collections.abc import Sequence
+from contextlib import contextmanager
+import mmap
+from typing import Iterator, List, NamedTuple
+
 from geopy.point import Point as GeoPoint
-from typing import List
+import numpy as np
+
+from src.wpl_codec import WPLMission, decode_wpl_lines
+
+
+class WPLRecord(NamedTuple):
+    """ строка WPL файла """
+    index: int
+    current: int
+    frame: int
+    command: int
+    param1: float
+    param2: float
+    param3: float
+    param4: float
+    latitude: float
+    longitude: float
+    altitude: float
+    autocontinue: int
+
+
+class GeoPointArray(Sequence):
+    """
+    Последовательность точек маршрута, хранящая координаты в массивах NumPy.
+    Объекты GeoPoint создаются только при обращении к элементу.
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray):
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return GeoPointArray(self.latitudes[index], self.longitudes[index])
+        return GeoPoint(float(self.latitudes[index]), float(self.longitudes[index]))
+
+    def __repr__(self) -> str:
+        return f"GeoPointArray({len(self)} точек)"
 
 
 class WPLParser:
     """
     Класс для парсинга WPL файлов формата QGC.
 
+    Файл читается через mmap блоками строк и разбирается тем же кодеком
+    src.wpl_codec, что и в системе мониторинга, поэтому борт и сервер
+    одинаково понимают и проверяют маршрут.
+
     Attributes:
         file_path (str): Путь к WPL файлу.
     """
@@ -20,23 +69,106 @@ class WPLParser:
         """
         self.file_path = file_path
 
-    def parse(self) -> List[GeoPoint]:
+    @contextmanager
+    def _lines(self) -> Iterator[Iterator[bytes]]:
+        """ строки файла, включая заголовок """
+        with open(self.file_path, 'rb') as file:
+            try:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # пустой файл нельзя отобразить в память
+                yield iter(())
+                return
+            with mapped:
+                yield iter(mapped.readline, b'')
+
+    def decode(self) -> WPLMission:
         """
-        Парсит WPL файл и возвращает список точек маршрута.
+        Разбирает и проверяет маршрут общим с системой мониторинга кодеком src.wpl_codec.
 
         Returns:
-            List[GeoPoint]: Список объектов GeoPoint, представляющих точки маршрута.
+            WPLMission: маршрут в столбцах.
+
+        Raises:
+            WPLError: Если маршрут не прошёл разбор или проверку.
+        """
+        with self._lines() as lines:
+            return decode_wpl_lines(lines)
+
+    def iter_records(self) -> Iterator[WPLRecord]:
+        """
+        Строки маршрута.
+
+        Yields:
+            WPLRecord: строка маршрута.
         """
-        points = []
-        with open(self.file_path, 'r') as file:
-            lines = file.readlines()
+        for row in self.decode().rows():
+            yield WPLRecord(*row)
 
+    def iter_waypoints(self) -> Iterator[WPLRecord]:
+        """
+        Точки маршрута: домашняя точка и команды из POSITION_COMMANDS с ненулевыми координатами.
+
+        Yields:
+            WPLRecord: строка маршрута с точкой.
+        """
+        mission = self.decode()
+        for row in mission.position_rows():
+            yield WPLRecord(*mission.row(row))
+
+    def parse_arrays(self) -> np.ndarray:
+        """
+        Читает точки маршрута в массив NumPy.
+
+        Как и parse, точку даёт каждая строка после заголовка, в которой не меньше
+        10 полей, включая команды без координат; проверки маршрута не выполняются.
+
+        Returns:
+            np.ndarray: массив формы (N, 3): широта, долгота, высота.
+        """
+        rows = []
+        with self._lines() as lines:
             # Пропускаем первую строку (заголовок)
-            for line in lines[1:]:
+            next(lines, None)
+            for line in lines:
                 parts = line.split()
                 if len(parts) >= 10:
-                    lat = float(parts[8])
-                    lon = float(parts[9])
-                    points.append(GeoPoint(lat, lon))
+                    rows.append((float(parts[8]), float(parts[9]),
+                                 float(parts[10]) if len(parts) > 10 else 0.0))
+        return np.array(rows, dtype=np.float64).reshape(-1, 3)
+
+    def parse_waypoint_arrays(self) -> np.ndarray:
+        """
+        Читает в массив NumPy только точки маршрута из iter_waypoints,
+        маршрут проверяется кодеком src.wpl_codec.
+
+        Returns:
+            np.ndarray: массив формы (N, 3): широта, долгота, высота.
+
+        Raises:
+            WPLError: Если маршрут не прошёл разбор или проверку.
+        """
+        mission = self.decode()
+        rows = np.frombuffer(mission.position_rows(), dtype=np.int64)
+        return np.column_stack([np.frombuffer(getattr(mission, name), dtype=np.float64)[rows]
+                                for name in ("latitude", "longitude", "altitude")])
 
-        return points
\ No newline at end of file
+    def parse(self) -> List[GeoPoint]:
+        """
+        Парсит WPL файл и возвращает список точек маршрута.
+
+        Returns:
+            List[GeoPoint]: Список объектов GeoPoint, представляющих точки маршрута.
+        """
+        table = self.parse_arrays()
+        return [GeoPoint(lat, lon) for lat, lon in table[:, :2].tolist()]
+
+    def parse_points(self) -> GeoPointArray:
+        """
+        Парсит WPL файл в последовательность точек маршрута на массивах NumPy.
+
+        Returns:
+            GeoPointArray: точки маршрута, те же, что и у parse.
+        """
+        table = self.parse_arrays()
+        return GeoPointArray(table[:, 0].copy(), table[:, 1].copy())
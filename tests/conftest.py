@@ -3,11 +3,12 @@ import pytest
 from src.event_types import Event
 
 from src.config import COMMUNICATION_GATEWAY_QUEUE_NAME, \
-    LOG_DEBUG, LOG_INFO
+    LOG_DEBUG
 from src.config import CONTROL_SYSTEM_QUEUE_NAME
 from src.queues_dir import QueuesDirectory
 from src.security_monitory import BaseSecurityMonitor
 from src.security_policy_type import SecurityPolicy
+from tests.mqtt_broker import MqttBroker
 
 
 @pytest.fixture(scope="module")
@@ -16,6 +17,13 @@ def queues_dir() -> QueuesDirectory:
     return QueuesDirectory()
 
 
+@pytest.fixture
+def mqtt_broker() -> MqttBroker:
+    """ локальный брокер MQTT на свободном порту """
+    with MqttBroker() as broker:
+        yield broker
+
+
 class SecurityMonitor(BaseSecurityMonitor):
     """ класс монитора безопасности """
 
@@ -33,27 +41,15 @@ class SecurityMonitor(BaseSecurityMonitor):
         ]
         self.set_security_policies(policies=default_policies)
 
-    def set_security_policies(self, policies):
-        """ установка новых политик безопасности """
-        self._security_policies = policies
-        self._log_message(
-            LOG_INFO, f"изменение политик безопасности: {policies}")
-
     def _check_event(self, event: Event):
         """ проверка входящих событий """
         self._log_message(
             LOG_DEBUG, f"проверка события {event}, по умолчанию выполнение запрещено")
 
-        authorized = False
-        request = SecurityPolicy(
-            source=event.source,
-            destination=event.destination,
-            operation=event.operation)
-
-        if request in self._security_policies:
+        authorized = self._is_authorized(event)
+        if authorized:
             self._log_message(
                 LOG_DEBUG, "событие разрешено политиками, выполняем")
-            authorized = True
 
         return authorized
 
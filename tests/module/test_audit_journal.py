@@ -0,0 +1,33 @@
+""" тесты журнала аудита монитора безопасности """
+from src.audit_journal import AuditJournal, read_audit_journal, summarize_audit_journal
+from src.event_types import Event
+
+
+def test_audit_journal(tmp_path):
+    """ счётчики решений и записи об отказах переживают несколько сбросов """
+    path = str(tmp_path / "audit.bin")
+    allowed = Event(source="control", destination="safety",
+                    operation="set_speed", parameters=30)
+    denied = Event(source="communication", destination="cargo",
+                   operation="release_cargo", parameters=None)
+
+    journal = AuditJournal(path, capacity=2, flush_interval_sec=60)
+    for _ in range(3):
+        journal.record(allowed, True)
+    for _ in range(3):
+        journal.record(denied, False)
+    journal.close()
+
+    # дозапись в существующий журнал
+    journal = AuditJournal(path)
+    journal.record(allowed, True)
+    journal.close()
+
+    result = read_audit_journal(path)
+    assert result['counts'] == {
+        ("control", "safety", "set_speed"): [4, 0],
+        ("communication", "cargo", "release_cargo"): [0, 3],
+    }
+    assert len(result['denials']) == 3
+    assert result['denials'][0][1:] == ("communication", "cargo", "release_cargo", "None")
+    assert "release_cargo\t0\t3" in summarize_audit_journal(path)
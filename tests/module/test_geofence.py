@@ -0,0 +1,92 @@
+""" тесты бортовой геозоны """
+import pytest
+
+from src.geofence import Geofence
+
+SQUARE = [[0.0, 0.0], [0.04, 0.0], [0.04, 0.04], [0.0, 0.04], [0.0, 0.0]]
+
+
+def _zones(*features):
+    return {"type": "FeatureCollection", "features": list(features)}
+
+
+def _feature(name, coordinates, change_type=None):
+    properties = {"name": name}
+    if change_type is not None:
+        properties["change_type"] = change_type
+    return {"type": "Feature", "properties": properties,
+            "geometry": {"type": "Polygon", "coordinates": [coordinates]}}
+
+
+def test_point_queries():
+    """ проверка попадания точки в зону """
+    geofence = Geofence()
+    geofence.load_zones(_zones(_feature("square", SQUARE)))
+
+    assert geofence.is_point_forbidden(0.02, 0.02)
+    assert geofence.zones_at(0.02, 0.02) == ["square"]
+    assert not geofence.is_point_forbidden(0.05, 0.02)
+    assert not geofence.is_point_forbidden(-0.01, -0.01)
+
+
+def test_segment_queries():
+    """ проверка пересечения отрезка с зоной """
+    geofence = Geofence()
+    geofence.load_zones(_zones(_feature("square", SQUARE)))
+
+    # проходит насквозь, концы снаружи
+    assert geofence.is_segment_forbidden((-0.01, 0.02), (0.05, 0.02))
+    # целиком внутри
+    assert geofence.is_segment_forbidden((0.01, 0.01), (0.02, 0.02))
+    # рядом, но не задевает
+    assert not geofence.is_segment_forbidden((-0.01, 0.05), (0.05, 0.05))
+
+
+def test_collinear_segment_queries():
+    """ отрезок на прямой ребра зоны запрещён, только если перекрывает ребро """
+    l_shape = [[0, 0], [2, 0], [2, 1], [1, 1], [1, 2], [0, 2], [0, 0]]
+    geofence = Geofence()
+    geofence.load_zones(_zones(_feature("l_shape", l_shape)))
+
+    # продолжение верхнего ребра (0,2)-(1,2) за вырезом зоны
+    assert not geofence.is_segment_forbidden((1.2, 2.0), (1.8, 2.0))
+    assert not geofence.is_segment_forbidden((2.0, 1.2), (2.0, 1.8))
+    # вдоль ребра и с заходом на него
+    assert geofence.is_segment_forbidden((0.2, 2.0), (0.8, 2.0))
+    assert geofence.is_segment_forbidden((0.8, 2.0), (1.8, 2.0))
+
+
+def test_incremental_delta():
+    """ применение дельты без перестроения """
+    geofence = Geofence()
+    geofence.load_zones(_zones(_feature("square", SQUARE)))
+    version = geofence.version
+
+    moved = [[x + 1.0, y] for x, y in SQUARE]
+    geofence.apply_delta(_zones(
+        _feature("square", moved, "modified"),
+        _feature("other", SQUARE, "added")))
+    assert geofence.version > version
+    assert geofence.zones_at(1.02, 0.02) == ["square"]
+    assert geofence.zones_at(0.02, 0.02) == ["other"]
+
+    geofence.apply_delta(_zones(_feature("other", SQUARE, "deleted")))
+    assert "other" not in geofence
+    assert not geofence.is_point_forbidden(0.02, 0.02)
+
+    with pytest.raises(ValueError):
+        geofence.apply_delta(_zones(_feature("square", SQUARE, "unknown")))
+
+
+def test_crosses_boundary():
+    """ граница зоны внутри, на краю и вне выпуклой оболочки """
+    geofence = Geofence()
+    geofence.load_zones(_zones(_feature("square", SQUARE)))
+
+    assert not geofence.crosses_boundary([(0.01, 0.01), (0.02, 0.01), (0.01, 0.02)])
+    assert not geofence.crosses_boundary([(0.05, 0.05), (0.06, 0.05), (0.06, 0.06)])
+    assert geofence.crosses_boundary([(0.03, 0.01), (0.05, 0.01), (0.05, 0.02)])
+    # зона целиком внутри оболочки
+    assert geofence.crosses_boundary([(-0.1, -0.1), (0.1, -0.1), (0.1, 0.1), (-0.1, 0.1)])
+    # отрезки из ячейки к дальней точке
+    assert geofence.crosses_boundary([(-0.01, 0.02), (-0.009, 0.02), (0.05, 0.02)])
@@ -0,0 +1,63 @@
+""" тесты кэша импортированных маршрутов """
+import os
+
+import numpy as np
+
+from src.mission_cache import MissionCache
+from src.mission_importer import MissionImporter
+from src.wpl_parser import WPLParser
+
+WPL = """QGC WPL 110
+0\t1\t0\t16\t0\t5\t0\t0\t60.0\t75.0\t0\t1
+1\t0\t3\t16\t0\t5\t0\t0\t60.001\t75.001\t10\t1
+"""
+
+
+def _parse_counter(path: str, calls: list):
+    def parse():
+        calls.append(path)
+        return WPLParser(path).parse_arrays()
+    return parse
+
+
+def test_cache_hit_skips_parsing(tmp_path):
+    """ повторный импорт того же файла берёт точки из кэша без разбора """
+    mission_file = tmp_path / "mission.wpl"
+    mission_file.write_text(WPL)
+    cache = MissionCache(str(tmp_path / "cache"))
+    calls = []
+    first = cache.get_or_parse(str(mission_file), _parse_counter(str(mission_file), calls))
+    second = cache.get_or_parse(str(mission_file), _parse_counter(str(mission_file), calls))
+    assert len(calls) == 1 and (cache.hits, cache.misses) == (1, 1)
+    assert isinstance(second, np.memmap)
+    assert np.array_equal(first, second)
+    assert second.shape == (3, 2)
+
+
+def test_changed_file_invalidates_entry(tmp_path):
+    """ изменённый файл разбирается заново, старые записи вытесняются """
+    mission_file = tmp_path / "mission.wpl"
+    cache_dir = str(tmp_path / "cache")
+    mission_file.write_text(WPL)
+    assert MissionImporter(str(mission_file), cache_dir).get_mission().waypoints[1].latitude == 60.001
+    mission_file.write_text(WPL.replace("60.001", "60.002"))
+    assert MissionImporter(str(mission_file), cache_dir).get_mission().waypoints[1].latitude == 60.002
+
+    cache = MissionCache(cache_dir, max_entries=1)
+    mission_file.write_text(WPL.replace("60.001", "60.003"))
+    cache.get_or_parse(str(mission_file), WPLParser(str(mission_file)).parse_arrays)
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_corrupted_entry_is_reparsed(tmp_path):
+    """ повреждённая запись удаляется, маршрут разбирается заново """
+    mission_file = tmp_path / "mission.wpl"
+    mission_file.write_text(WPL)
+    cache = MissionCache(str(tmp_path / "cache"))
+    key = cache.content_hash(str(mission_file))
+    os.makedirs(cache.cache_dir)
+    with open(cache._entry_path(key), 'wb') as file:  # pylint: disable=protected-access
+        file.write(b"not a numpy file")
+    table = cache.get_or_parse(str(mission_file), WPLParser(str(mission_file)).parse_arrays)
+    assert cache.misses == 1 and table.shape == (3, 2)
+    assert cache.load(key) is not None
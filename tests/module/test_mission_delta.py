@@ -0,0 +1,108 @@
+""" тесты изменений маршрутного задания """
+import json
+
+from geopy import Point
+
+from src.event_types import Event
+from src.mission_delta import apply_diff, diff_lines, mission_to_wpl_lines, \
+    mission_version, wpl_from_lines
+from src.mission_planner_mqtt import MISSION_ACCEPTED, MISSION_RESEND_STATUSES, MissionSender
+from src.mission_type import Mission
+
+
+def _mission(count: int, insert_at: int = None) -> Mission:
+    waypoints = [Point(60.0 + i * 1e-4, 75.0) for i in range(count)]
+    if insert_at is not None:
+        waypoints.insert(insert_at, Point(61.0, 76.0))
+    return Mission(home=Point(60.0, 75.0), waypoints=waypoints, speed_limits=[], armed=False)
+
+
+def test_wpl_lines():
+    """ текст маршрута: заголовок, домашняя точка и путевые точки по порядку """
+    mission_str = wpl_from_lines(mission_to_wpl_lines(_mission(2)))
+    lines = mission_str.splitlines()
+    assert lines[0] == "QGC WPL 110"
+    assert [line.split("\t")[0] for line in lines[1:]] == ["0", "1", "2"]
+    assert lines[1].startswith("0\t1\t0\t16")
+    assert len(mission_version(mission_str)) == 16
+
+
+def test_inserted_waypoint_delta():
+    """ вставка точки в длинный маршрут передаётся одной строкой """
+    old = mission_to_wpl_lines(_mission(1000))
+    new = mission_to_wpl_lines(_mission(1000, insert_at=500))
+    start, end, lines = diff_lines(old, new)
+    assert (start, end) == (501, 501) and len(lines) == 1
+    assert apply_diff(old, start, end, lines) == new
+    assert diff_lines(new, new) == (len(new), len(new), [])
+
+
+class FakeConnection:
+    """ соединение с брокером: запоминает отправленные сообщения и подписки """
+
+    def __init__(self):
+        self.published = []
+        self.subscriptions = {}
+
+    def can_send(self):
+        return True
+
+    def publish(self, _, payload, on_done=None):
+        self.published.append(json.loads(payload))
+
+    def subscribe(self, topic, callback):
+        self.subscriptions[topic] = callback
+
+
+def test_sender_deltas_follow_acked_version(queues_dir):
+    """ изменения отправляются относительно подтверждённой версии, при расхождении - полный маршрут """
+    connection = FakeConnection()
+    sender = MissionSender(queues_dir, client_id="C1")
+    sender.attach(connection)
+    reply = connection.subscriptions["api/mission/status/C1"]
+
+    def post(count):
+        sender._handle_event(Event(  # pylint: disable=protected-access
+            source="planner", destination="planner.mqtt", operation="post_mission",
+            parameters=_mission(count)))
+        sender.process()
+        return connection.published[-1]
+
+    # пока ни одна версия не подтверждена, маршруты отправляются целиком
+    first = post(100)
+    assert "mission_str" in post(101)
+    reply(json.dumps({"version": first["version"], "status": MISSION_ACCEPTED}).encode())
+    delta = post(102)
+    assert delta["base_version"] == first["version"]
+
+    # получатель не применил изменение: тот же маршрут уходит целиком
+    reply(json.dumps({"version": delta["version"], "status": MISSION_RESEND_STATUSES[0]}).encode())
+    sender.process()
+    assert connection.published[-1] == {
+        "id": "C1", "version": delta["version"],
+        "mission_str": wpl_from_lines(mission_to_wpl_lines(_mission(102)))}
+    assert "mission_str" in post(103)
+
+
+def test_sender_reposts_rejected_mission(queues_dir):
+    """ отклонённый маршрут при повторной отправке уходит снова, принятый - нет """
+    connection = FakeConnection()
+    sender = MissionSender(queues_dir, client_id="C1")
+    sender.attach(connection)
+    reply = connection.subscriptions["api/mission/status/C1"]
+
+    def post():
+        sender._handle_event(Event(  # pylint: disable=protected-access
+            source="planner", destination="planner.mqtt", operation="post_mission",
+            parameters=_mission(5)))
+        sender.process()
+
+    post()
+    version = connection.published[-1]["version"]
+    reply(json.dumps({"version": version, "status": "Error: unknown command."}).encode())
+    post()
+    assert len(connection.published) == 2 and "mission_str" in connection.published[-1]
+
+    reply(json.dumps({"version": version, "status": MISSION_ACCEPTED}).encode())
+    post()
+    assert len(connection.published) == 2
@@ -0,0 +1,52 @@
+""" тесты общего шлюза MQTT через локальный брокер """
+from time import sleep, time
+
+from geopy import Point as GeoPoint
+import paho.mqtt.client as mqtt
+
+from src.event_types import Event
+from src.mission_planner_mqtt import MissionSender
+from src.mission_type import Mission
+from src.mqtt_gateway import MqttGateway
+from src.queues_dir import QueuesDirectory
+from src.sitl_mqtt import TelemetrySender
+from src.telemetry_codec import decode
+
+
+def test_gateway_publishes_all_topics(mqtt_broker):
+    """ телеметрия и маршрут уходят через одно соединение шлюза """
+    received = []
+    subscriber = mqtt.Client("afcs")
+    subscriber.on_message = lambda _, __, msg: received.append(msg)
+    subscriber.connect(mqtt_broker.host, mqtt_broker.port)
+    subscriber.subscribe("api/#")
+    subscriber.loop_start()
+
+    queues_dir = QueuesDirectory()
+    telemetry_sender = TelemetrySender(queues_dir, client_id="C1", batch_max_samples=2)
+    mission_sender = MissionSender(queues_dir, client_id="C1")
+    gateway = MqttGateway([telemetry_sender, mission_sender], client_id="C1",
+                          host=mqtt_broker.host, port=mqtt_broker.port)
+    gateway.start()
+
+    for i in range(2):
+        queues_dir.get_queue("sitl.mqtt").put(Event(
+            source="sitl", destination="sitl.mqtt", operation="post_telemetry",
+            parameters=GeoPoint(60.0, 75.0),
+            extra_parameters={"bearing": 90, "speed": 30, "timestamp": 1700000000.0 + i}))
+    home = GeoPoint(60.0, 75.0)
+    queues_dir.get_queue("planner.mqtt").put(Event(
+        source="planner", destination="planner.mqtt", operation="post_mission",
+        parameters=Mission(home=home, waypoints=[home], speed_limits=[], armed=True)))
+
+    deadline = time() + 10
+    while len(received) < 2 and time() < deadline:
+        sleep(0.1)
+    gateway.stop()
+    gateway.join(10)
+    subscriber.loop_stop()
+    subscriber.disconnect()
+
+    topics = {msg.topic: msg.payload for msg in received}
+    assert len(decode(topics["api/telemetry"])) == 2
+    assert b"QGC WPL 110" in topics["api/mission"]
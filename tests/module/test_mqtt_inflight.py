@@ -0,0 +1,78 @@
+""" тесты учёта неподтверждённых сообщений MQTT """
+import pickle
+
+from src.mqtt_inflight import InflightTracker
+
+
+def test_inflight_window():
+    """ окно заполняется и освобождается подтверждениями """
+    tracker = InflightTracker(window=2)
+    tracker.track(1)
+    assert tracker.can_send()
+    tracker.track(2)
+    assert not tracker.can_send()
+
+    assert tracker.complete(1) is not None
+    assert tracker.can_send()
+    assert tracker.stats()["acked"] == 1
+
+
+def test_early_ack_and_expire():
+    """ подтверждение раньше регистрации и таймаут подтверждения """
+    tracker = InflightTracker(timeout_sec=0)
+    assert tracker.complete(7) is None
+    tracker.track(7)
+    assert len(tracker) == 0
+
+    tracker.track(8)
+    assert tracker.expire() == [8]
+    stats = pickle.loads(pickle.dumps(tracker)).stats()
+    assert stats["sent"] == 2 and stats["acked"] == 1 and stats["failed"] == 1
+
+
+def test_topic_stats():
+    """ статистика по топикам общего соединения """
+    tracker = InflightTracker(timeout_sec=0)
+    tracker.track(1, "api/telemetry")
+    tracker.track(2, "api/mission")
+    tracker.fail("api/mission")
+    tracker.complete(1)
+
+    assert tracker.expire() == [2]
+    assert tracker.topic_stats() == {
+        "api/telemetry": {"sent": 1, "acked": 1, "failed": 0},
+        "api/mission": {"sent": 1, "acked": 0, "failed": 2},
+    }
+
+
+def test_delivery_callback():
+    """ уведомление о доставке: подтверждение, ранее подтверждение и таймаут """
+    tracker = InflightTracker(timeout_sec=0)
+    results = []
+    tracker.track(1, on_done=lambda mid, delivered: results.append((mid, delivered)))
+    tracker.complete(1)
+    tracker.complete(2)
+    tracker.track(2, on_done=lambda mid, delivered: results.append((mid, delivered)))
+    tracker.track(3, on_done=lambda mid, delivered: results.append((mid, delivered)))
+    tracker.expire()
+    assert results == [(1, True), (2, True), (3, False)]
+
+
+def test_late_and_stale_acks():
+    """ подтверждение после таймаута и устаревшее раннее подтверждение не засчитываются новому сообщению """
+    tracker = InflightTracker(window=4, timeout_sec=0)
+    tracker.track(5)
+    assert tracker.expire() == [5]
+    # опоздавшее подтверждение, затем paho снова выдаёт тот же mid
+    assert tracker.complete(5) is None
+    tracker.track(5)
+    assert len(tracker) == 1
+
+    tracker.EARLY_ACK_SEC = -1
+    tracker.complete(6)
+    tracker.track(6)
+    assert len(tracker) == 2
+
+    for mid in range(100, 200):
+        tracker.complete(mid)
+    assert len(tracker._early_acks) == 4  # pylint: disable=protected-access
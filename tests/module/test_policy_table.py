@@ -0,0 +1,53 @@
+""" тесты скомпилированной таблицы политик безопасности """
+import pickle
+
+import pytest
+
+from src.policy_table import ANY, CompiledPolicyTable
+from src.security_policy_type import SecurityPolicy
+
+
+def test_exact_policies():
+    """ точное совпадение отправителя, получателя и операции """
+    table = CompiledPolicyTable([
+        SecurityPolicy(source="control", destination="safety", operation="set_speed"),
+        SecurityPolicy(source="control", destination="safety", operation="set_direction"),
+    ])
+
+    assert len(table) == 2
+    assert table.is_allowed("control", "safety", "set_speed")
+    assert not table.is_allowed("control", "servos", "set_speed")
+    assert not table.is_allowed("safety", "control", "set_speed")
+
+
+def test_wildcard_policies():
+    """ подстановочные знаки в получателе и операции """
+    table = CompiledPolicyTable([
+        SecurityPolicy(source="navigation", destination=ANY, operation="position_update"),
+        SecurityPolicy(source="control", destination="cargo", operation=ANY),
+    ])
+
+    assert table.is_allowed("navigation", "control", "position_update")
+    assert table.is_allowed("navigation", "safety", "position_update")
+    assert not table.is_allowed("navigation", "safety", "set_speed")
+    assert table.is_allowed("control", "cargo", "release_cargo")
+    assert not table.is_allowed("communication", "cargo", "release_cargo")
+
+
+def test_table_is_frozen():
+    """ таблицу нельзя изменить после компиляции """
+    table = CompiledPolicyTable()
+    with pytest.raises(AttributeError):
+        table._trie = {}        # pylint: disable=protected-access
+    table = CompiledPolicyTable([
+        SecurityPolicy(source="control", destination="safety", operation="set_speed")])
+    with pytest.raises(TypeError):
+        table._trie["control"]["cargo"] = frozenset({"release_cargo"})  # pylint: disable=protected-access
+    with pytest.raises(TypeError):
+        table._trie["cargo"] = {}  # pylint: disable=protected-access
+
+    # таблица передаётся в процесс монитора
+    copy = pickle.loads(pickle.dumps(table))
+    assert copy.is_allowed("control", "safety", "set_speed") and len(copy) == 1
+    with pytest.raises(TypeError):
+        copy._trie["control"]["cargo"] = frozenset()  # pylint: disable=protected-access
@@ -0,0 +1,86 @@
+""" тесты базового блока ограничителя """
+from geopy import Point as GeoPoint
+
+from src.mission_type import Mission
+from src.safety_block import BaseSafetyBlock
+
+
+class SafetyBlock(BaseSafetyBlock):
+    """ минимальная реализация ограничителя для тестов """
+
+    def _set_new_direction(self, direction: float):
+        pass
+
+    def _set_new_speed(self, speed: float):
+        pass
+
+    def _lock_cargo(self, _):
+        pass
+
+    def _release_cargo(self, _):
+        pass
+
+    def _send_speed_to_consumers(self):
+        pass
+
+    def _send_direction_to_consumers(self):
+        pass
+
+    def _send_lock_cargo_to_consumers(self):
+        pass
+
+    def _send_release_cargo_to_consumers(self):
+        pass
+
+
+def _square(name, lon, lat, size):
+    coordinates = [[lon, lat], [lon + size, lat], [lon + size, lat + size],
+                   [lon, lat + size], [lon, lat]]
+    return {"type": "Feature", "properties": {"name": name, "change_type": "added"},
+            "geometry": {"type": "Polygon", "coordinates": [coordinates]}}
+
+
+def test_verdict_cache(queues_dir):
+    """ кэш вердикта сбрасывается при смене ячейки, маршрута и зон """
+    safety_block = SafetyBlock(queues_dir=queues_dir)
+    waypoints = [GeoPoint(0.0, 0.0), GeoPoint(0.01, 0.01)]
+    safety_block._set_mission(                      # pylint: disable=protected-access
+        Mission(home=waypoints[0], waypoints=waypoints, speed_limits=[], armed=True))
+
+    safety_block._set_new_position(GeoPoint(0.00001, 0.00001))  # pylint: disable=protected-access
+    safety_block._set_new_position(GeoPoint(0.00002, 0.00002))  # pylint: disable=protected-access
+    assert safety_block.get_verdict_cache_stats() == {"hits": 1, "misses": 1}
+    assert safety_block._is_safe()                  # pylint: disable=protected-access
+
+    # зона на пути к следующей точке
+    safety_block._update_forbidden_zones(           # pylint: disable=protected-access
+        {"type": "FeatureCollection", "features": [_square("z", 0.004, 0.004, 0.002)]})
+    assert not safety_block._is_safe()              # pylint: disable=protected-access
+    assert safety_block.get_verdict_cache_stats()["misses"] == 2
+
+    # другая ячейка
+    safety_block._set_new_position(GeoPoint(0.001, 0.001))  # pylint: disable=protected-access
+    assert safety_block.get_verdict_cache_stats()["misses"] == 3
+
+
+def test_verdict_cache_at_zone_edge(queues_dir):
+    """ в ячейке, через которую проходит граница зоны, вердикт не кэшируется """
+    safety_block = SafetyBlock(queues_dir=queues_dir)
+    # граница зоны проходит через ячейку [0.00005, 0.0001) по долготе
+    safety_block._set_forbidden_zones(              # pylint: disable=protected-access
+        {"type": "FeatureCollection", "features": [_square("z", 0.00007, 0.0, 0.001)]})
+
+    safety_block._position = GeoPoint(0.00006, 0.00001)  # pylint: disable=protected-access
+    assert safety_block._is_safe()                  # pylint: disable=protected-access
+    safety_block._position = GeoPoint(0.00006, 0.00006)  # pylint: disable=protected-access
+    assert safety_block._is_safe()                  # pylint: disable=protected-access
+    safety_block._position = GeoPoint(0.00006, 0.00009)  # pylint: disable=protected-access
+    assert not safety_block._is_safe()              # pylint: disable=protected-access
+    assert safety_block.get_verdict_cache_stats() == {"hits": 0, "misses": 3}
+
+    # ячейка целиком внутри зоны кэшируется
+    safety_block._position = GeoPoint(0.00032, 0.00032)  # pylint: disable=protected-access
+    assert not safety_block._is_safe()              # pylint: disable=protected-access
+    safety_block._position = GeoPoint(0.00031, 0.00031)  # pylint: disable=protected-access
+    assert not safety_block._is_safe()              # pylint: disable=protected-access
+    assert safety_block.get_verdict_cache_stats() == {"hits": 1, "misses": 4}
@@ -1,9 +1,13 @@
 """ тесты монитора безопасности """
+from queue import Queue
 
+import pytest
 
 from src.config import CARGO_BAY_QUEUE_NAME, COMMUNICATION_GATEWAY_QUEUE_NAME, \
     CONTROL_SYSTEM_QUEUE_NAME, SAFETY_BLOCK_QUEUE_NAME
 from src.event_types import Event
+from src.policy_table import ANY
+from src.security_monitory import BaseSecurityMonitor
 from src.security_policy_type import SecurityPolicy
 
 
@@ -58,3 +62,70 @@ def test_security_policies(security_monitor):
         event=event)  # pylint: disable=protected-access
 
     assert authorized is False
+
+
+def test_capability_channel(security_monitor, queues_dir):
+    """ канал прямой доставки и его отзыв при изменении политик """
+    control_q = Queue()
+    queues_dir.register(control_q, CONTROL_SYSTEM_QUEUE_NAME)
+
+    # режим выключен по умолчанию
+    assert security_monitor.issue_capability(
+        COMMUNICATION_GATEWAY_QUEUE_NAME, CONTROL_SYSTEM_QUEUE_NAME, "set_mission") is None
+
+    security_monitor.enable_capabilities()
+    # тройка не разрешена политиками
+    assert security_monitor.issue_capability(
+        COMMUNICATION_GATEWAY_QUEUE_NAME, CARGO_BAY_QUEUE_NAME, "release_cargo") is None
+
+    channel = security_monitor.issue_capability(
+        COMMUNICATION_GATEWAY_QUEUE_NAME, CONTROL_SYSTEM_QUEUE_NAME, "set_mission")
+    assert channel.is_valid
+    channel.send(parameters=None)
+    assert control_q.get_nowait().operation == "set_mission"
+    assert security_monitor.get_capability_audit() == {
+        (COMMUNICATION_GATEWAY_QUEUE_NAME, CONTROL_SYSTEM_QUEUE_NAME, "set_mission"): 1}
+
+    # после изменения политик канал отозван, событие идёт через монитор
+    security_monitor.set_security_policies(
+        policies=security_monitor._security_policies)   # pylint: disable=protected-access
+    assert not channel.is_valid
+    channel.send(parameters=None)
+    assert control_q.empty()
+    assert channel.delivered == 1
+
+
+def test_check_event_is_required(queues_dir):
+    """ монитор без собственной проверки событий не создаётся """
+    class IncompleteMonitor(BaseSecurityMonitor):
+        """ наследник, забывший реализовать _check_event """
+
+    with pytest.raises(TypeError):
+        IncompleteMonitor(queues_dir)
+
+
+def test_capability_uses_check_event(queues_dir):
+    """ канал выдаётся только для тройки, которую разрешает _check_event наследника """
+    class StrictMonitor(BaseSecurityMonitor):
+        """ монитор, дополнительно запрещающий release_cargo """
+
+        def _check_event(self, event: Event):
+            return event.operation != "release_cargo" and self._is_authorized(event)
+
+    monitor = StrictMonitor(queues_dir)
+    monitor.set_security_policies([SecurityPolicy(
+        source=CONTROL_SYSTEM_QUEUE_NAME, destination=CARGO_BAY_QUEUE_NAME, operation=ANY)])
+    monitor.enable_capabilities()
+    assert monitor.issue_capability(
+        CONTROL_SYSTEM_QUEUE_NAME, CARGO_BAY_QUEUE_NAME, "release_cargo") is None
+
+
+def test_policies_fixed_after_start(security_monitor):
+    """ после запуска монитора политики не меняются """
+    security_monitor.start()
+    try:
+        with pytest.raises(RuntimeError):
+            security_monitor.set_security_policies(policies=[])
+    finally:
+        security_monitor.stop()
+        security_monitor.join(5)
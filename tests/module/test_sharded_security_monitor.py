@@ -0,0 +1,38 @@
+""" тесты шардированного монитора безопасности """
+from queue import Queue
+
+from src.event_types import Event
+from src.sharded_security_monitor import SHARD_BY_DESTINATION, ShardedQueue
+
+
+def _drain(queue: Queue) -> list:
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+def test_sharded_queue_keeps_order():
+    """ события одного отправителя попадают в один шард в исходном порядке """
+    queues = [Queue() for _ in range(4)]
+    sharded_q = ShardedQueue(queues)
+
+    for i in range(10):
+        for source in ("control", "navigation", "safety"):
+            sharded_q.put(Event(source=source, destination="servos",
+                                operation="set_speed", parameters=i))
+
+    shard_events = [_drain(queue) for queue in queues]
+    for source in ("control", "navigation", "safety"):
+        parameters = [e.parameters for e in shard_events[sharded_q.shard_of(source)]
+                      if e.source == source]
+        assert parameters == list(range(10))
+
+
+def test_sharded_queue_by_destination():
+    """ шардирование по получателю """
+    queues = [Queue() for _ in range(3)]
+    sharded_q = ShardedQueue(queues, shard_by=SHARD_BY_DESTINATION)
+    sharded_q.put(Event(source="control", destination="cargo",
+                        operation="lock_cargo", parameters=None))
+    assert queues[sharded_q.shard_of("cargo")].qsize() == 1
@@ -0,0 +1,30 @@
+""" тесты кодирования телеметрии """
+import pytest
+
+from src.telemetry_codec import TELEMETRY_FORMAT_BINARY, TELEMETRY_FORMAT_TEXT, \
+    TelemetrySample, decode, encode
+
+SAMPLES = [TelemetrySample(timestamp=1700000000.0 + i * 0.5, latitude=-35.3632621,
+                           longitude=149.1652374, altitude=584.09, azimuth=90, dop=1.2,
+                           sats=12, speed=30) for i in range(4)]
+
+
+def test_binary_and_text_formats_agree():
+    """ двоичный формат декодируется в те же значения, что и текстовый """
+    binary = encode("C1", SAMPLES, TELEMETRY_FORMAT_BINARY)
+    text = encode("C1", SAMPLES, TELEMETRY_FORMAT_TEXT).encode()
+    assert len(binary) * 4 < len(text)
+
+    for from_binary, from_text in zip(decode(binary), decode(text)):
+        assert from_binary.keys() == from_text.keys()
+        for key, value in from_binary.items():
+            if key == "id":
+                assert value == from_text[key]
+            else:
+                assert value == pytest.approx(float(from_text[key]), abs=1)
+
+
+def test_decode_rejects_damaged_payload():
+    """ повреждённое двоичное сообщение """
+    with pytest.raises(ValueError):
+        decode(encode("C1", SAMPLES)[:-3])
@@ -0,0 +1,150 @@
+""" тесты дискового буфера телеметрии """
+from geopy import Point as GeoPoint
+
+from src.event_types import Event
+from src.sitl_mqtt import TelemetrySender
+from src.telemetry_codec import TelemetrySample, decode
+from src.telemetry_spool import TelemetrySpool
+
+
+def _samples(start: int, count: int):
+    return [TelemetrySample(float(i), 60.0, 75.0, 10.0, 90.0, 1.2, 12, 30.0)
+            for i in range(start, start + count)]
+
+
+def test_spool_drops_oldest_and_survives_reopen(tmp_path):
+    """ переполнение удаляет самые старые измерения, буфер сохраняется между запусками """
+    path = str(tmp_path / "spool.db")
+    spool = TelemetrySpool(path, max_samples=5)
+    assert spool.push(_samples(0, 4)) == 0
+    assert spool.push(_samples(4, 3)) == 2
+    spool.close()
+
+    spool = TelemetrySpool(path, max_samples=5)
+    assert len(spool) == 5
+    last_id, samples = spool.peek(3)
+    assert [s.timestamp for s in samples] == [2.0, 3.0, 4.0]
+    spool.remove_through(last_id)
+    assert len(spool) == 2
+    assert spool.stats()["replayed"] == 3
+
+
+class FakeConnection:
+    """ соединение с брокером, которое можно включать и выключать """
+
+    def __init__(self):
+        self.connected = False
+        self.published = []
+        self.on_done = []
+
+    def can_send(self):
+        return self.connected
+
+    def publish(self, _, payload, on_done=None):
+        self.published.append(payload)
+        self.on_done.append(on_done)
+
+    def ack(self, index, delivered=True):
+        """ подтверждение брокера (или таймаут) для сообщения с номером index """
+        self.on_done[index](index, delivered)
+
+
+def _post(sender, start, count):
+    for i in range(start, start + count):
+        sender._handle_event(Event(  # pylint: disable=protected-access
+            source="sitl", destination="sitl.mqtt", operation="post_telemetry",
+            parameters=GeoPoint(60.0, 75.0), extra_parameters={
+                "bearing": 90, "speed": 30, "timestamp": 1700000000.0 + i}))
+
+
+def test_sender_spools_while_disconnected(queues_dir, tmp_path):
+    """ без соединения измерения копятся на диске и отправляются после подключения """
+    sender = TelemetrySender(queues_dir, client_id="C1", batch_max_samples=2,
+                             spool_path=str(tmp_path / "spool.db"))
+    connection = FakeConnection()
+    sender.attach(connection)
+
+    _post(sender, 0, 6)
+    sender.process()
+    assert not connection.published
+
+    connection.connected = True
+    sender.process()
+    assert len(connection.published) == 1
+    samples = decode(connection.published[0])
+    assert [s["ts"] for s in samples] == [1700000000.0 + i for i in range(6)]
+
+
+def _timestamps(payload):
+    return [s["ts"] - 1700000000.0 for s in decode(payload)]
+
+
+def test_spool_keeps_samples_until_ack(queues_dir, tmp_path):
+    """ строки буфера удаляются только после подтверждения, пакет без подтверждения отправляется снова """
+    spool_path = str(tmp_path / "spool.db")
+    sender = TelemetrySender(queues_dir, client_id="C1", batch_max_samples=2, spool_path=spool_path)
+    sender.REPLAY_MAX_MESSAGES_PER_SEC = float("inf")
+    sender.REPLAY_BATCH_SAMPLES = 2
+    connection = FakeConnection()
+    sender.attach(connection)
+    _post(sender, 0, 4)
+
+    # пакеты переданы клиенту, но соединение обрывается до подтверждения
+    connection.connected = True
+    sender.process()
+    sender.process()
+    sender.process()
+    assert [_timestamps(p) for p in connection.published] == [[0, 1], [2, 3]]
+    assert len(TelemetrySpool(spool_path)) == 4
+    connection.ack(0, delivered=False)
+    connection.ack(1)
+    sender.process()
+    assert len(TelemetrySpool(spool_path)) == 2
+
+    # таймаут подтверждения: те же измерения отправляются снова
+    assert _timestamps(connection.published[2]) == [0, 1]
+    connection.ack(2)
+    sender.process()
+    assert len(TelemetrySpool(spool_path)) == 0
+
+    # пакет, отправленный сразу, без подтверждения записывается в буфер
+    _post(sender, 4, 2)
+    assert _timestamps(connection.published[3]) == [4, 5]
+    connection.ack(3, delivered=False)
+    connection.connected = False
+    sender.process()
+    assert [s.timestamp - 1700000000.0 for s in TelemetrySpool(spool_path).peek(10)[1]] == [4, 5]
+
+    connection.connected = True
+    sender.process()
+    connection.ack(4)
+    sender.process()
+    assert len(TelemetrySpool(spool_path)) == 0
+
+    # при остановке неподтверждённый пакет, отправленный сразу, сохраняется в буфере
+    _post(sender, 6, 2)
+    assert _timestamps(connection.published[5]) == [6, 7]
+    sender.flush()
+    assert [s.timestamp - 1700000000.0 for s in TelemetrySpool(spool_path).peek(10)[1]] == [6, 7]
+
+
+def test_bad_sample_does_not_drop_batch(queues_dir):
+    """ измерение вне двоичного формата отбрасывается при приёме, остальные измерения пакета отправляются """
+    sender = TelemetrySender(queues_dir, client_id="C1", batch_max_samples=3)
+    connection = FakeConnection()
+    connection.connected = True
+    sender.attach(connection)
+
+    _post(sender, 0, 1)
+    sender._handle_event(Event(  # pylint: disable=protected-access
+        source="sitl", destination="sitl.mqtt", operation="post_telemetry",
+        parameters=GeoPoint(60.0, 75.0, 1e9), extra_parameters={
+            "bearing": 90, "speed": 30, "timestamp": 1700000001.0}))
+    _post(sender, 2, 2)
+    assert [_timestamps(p) for p in connection.published] == [[0, 2, 3]]
+
+    # более раннее измерение начинает новый пакет вместо отрицательного смещения времени
+    _post(sender, 10, 1)
+    _post(sender, 5, 2)
+    sender.flush()
+    assert [_timestamps(p) for p in connection.published[1:]] == [[10], [5, 6]]
@@ -0,0 +1,80 @@
+""" тесты общего кодека QGC WPL """
+import os
+
+import pytest
+
+from src.wpl_codec import WPL_MALFORMED_LINE, WPL_NON_ZERO_DELAY_WAYPOINT, \
+    WPL_UNKNOWN_COMMAND, WPL_UNSUPPORTED_VERSION, WPL_WRONG_DELAY, WPLError, WPLMission, \
+    decode_wpl, decode_wpl_lines, encode_wpl
+
+WPL = ("QGC WPL 110\r\n"
+       "0\t1\t0\t16\t0\t0\t0\t0\t60.0\t75.0\t0\t1\r\n"
+       "1\t0\t3\t22\t0\t0\t0\t0\t0\t0\t10\t1\r\n"
+       "2\t0\t3\t16\t0\t0\t0\t0\t60.001\t75.001\t10\r\n"
+       "3\t0\t3\t183\t5\t1500\t0\t0\t0\t0\t0\t1\r\n"
+       "4\t0\t3\t93\t5\t0\t0\t0\t0\t0\t0\t1\r\n"
+       "5\t0\t3\t21\t0\t0\t0\t0\t0\t0\t0\t1\r\n")
+
+
+def test_decode_columns():
+    """ маршрут разбирается в столбцы, autocontinue по умолчанию 1 """
+    mission = decode_wpl(WPL)
+    assert len(mission) == 6
+    assert list(mission.command) == [16, 22, 16, 183, 93, 21]
+    assert list(mission.autocontinue) == [1] * 6
+    assert mission.param2[3] == 1500.0
+    assert mission.is_home(0) and not mission.is_home(1)
+    assert list(mission.position_rows()) == [0, 2]
+    assert decode_wpl(WPL.encode()) == mission
+
+
+def test_encode_round_trip():
+    """ закодированный маршрут разбирается в тот же маршрут """
+    mission = decode_wpl(WPL)
+    text = encode_wpl(mission)
+    assert text.startswith("QGC WPL 110\n0\t1\t0\t16\t0.0")
+    assert decode_wpl(text) == mission
+
+
+def test_chunks_agree():
+    """ результат не зависит от разбиения на блоки и от того, быстрый ли путь разбора """
+    mission = WPLMission()
+    for i in range(1000):
+        mission.append((i, 0, 3, 16, 0.0, 0.0, 0.0, 0.0, 60 + i * 1e-4, 75.0, 10.0, 1))
+    lines = encode_wpl(mission).splitlines()
+    # строка без autocontinue переводит блок на построчный разбор
+    lines[500] = lines[500].rsplit("\t", 1)[0]
+    for chunk_lines in (1, 7, 4096):
+        assert decode_wpl_lines(lines, chunk_lines) == mission
+
+
+@pytest.mark.parametrize("line, reason", [
+    ("1\t0\t3\t17\t0\t0\t0\t0\t60\t75\t0\t1", WPL_UNKNOWN_COMMAND),
+    ("1\t0\t3\t16\t2\t0\t0\t0\t60\t75\t0\t1", WPL_NON_ZERO_DELAY_WAYPOINT),
+    ("1\t0\t3\t93\t5\t1\t0\t0\t0\t0\t0\t1", WPL_WRONG_DELAY),
+    ("1\t0\t3\t16\t0\t0\t0\t0\t60\t75", WPL_MALFORMED_LINE),
+    ("1\t0\t3\tx\t0\t0\t0\t0\t60\t75\t0\t1", WPL_MALFORMED_LINE),
+])
+def test_rejected(line, reason):
+    """ первая ошибочная строка определяет причину отказа """
+    text = WPL + line + "\n" + "2\t0\t3\t17\t0\t0\t0\t0\t60\t75\t0\t1\n"
+    with pytest.raises(WPLError) as error:
+        decode_wpl(text)
+    assert (error.value.reason, error.value.row) == (reason, 6)
+
+
+def test_home_and_end_of_mission():
+    """ команда домашней точки не проверяется, маршрут заканчивается на пустой строке """
+    mission = decode_wpl("QGC WPL 110\n0\t1\t0\t179\t0\t0\t0\t0\t60\t75\t0\t1\n\n1\tgarbage\n")
+    assert len(mission) == 1
+    with pytest.raises(WPLError) as error:
+        decode_wpl("QGC WPL 100\n")
+    assert error.value.reason == WPL_UNSUPPORTED_VERSION
+
+
+def test_server_copy_is_identical():
+    """ копия кодека в системе мониторинга совпадает с бортовой """
+    root = os.path.join(os.path.dirname(__file__), "..", "..")
+    with open(os.path.join(root, "src", "wpl_codec.py"), "rb") as vehicle, \
+            open(os.path.join(root, "afcs", "afcs", "utils", "wpl_codec.py"), "rb") as server:
+        assert vehicle.read() == server.read()
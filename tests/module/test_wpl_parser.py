@@ -0,0 +1,76 @@
+""" тесты парсера WPL файла """
+import numpy as np
+import pytest
+
+from src.mission_importer import MissionImporter
+from src.route import Route
+from src.wpl_codec import WPL_MALFORMED_LINE, WPLError
+from src.wpl_parser import WPLParser, WPLRecord
+
+WPL = """QGC WPL 110
+0\t1\t0\t16\t0\t5\t0\t0\t60.0\t75.0\t0\t1
+1\t0\t3\t22\t0\t0\t0\t0\t0\t0\t10\t1
+2\t0\t3\t16\t0\t5\t0\t0\t60.001\t75.001\t10\t1
+3\t0\t3\t183\t5\t1500\t0\t0\t0\t0\t0\t1
+4\t0\t3\t93\t5\t0\t0\t0\t0\t0\t0\t1
+5\t0\t3\t21\t0\t0\t0\t0\t60.002\t75.002\t0\t1
+"""
+
+
+def _wpl_file(tmp_path, text=WPL):
+    path = tmp_path / "mission.wpl"
+    path.write_text(text)
+    return str(path)
+
+
+def test_records(tmp_path):
+    """ строки разбираются в типизированные записи """
+    records = list(WPLParser(_wpl_file(tmp_path)).iter_records())
+    assert len(records) == 6
+    assert records[3] == WPLRecord(3, 0, 3, 183, 5.0, 1500.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1)
+    assert isinstance(records[0].command, int)
+
+
+def test_only_position_commands(tmp_path):
+    """ команды без координат (сервопривод, задержка, взлёт на месте) не дают точек маршрута """
+    parser = WPLParser(_wpl_file(tmp_path))
+    assert [r.index for r in parser.iter_waypoints()] == [0, 2, 5]
+    expected = [(r.latitude, r.longitude, r.altitude) for r in parser.iter_waypoints()]
+    assert np.array_equal(parser.parse_waypoint_arrays(), np.array(expected))
+
+
+def test_parse_keeps_every_line(tmp_path):
+    """ parse, как и прежде, даёт точку для каждой строки маршрута, в том числе без координат """
+    parser = WPLParser(_wpl_file(tmp_path))
+    expected = [(r.latitude, r.longitude) for r in parser.iter_records()]
+    assert [(p.latitude, p.longitude) for p in parser.parse()] == expected
+    assert [(p.latitude, p.longitude) for p in parser.parse_points()] == expected
+    assert np.array_equal(parser.parse_arrays(),
+                          np.array([(r.latitude, r.longitude, r.altitude) for r in parser.iter_records()]))
+
+
+def test_invalid_files(tmp_path):
+    """ неполные строки и пустой файл отвергаются так же, как в системе мониторинга """
+    with pytest.raises(WPLError) as error:
+        WPLParser(_wpl_file(tmp_path, WPL + "6\t0\t3\n")).parse_waypoint_arrays()
+    assert (error.value.reason, error.value.row) == (WPL_MALFORMED_LINE, 6)
+    with pytest.raises(WPLError):
+        WPLParser(_wpl_file(tmp_path, "")).parse_waypoint_arrays()
+    # маршрут заканчивается на пустой строке
+    assert WPLParser(_wpl_file(tmp_path, WPL + "\ngarbage\n")).parse_waypoint_arrays().shape == (3, 3)
+
+    # parse пропускает неполные строки без ошибки
+    assert WPLParser(_wpl_file(tmp_path, WPL + "6\t0\t3\n")).parse_arrays().shape == (6, 3)
+    assert WPLParser(_wpl_file(tmp_path, "")).parse() == []
+
+
+def test_mission_importer(tmp_path):
+    """ маршрут из файла используется как обычная последовательность точек """
+    for cache_dir in (None, str(tmp_path / "cache")):
+        mission = MissionImporter(_wpl_file(tmp_path), cache_dir=cache_dir).get_mission()
+        assert [(p.latitude, p.longitude) for p in mission.waypoints] == [
+            (60.0, 75.0), (0.0, 0.0), (60.001, 75.001), (0.0, 0.0), (0.0, 0.0), (60.002, 75.002)]
+        assert (mission.home.latitude, mission.home.longitude) == (60.0, 75.0)
+        route = Route(points=mission.waypoints, speed_limits=[])
+        assert route.get_next_point().longitude == 75.0
+        assert len(mission.waypoints[1:]) == 5
@@ -0,0 +1,203 @@
+""" локальный брокер MQTT для тестов и замеров
+
+Поддерживается подмножество MQTT 3.1.1, которого достаточно клиентам paho
+бортовой системы и системы мониторинга: CONNECT, PUBLISH с QoS 0 и 1,
+SUBSCRIBE и UNSUBSCRIBE (фильтры с + и #), PINGREQ и DISCONNECT.
+Подписчикам сообщения доставляются с QoS 0, сессии и сохранённые
+сообщения не поддерживаются.
+
+Пример:
+    with MqttBroker() as broker:
+        client.connect(broker.host, broker.port)
+"""
+import asyncio
+import struct
+from threading import Thread, Event as ThreadEvent
+from typing import Dict, List, Optional, Set
+
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """ соответствие топика фильтру подписки """
+    filter_levels = topic_filter.split('/')
+    topic_levels = topic.split('/')
+    for i, level in enumerate(filter_levels):
+        if level == '#':
+            return True
+        if i >= len(topic_levels) or level not in ('+', topic_levels[i]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+def _encode_length(length: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+
+def _packet(packet_type: int, flags: int, body: bytes) -> bytes:
+    return bytes((packet_type << 4 | flags,)) + _encode_length(len(body)) + body
+
+
+def _read_string(data: bytes, offset: int):
+    (length,) = struct.unpack_from('!H', data, offset)
+    offset += 2
+    return data[offset:offset + length].decode(), offset + length
+
+
+class _Client:
+    """ подключённый клиент брокера """
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.client_id = ''
+        self.subscriptions: Set[str] = set()
+
+
+class MqttBroker:
+    """
+    Брокер MQTT, работающий в отдельном потоке текущего процесса.
+
+    Attributes:
+        host (str): адрес, на котором брокер принимает подключения.
+        port (int): порт; если при создании указан 0, выбирается свободный.
+        received (int): количество принятых сообщений PUBLISH.
+        delivered (int): количество сообщений, доставленных подписчикам.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self.received = 0
+        self.delivered = 0
+        self._clients: List[_Client] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[Thread] = None
+        self._started = ThreadEvent()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def start(self):
+        """ запуск брокера, возвращает управление, когда брокер готов принимать подключения """
+        self._thread = Thread(target=self._run, name="mqtt-broker", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def stop(self):
+        """ остановка брокера и отключение клиентов """
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._serve_client, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            for client in self._clients:
+                client.writer.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+    async def _read_packet(self, reader: asyncio.StreamReader):
+        header = await reader.readexactly(1)
+        length, multiplier = 0, 1
+        while True:
+            (byte,) = await reader.readexactly(1)
+            length += (byte & 0x7F) * multiplier
+            if not byte & 0x80:
+                break
+            multiplier *= 128
+        body = await reader.readexactly(length) if length else b''
+        return header[0] >> 4, header[0] & 0x0F, body
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = _Client(writer)
+        self._clients.append(client)
+        try:
+            while True:
+                packet_type, flags, body = await self._read_packet(reader)
+                if packet_type == DISCONNECT:
+                    break
+                self._handle_packet(client, packet_type, flags, body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.remove(client)
+            writer.close()
+
+    def _handle_packet(self, client: _Client, packet_type: int, flags: int, body: bytes):
+        if packet_type == CONNECT:
+            _, offset = _read_string(body, 0)
+            # уровень протокола (1 байт), флаги (1 байт), keep alive (2 байта)
+            client.client_id, _ = _read_string(body, offset + 4)
+            client.writer.write(_packet(CONNACK, 0, b'\x00\x00'))
+        elif packet_type == PUBLISH:
+            qos = (flags >> 1) & 0x03
+            topic, offset = _read_string(body, 0)
+            if qos:
+                packet_id = body[offset:offset + 2]
+                offset += 2
+                client.writer.write(_packet(PUBACK, 0, packet_id))
+            self._route(topic, body[offset:])
+        elif packet_type in (SUBSCRIBE, UNSUBSCRIBE):
+            packet_id, offset = body[:2], 2
+            granted = bytearray()
+            while offset < len(body):
+                topic_filter, offset = _read_string(body, offset)
+                if packet_type == SUBSCRIBE:
+                    offset += 1  # запрошенный QoS, выдаётся QoS 0
+                    client.subscriptions.add(topic_filter)
+                    granted.append(0)
+                else:
+                    client.subscriptions.discard(topic_filter)
+            if packet_type == SUBSCRIBE:
+                client.writer.write(_packet(SUBACK, 0, packet_id + bytes(granted)))
+            else:
+                client.writer.write(_packet(UNSUBACK, 0, packet_id))
+        elif packet_type == PINGREQ:
+            client.writer.write(_packet(PINGRESP, 0, b''))
+
+    def _route(self, topic: str, payload: bytes):
+        self.received += 1
+        message = None
+        for subscriber in self._clients:
+            if any(topic_matches(f, topic) for f in subscriber.subscriptions):
+                if message is None:
+                    topic_bytes = topic.encode()
+                    message = _packet(
+                        PUBLISH, 0, struct.pack('!H', len(topic_bytes)) + topic_bytes + payload)
+                subscriber.writer.write(message)
+                self.delivered += 1
+
+    def client_ids(self) -> Dict[str, int]:
+        """ подключённые клиенты и количество их подписок """
+        return {client.client_id: len(client.subscriptions) for client in self._clients}